@@ -0,0 +1,279 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = pd.Timedelta("1D").value
+
+
+def period_ns(period: str) -> Optional[int]:
+    """
+    Returns the length of ``period`` in nanoseconds when buckets of that size
+    line up with ``DataFrame.resample``, i.e. when it evenly divides a day.
+    """
+    try:
+        length = pd.Timedelta(period).value
+    except ValueError:
+        return None
+
+    if length <= 0 or DAY_NS % length != 0:
+        return None
+
+    return length
+
+
+def bucket_numbers(created: np.ndarray, length_ns: int) -> np.ndarray:
+    return created.astype("datetime64[ns]").view(np.int64) // length_ns
+
+
+def finish(how: str, rows: np.ndarray, counts: np.ndarray, sums: np.ndarray):
+    """
+    Turns merged per-bucket state into the values of the ``how`` aggregation.
+    """
+    if how == "count":
+        return rows.astype(np.int64)
+
+    if how == "sum":
+        return sums
+
+    if how == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    raise ValueError(f"Unknown aggregation: {how}")
+
+
+class BucketAggregator:
+    """
+    Running aggregates per time bucket.
+
+    Each bucket keeps its row count plus the count and sum of the non-null
+    values, which is enough to answer count, sum and mean (sum / count).
+    Adding events only touches the buckets they fall into; events can also be
+    taken back out with ``sign=-1``.
+    """
+
+    def __init__(self, length_ns: int) -> None:
+        self.length_ns = length_ns
+        self.rows = 0
+
+        self._origin = 0
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _cover(self, lower: int, upper: int) -> None:
+        """
+        Grows the bucket arrays so they span buckets ``lower`` to ``upper``.
+        """
+        if len(self._rows) < 1:
+            self._origin = lower
+
+        start = min(lower, self._origin)
+        stop = max(upper + 1, self._origin + len(self._rows))
+        if start == self._origin and stop == self._origin + len(self._rows):
+            return
+
+        before = self._origin - start
+        after = stop - self._origin - len(self._rows)
+
+        self._rows = np.pad(self._rows, (before, after))
+        self._counts = np.pad(self._counts, (before, after))
+        self._sums = np.pad(self._sums, (before, after))
+        self._origin = start
+
+    def add(
+        self,
+        created: np.ndarray,
+        values: Optional[np.ndarray] = None,
+        sign: int = 1,
+        **kwargs,
+    ) -> None:
+        """
+        Adds (or with ``sign=-1`` removes) events to their buckets.
+        """
+        if len(created) < 1:
+            return
+
+        buckets = bucket_numbers(created, self.length_ns)
+        lower, upper = int(buckets.min()), int(buckets.max())
+        self._cover(lower, upper)
+
+        offsets = buckets - lower
+        start = lower - self._origin
+        span = upper - lower + 1
+
+        self._rows[start : start + span] += sign * np.bincount(offsets, minlength=span)
+        self.rows += sign * len(created)
+
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            present = ~np.isnan(values)
+            self._counts[start : start + span] += sign * np.bincount(
+                offsets[present], minlength=span
+            )
+            self._sums[start : start + span] += sign * np.bincount(
+                offsets[present], weights=values[present], minlength=span
+            )
+
+    def frame(
+        self, how: str = "count", length_ns: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the ``period``/``count`` frame ``DataFrame.resample`` would build.
+
+        ``how`` is one of ``count`` (rows per bucket), ``sum`` or ``mean``, and
+        ``length_ns`` merges the buckets into longer periods (a multiple of the
+        aggregator's own bucket length).
+        """
+        factor = (length_ns or self.length_ns) // self.length_ns
+
+        filled = np.flatnonzero(self._rows)
+        if len(filled) < 1:
+            return pd.DataFrame(
+                {
+                    "period": np.empty(0, dtype="datetime64[ns]"),
+                    "count": finish(how, *(np.empty(0),) * 3),
+                }
+            )
+
+        # Merge the filled buckets into the requested periods, every period
+        # between the first and the last one is kept like resample does
+        coarse = (self._origin + filled) // factor
+        lower = coarse[0]
+        offsets = coarse - lower
+        span = int(coarse[-1] - lower + 1)
+
+        values = finish(
+            how,
+            np.bincount(offsets, weights=self._rows[filled], minlength=span),
+            np.bincount(offsets, weights=self._counts[filled], minlength=span),
+            np.bincount(offsets, weights=self._sums[filled], minlength=span),
+        )
+
+        periods = np.arange(lower, lower + span, dtype=np.int64) * (
+            factor * self.length_ns
+        )
+
+        return pd.DataFrame({"period": periods.view("datetime64[ns]"), "count": values})
+
+
+class GroupedBucketAggregator:
+    """
+    Running aggregates per (time bucket, group code) cell.
+
+    Only cells that received events are stored, so the state follows the
+    number of active groups per bucket rather than buckets times groups.
+    """
+
+    def __init__(self, length_ns: int) -> None:
+        self.length_ns = length_ns
+        self.rows = 0
+
+        self._slots: Dict[int, int] = {}
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slots_for(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the slot of every (unique) cell key, allocating missing ones.
+        """
+        slots = np.empty(len(keys), dtype=np.int64)
+        for position, key in enumerate(keys.tolist()):
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = len(self._slots)
+                self._slots[key] = slot
+            slots[position] = slot
+
+        needed = len(self._slots)
+        if needed > len(self._keys):
+            grow = max(needed, 2 * len(self._keys), 64) - len(self._keys)
+            self._keys = np.pad(self._keys, (0, grow))
+            self._rows = np.pad(self._rows, (0, grow))
+            self._counts = np.pad(self._counts, (0, grow))
+            self._sums = np.pad(self._sums, (0, grow))
+
+        self._keys[slots] = keys
+
+        return slots
+
+    def add(
+        self,
+        created: np.ndarray,
+        values: Optional[np.ndarray] = None,
+        sign: int = 1,
+        codes: Optional[np.ndarray] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Adds (or with ``sign=-1`` removes) events to their cells; events with
+        a missing group (code -1) are ignored like ``groupby`` does.
+        """
+        present = codes >= 0
+        if not present.all():
+            created, codes = created[present], codes[present]
+            values = values[present] if values is not None else None
+
+        if len(created) < 1:
+            return
+
+        keys = (bucket_numbers(created, self.length_ns) << 32) | codes
+        unique, inverse = np.unique(keys, return_inverse=True)
+        slots = self._slots_for(unique)
+
+        self._rows[slots] += sign * np.bincount(inverse, minlength=len(unique))
+        self.rows += sign * len(created)
+
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            filled = ~np.isnan(values)
+            self._counts[slots] += sign * np.bincount(
+                inverse[filled], minlength=len(unique)
+            )
+            self._sums[slots] += sign * np.bincount(
+                inverse[filled], weights=values[filled], minlength=len(unique)
+            )
+
+    def frame(
+        self, how: str = "count", length_ns: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Returns ``period``, ``code``, ``size`` (rows) and ``count`` (the ``how``
+        aggregation) for every observed cell, merged into periods of ``length_ns``.
+        """
+        factor = (length_ns or self.length_ns) // self.length_ns
+
+        size = len(self._slots)
+        live = np.flatnonzero(self._rows[:size])
+        keys = self._keys[live]
+
+        coarse = ((keys >> 32) // factor << 32) | (keys & 0xFFFFFFFF)
+        unique, inverse = np.unique(coarse, return_inverse=True)
+
+        rows = np.bincount(inverse, weights=self._rows[live], minlength=len(unique))
+        values = finish(
+            how,
+            rows,
+            np.bincount(inverse, weights=self._counts[live], minlength=len(unique)),
+            np.bincount(inverse, weights=self._sums[live], minlength=len(unique)),
+        )
+
+        periods = (unique >> 32) * (factor * self.length_ns)
+
+        return pd.DataFrame(
+            {
+                "period": periods.view("datetime64[ns]"),
+                "code": unique & 0xFFFFFFFF,
+                "size": rows.astype(np.int64),
+                "count": values,
+            }
+        )
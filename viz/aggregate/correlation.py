@@ -0,0 +1,106 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from viz.aggregate.buckets import bucket_numbers
+
+
+def top_entities(codes: np.ndarray, weights: np.ndarray, top: int) -> np.ndarray:
+    """
+    Returns the codes of the ``top`` entities with the most events, busiest
+    first.
+    """
+    totals = np.bincount(codes, weights=weights)
+    if top >= len(totals):
+        return np.argsort(-totals, kind="stable")
+
+    kept = np.argpartition(-totals, top - 1)[:top]
+    return kept[np.argsort(-totals[kept], kind="stable")]
+
+
+def count_matrix(
+    created: np.ndarray,
+    codes: np.ndarray,
+    weights: np.ndarray,
+    length_ns: int,
+    entities: int,
+) -> np.ndarray:
+    """
+    Builds the bucket-by-entity matrix of event counts.
+
+    Every bucket between the first and the last one gets a row, empty buckets
+    included, since quiet periods are part of what gets correlated.
+    """
+    buckets = bucket_numbers(created, length_ns)
+    rows = buckets - buckets.min()
+    size = int(rows.max()) + 1
+
+    return np.bincount(
+        rows * entities + codes, weights=weights, minlength=size * entities
+    ).reshape(size, entities)
+
+
+def correlate(matrix: np.ndarray) -> np.ndarray:
+    """
+    Returns the Pearson correlation between the columns of ``matrix``.
+
+    The columns are standardized once, so all pairs come out of a single
+    matrix product. Columns that never change have no correlation (NaN).
+    """
+    centered = matrix - matrix.mean(axis=0)
+    norms = np.sqrt(np.einsum("ij,ij->j", centered, centered))
+    constant = norms == 0
+
+    standardized = centered / np.where(constant, 1, norms)
+    correlation = np.clip(standardized.T @ standardized, -1, 1)
+    correlation[constant, :] = np.nan
+    correlation[:, constant] = np.nan
+
+    return correlation
+
+
+def correlate_groups(
+    grouped: pd.DataFrame, group_by: str, period: str, top: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Correlates the event counts of the busiest groups over time.
+
+    Args:
+        grouped (pd.DataFrame): Event counts per period and group, with
+            ``created``, ``group_by`` and ``_id`` (count) columns.
+        group_by (str): The column holding the groups.
+        period (str): The bucket length.
+        top (int): The number of busiest groups kept, which bounds the
+            matrix to ``buckets x top`` whatever the number of groups.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The kept group labels and their
+            ``top x top`` correlation matrix.
+    """
+    codes, labels = pd.factorize(grouped[group_by], use_na_sentinel=True)
+    present = codes >= 0
+    if not present.any():
+        return np.empty(0, dtype=object), np.empty((0, 0))
+
+    created = grouped["created"].to_numpy("datetime64[ns]")[present]
+    weights = grouped["_id"].to_numpy(np.float64)[present]
+    codes = codes[present]
+
+    kept = top_entities(codes, weights, top)
+
+    # Renumber the kept groups 0..top-1 and drop the rest
+    mapping = np.full(len(labels), -1, dtype=np.int64)
+    mapping[kept] = np.arange(len(kept))
+    codes = mapping[codes]
+    rows = codes >= 0
+
+    matrix = count_matrix(
+        created[rows],
+        codes[rows],
+        weights[rows],
+        pd.Timedelta(period).value,
+        len(kept),
+    )
+
+    return np.asarray(labels)[kept], correlate(matrix)
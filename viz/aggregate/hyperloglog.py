@@ -0,0 +1,229 @@
+from math import ceil, log2
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from viz.aggregate.buckets import bucket_numbers
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+# 2 ** -rank for every possible register value
+RANK_WEIGHTS = np.exp2(-np.arange(66, dtype=np.float64))
+
+
+def precision_for(error: float) -> int:
+    """
+    Returns the smallest precision (log2 of the register count) whose
+    standard error ``1.04 / sqrt(2 ** precision)`` is within ``error``.
+    """
+    if not 0 < error < 1:
+        raise ValueError("The distinct-count error must be between 0 and 1")
+
+    precision = ceil(2 * log2(1.04 / error))
+
+    return min(max(precision, MIN_PRECISION), MAX_PRECISION)
+
+
+def hash_values(values: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes the non-null values to uint64, and returns the hashes with the
+    mask of the non-null rows. Categoricals only hash their categories, so a
+    dictionary-encoded column costs one lookup per row.
+    """
+    if isinstance(values, pd.Series):
+        values = values.array
+
+    if isinstance(values, pd.Categorical):
+        present = values.codes >= 0
+    else:
+        values = np.asarray(values)
+        present = ~pd.isna(values)
+
+    if not present.all():
+        values = values[present]
+
+    return pd.util.hash_array(values), present
+
+
+def bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    Returns the number of significant bits of every uint64, without going
+    through floats that would round the large ones.
+    """
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        lengths[wide] += shift
+        values[wide] >>= np.uint64(shift)
+
+    return lengths + (values > 0)
+
+
+def registers_of(hashes: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits hashes into the register they update and the rank they store.
+    """
+    width = 64 - precision
+    index = (hashes >> np.uint64(width)).astype(np.int64)
+    rest = hashes & np.uint64((1 << width) - 1)
+    rank = width - bit_length(rest) + 1
+
+    return index, rank.astype(np.uint8)
+
+
+def estimate(registers: np.ndarray) -> np.ndarray:
+    """
+    Estimates the distinct count of every row of a ``(sketches, 2 ** p)``
+    register matrix, with linear counting for the small cardinalities.
+    """
+    registers = np.atleast_2d(registers)
+    size = registers.shape[1]
+
+    if size == 16:
+        alpha = 0.673
+    elif size == 32:
+        alpha = 0.697
+    elif size == 64:
+        alpha = 0.709
+    else:
+        alpha = 0.7213 / (1 + 1.079 / size)
+
+    raw = alpha * size**2 / RANK_WEIGHTS[registers].sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+
+    with np.errstate(divide="ignore"):
+        linear = size * np.log(size / np.maximum(zeros, 1))
+
+    return np.where((raw <= 2.5 * size) & (zeros > 0), linear, raw)
+
+
+class DistinctBucketAggregator:
+    """
+    A HyperLogLog sketch per time bucket.
+
+    Buckets merge into longer periods by taking the maximum of their
+    registers, so distinct counts never rescan the events. Sketches
+    cannot forget values, hence events can only be added.
+    """
+
+    def __init__(self, length_ns: int, precision: int) -> None:
+        self.length_ns = length_ns
+        self.precision = precision
+        self.rows = 0
+
+        self._origin = 0
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._registers = np.zeros((0, 1 << precision), dtype=np.uint8)
+
+        # Estimate of every bucket, NaN until it is needed after a change
+        self._estimates = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _cover(self, lower: int, upper: int) -> None:
+        if len(self._rows) < 1:
+            self._origin = lower
+
+        start = min(lower, self._origin)
+        stop = max(upper + 1, self._origin + len(self._rows))
+        if start == self._origin and stop == self._origin + len(self._rows):
+            return
+
+        before = self._origin - start
+        after = stop - self._origin - len(self._rows)
+
+        self._rows = np.pad(self._rows, (before, after))
+        self._registers = np.pad(self._registers, ((before, after), (0, 0)))
+        self._estimates = np.pad(self._estimates, (before, after))
+        self._origin = start
+
+    def add(
+        self,
+        created: np.ndarray,
+        values: Optional[np.ndarray] = None,
+        sign: int = 1,
+        present: Optional[np.ndarray] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Adds events to their buckets. ``values`` are the hashes of the rows
+        flagged in ``present`` (see ``hash_values``), every row by default.
+        """
+        if sign < 0:
+            raise ValueError("Distinct-count sketches cannot remove events")
+
+        if len(created) < 1:
+            return
+
+        buckets = bucket_numbers(created, self.length_ns)
+        lower, upper = int(buckets.min()), int(buckets.max())
+        self._cover(lower, upper)
+
+        offsets = buckets - self._origin
+        start = lower - self._origin
+        span = upper - lower + 1
+
+        self._rows[start : start + span] += np.bincount(offsets - start, minlength=span)
+        self.rows += len(created)
+
+        if values is not None and len(values):
+            if present is not None:
+                offsets = offsets[present]
+
+            index, rank = registers_of(values, self.precision)
+            np.maximum.at(
+                self._registers.reshape(-1),
+                offsets * (1 << self.precision) + index,
+                rank,
+            )
+            self._estimates[np.unique(offsets)] = np.nan
+
+    def frame(self, how: str = "nunique", length_ns: Optional[int] = None):
+        """
+        Returns the ``period``/``count`` frame of estimated distinct values,
+        merged into periods of ``length_ns``.
+        """
+        if how != "nunique":
+            raise ValueError(f"Unknown aggregation: {how}")
+
+        factor = (length_ns or self.length_ns) // self.length_ns
+
+        filled = np.flatnonzero(self._rows)
+        if len(filled) < 1:
+            return pd.DataFrame(
+                {
+                    "period": np.empty(0, dtype="datetime64[ns]"),
+                    "count": np.empty(0, dtype=np.int64),
+                }
+            )
+
+        # Filled buckets are ascending, so each period is a contiguous run
+        coarse = (self._origin + filled) // factor
+        starts = np.flatnonzero(np.diff(coarse, prepend=coarse[0] - 1))
+
+        if factor == 1:
+            # Only the buckets changed since the last call are estimated again
+            dirty = filled[np.isnan(self._estimates[filled])]
+            if len(dirty):
+                self._estimates[dirty] = estimate(self._registers[dirty])
+            estimates = self._estimates[filled]
+        else:
+            merged = np.maximum.reduceat(self._registers[filled], starts, axis=0)
+            estimates = estimate(merged)
+
+        lower = coarse[0]
+        span = int(coarse[-1] - lower + 1)
+
+        values = np.zeros(span, dtype=np.int64)
+        values[coarse[starts] - lower] = np.rint(estimates)
+
+        periods = np.arange(lower, lower + span, dtype=np.int64) * (
+            factor * self.length_ns
+        )
+
+        return pd.DataFrame({"period": periods.view("datetime64[ns]"), "count": values})
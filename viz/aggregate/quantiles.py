@@ -0,0 +1,194 @@
+from math import ceil, log
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from viz.aggregate.buckets import bucket_numbers
+
+
+class LogBins:
+    """
+    Logarithmic value bins with a bounded relative error, like DDSketch.
+
+    Every value in ``[minimum, maximum]`` falls into a bin whose
+    representative value is within ``accuracy`` (relative) of it. Smaller
+    values, zero included, share the first bin and larger ones the last.
+    """
+
+    def __init__(self, accuracy: float, minimum: float, maximum: float) -> None:
+        if not 0 < accuracy < 1:
+            raise ValueError("The quantile accuracy must be between 0 and 1")
+
+        if not 0 < minimum < maximum:
+            raise ValueError("The quantile range must be positive and increasing")
+
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = log(self.gamma)
+        self._offset = ceil(log(minimum) / self._log_gamma) - 1
+
+        # Bin 0 holds everything up to ``minimum``
+        self.size = ceil(log(maximum) / self._log_gamma) - self._offset + 1
+
+        upper = self.gamma ** (np.arange(self.size) + self._offset)
+        self.values = 2 * upper / (self.gamma + 1)
+        self.values[0] = 0.0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            bins = np.ceil(np.log(np.maximum(values, 0)) / self._log_gamma)
+
+        bins -= self._offset
+
+        return np.clip(bins, 0, self.size - 1).astype(np.int64)
+
+
+def quantiles_of(counts: np.ndarray, bins: LogBins, quantile: float) -> np.ndarray:
+    """
+    Returns the ``quantile`` of every row of a ``(sketches, bins)`` count
+    matrix, NaN for the empty ones.
+    """
+    counts = np.atleast_2d(counts)
+    totals = counts.sum(axis=1)
+
+    cumulative = np.cumsum(counts, axis=1)
+    rank = quantile * (totals - 1)
+    found = (cumulative <= rank[:, None]).sum(axis=1)
+
+    values = bins.values[np.minimum(found, len(bins) - 1)]
+
+    return np.where(totals > 0, values, np.nan)
+
+
+class QuantileBucketAggregator:
+    """
+    A quantile sketch per time bucket: the count of values in every
+    logarithmic bin.
+
+    Sketches merge by adding their counts, so any period or lookback is
+    answered by summing buckets instead of sorting the raw values, and events
+    can be taken back out with ``sign=-1``.
+    """
+
+    def __init__(self, length_ns: int, bins: LogBins) -> None:
+        self.length_ns = length_ns
+        self.bins = bins
+        self.rows = 0
+
+        self._origin = 0
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros((0, len(bins)), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _cover(self, lower: int, upper: int) -> None:
+        if len(self._rows) < 1:
+            self._origin = lower
+
+        start = min(lower, self._origin)
+        stop = max(upper + 1, self._origin + len(self._rows))
+        if start == self._origin and stop == self._origin + len(self._rows):
+            return
+
+        before = self._origin - start
+        after = stop - self._origin - len(self._rows)
+
+        self._rows = np.pad(self._rows, (before, after))
+        self._counts = np.pad(self._counts, ((before, after), (0, 0)))
+        self._origin = start
+
+    def add(
+        self,
+        created: np.ndarray,
+        values: Optional[np.ndarray] = None,
+        sign: int = 1,
+        **kwargs,
+    ) -> None:
+        """
+        Adds (or with ``sign=-1`` removes) events to their buckets; null
+        values are counted as rows but left out of the quantiles.
+        """
+        if len(created) < 1:
+            return
+
+        buckets = bucket_numbers(created, self.length_ns)
+        lower, upper = int(buckets.min()), int(buckets.max())
+        self._cover(lower, upper)
+
+        offsets = buckets - self._origin
+        start = lower - self._origin
+        span = upper - lower + 1
+
+        self._rows[start : start + span] += sign * np.bincount(
+            offsets - start, minlength=span
+        )
+        self.rows += sign * len(created)
+
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)
+            present = ~np.isnan(values)
+
+            cells = offsets[present] * len(self.bins) + self.bins.index(values[present])
+            np.add.at(self._counts.reshape(-1), cells, sign)
+
+    def frame(self, how: str = "p50", length_ns: Optional[int] = None):
+        """
+        Returns the ``period``/``count`` frame of a quantile, ``how`` being
+        its percentile (e.g. ``p95``), merged into periods of ``length_ns``.
+        """
+        return self.quantiles([percentile(how)], length_ns).rename(
+            columns={how: "count"}
+        )
+
+    def quantiles(
+        self, percentiles: Sequence[int], length_ns: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Returns ``period`` and one ``p{percentile}`` column per percentile for
+        every period between the first and the last event.
+        """
+        factor = (length_ns or self.length_ns) // self.length_ns
+
+        filled = np.flatnonzero(self._rows)
+        if len(filled) < 1:
+            return pd.DataFrame(
+                {
+                    "period": np.empty(0, dtype="datetime64[ns]"),
+                    **{f"p{value}": np.empty(0) for value in percentiles},
+                }
+            )
+
+        coarse = (self._origin + filled) // factor
+        starts = np.flatnonzero(np.diff(coarse, prepend=coarse[0] - 1))
+        merged = np.add.reduceat(self._counts[filled], starts, axis=0)
+
+        lower = coarse[0]
+        span = int(coarse[-1] - lower + 1)
+        positions = coarse[starts] - lower
+
+        frame = {
+            "period": (
+                np.arange(lower, lower + span, dtype=np.int64)
+                * (factor * self.length_ns)
+            ).view("datetime64[ns]")
+        }
+        for value in percentiles:
+            column = np.full(span, np.nan)
+            column[positions] = quantiles_of(merged, self.bins, value / 100)
+            frame[f"p{value}"] = column
+
+        return pd.DataFrame(frame)
+
+
+def percentile(how: str) -> int:
+    """
+    Parses a ``p95``-style aggregation name.
+    """
+    if not how.startswith("p") or not how[1:].isdigit() or int(how[1:]) > 100:
+        raise ValueError(f"Unknown aggregation: {how}")
+
+    return int(how[1:])
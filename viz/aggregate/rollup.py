@@ -0,0 +1,131 @@
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from viz.aggregate.buckets import BucketAggregator, GroupedBucketAggregator, period_ns
+from viz.aggregate.hyperloglog import DistinctBucketAggregator, hash_values
+from viz.aggregate.quantiles import LogBins, QuantileBucketAggregator
+
+Aggregator = Union[
+    BucketAggregator,
+    GroupedBucketAggregator,
+    DistinctBucketAggregator,
+    QuantileBucketAggregator,
+]
+
+
+class Rollup:
+    """
+    Mergeable aggregates of the same events kept at several fixed resolutions.
+
+    A requested period is answered from the coarsest resolution that divides
+    it, so a long lookback merges a handful of daily buckets instead of
+    rescanning every event.
+
+    With a ``precision`` the buckets hold HyperLogLog sketches of the values
+    instead, answering approximate distinct counts (``nunique``), and with
+    ``bins`` they hold quantile sketches answering percentiles (``p95``).
+    """
+
+    def __init__(
+        self,
+        resolutions: Sequence[str],
+        grouped: bool = False,
+        precision: Optional[int] = None,
+        bins: Optional[LogBins] = None,
+    ) -> None:
+        lengths = sorted({period_ns(resolution) for resolution in resolutions})
+        if None in lengths:
+            raise ValueError("Rollup resolutions must evenly divide a day")
+
+        if grouped and (precision is not None or bins is not None):
+            raise ValueError("Sketch rollups cannot be grouped")
+
+        self.grouped = grouped
+        self.precision = precision
+        self.bins = bins
+        self._levels: List[Tuple[int, Aggregator]] = [
+            (length, self._aggregator(length)) for length in lengths
+        ]
+
+    def _aggregator(self, length: int) -> Aggregator:
+        if self.precision is not None:
+            return DistinctBucketAggregator(length, self.precision)
+
+        if self.bins is not None:
+            return QuantileBucketAggregator(length, self.bins)
+
+        if self.grouped:
+            return GroupedBucketAggregator(length)
+
+        return BucketAggregator(length)
+
+    @property
+    def subtractable(self) -> bool:
+        """
+        Whether events can be taken back out, which sketches cannot do.
+        """
+        return self.precision is None
+
+    @property
+    def rows(self) -> int:
+        return self._levels[0][1].rows
+
+    def add(
+        self,
+        created: np.ndarray,
+        values: Optional[np.ndarray] = None,
+        sign: int = 1,
+        codes: Optional[np.ndarray] = None,
+    ) -> None:
+        present = None
+        if self.precision is not None and values is not None:
+            # Hashed once for every resolution
+            values, present = hash_values(values)
+
+        for _length, aggregator in self._levels:
+            aggregator.add(created, values, sign=sign, codes=codes, present=present)
+
+    def level(self, length_ns: int) -> Optional[Aggregator]:
+        """
+        Returns the coarsest aggregator whose buckets divide ``length_ns``.
+        """
+        for length, aggregator in reversed(self._levels):
+            if length_ns % length == 0:
+                return aggregator
+
+        return None
+
+    def frame(self, period: str, how: str = "count") -> Optional[pd.DataFrame]:
+        """
+        Returns the aggregates merged into ``period`` buckets, or None when no
+        resolution divides the period.
+        """
+        length = period_ns(period)
+        if length is None:
+            return None
+
+        aggregator = self.level(length)
+        if aggregator is None:
+            return None
+
+        return aggregator.frame(how, length)
+
+    def quantiles(
+        self, period: str, percentiles: Sequence[int]
+    ) -> Optional[pd.DataFrame]:
+        """
+        Returns every percentile of the values per ``period`` bucket, or None
+        when the rollup holds no quantile sketches or no resolution divides
+        the period.
+        """
+        length = period_ns(period)
+        if self.bins is None or length is None:
+            return None
+
+        aggregator = self.level(length)
+        if aggregator is None:
+            return None
+
+        return aggregator.quantiles(percentiles, length)
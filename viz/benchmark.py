@@ -0,0 +1,309 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from bokeh.models import ColumnDataSource, Model
+
+from viz.config import VIZ_DICTIONARY_COLUMNS
+from viz.mockdata import generate
+from viz.store import events
+from viz.store.events import EventStore
+from viz.store.index import InvertedIndex
+
+# (module, function) pairs timed as pipeline stages, patched where the charts
+# look them up
+STAGES: List[Tuple[str, str]] = [
+    ("viz.chart.charts", "get_data"),
+    ("viz.chart.chart_line", "resample_data"),
+    ("viz.chart.chart_bar", "preprocess_data"),
+    ("viz.chart.chart_lines", "prepare_and_aggregate_data"),
+    ("viz.chart.chart_heatmap", "prepare_and_aggregate_data"),
+    ("viz.chart.chart_percentiles", "resample_quantiles"),
+]
+
+Results = Dict[str, Dict[str, Dict[str, Dict[str, float]]]]
+
+
+def output_size(value: Any) -> int:
+    """
+    Returns the size in bytes of a stage's output. Figures count the columns
+    of their data sources, which is what gets shipped to the browser.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(index=False, deep=False)))
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+
+    if isinstance(value, str):
+        return len(value.encode())
+
+    if isinstance(value, Model):
+        return sum(
+            output_size(column)
+            for source in value.select({"type": ColumnDataSource})
+            for column in source.data.values()
+        )
+
+    if isinstance(value, (tuple, list)):
+        if value and not isinstance(value[0], (np.ndarray, tuple, list)):
+            return output_size(np.asarray(value))
+
+        return sum(output_size(item) for item in value)
+
+    return 0
+
+
+class Profiler:
+    """
+    Collects the latency, traced peak memory and output size of every stage.
+
+    Peak memory is only measured while ``tracemalloc`` is tracing, which
+    slows pandas down, so latency and memory come from separate runs.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+        # Highest traced memory seen by every open stage, innermost last, since
+        # a nested stage resets the peak its callers also depend on
+        self._peaks: List[int] = []
+
+    def record(self, stage: str, seconds: float, peak: int, size: int) -> None:
+        totals = self.stages.setdefault(
+            stage, {"seconds": 0.0, "peak_bytes": 0, "output_bytes": 0}
+        )
+        totals["seconds"] += seconds
+        totals["peak_bytes"] = max(totals["peak_bytes"], peak)
+        totals["output_bytes"] += size
+
+    def measure(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            self._peaks.append(baseline)
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+
+            peak = 0
+            if tracing:
+                absolute = max(tracemalloc.get_traced_memory()[1], self._peaks.pop())
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], absolute)
+                peak = absolute - baseline
+
+        self.record(stage, seconds, peak, output_size(result))
+
+        return result
+
+
+@contextmanager
+def instrumented(profiler: Profiler, with_worker: bool) -> Iterator[None]:
+    """
+    Routes the pipeline stages through ``profiler`` while active.
+
+    Without ``with_worker``, ``get_data`` loads the data inline like a
+    filtered request does, instead of reading the stats worker's results.
+    """
+    import importlib
+
+    import viz.chart.charts as charts
+
+    patched = []
+    for module_name, name in STAGES:
+        module = importlib.import_module(module_name)
+        original = getattr(module, name)
+        target = original
+
+        if name == "get_data" and not with_worker:
+            target = charts.load_data
+
+        def wrapper(*args, _stage=name, _target=target, **kwargs):
+            return profiler.measure(_stage, _target, *args, **kwargs)
+
+        setattr(module, name, wrapper)
+        patched.append((module, name, original))
+
+    try:
+        yield
+    finally:
+        for module, name, original in patched:
+            setattr(module, name, original)
+
+
+def install_store(
+    columns: Dict[str, np.ndarray],
+    indexes: Optional[Dict[str, InvertedIndex]] = None,
+) -> EventStore:
+    """
+    Makes a store of ``columns`` the process-wide one, with a newer version
+    so nothing cached for the previous store is reused.
+
+    ``indexes`` reuses the dictionary encoding of an earlier store of the same
+    columns, so a fresh store for every run costs little to build.
+    """
+    previous = events._store.version if events._store is not None else 0
+    store = EventStore(columns, version=previous + 1, indexes=indexes, copy=False)
+    events._store = store
+
+    return store
+
+
+def store_indexes(store: EventStore) -> Dict[str, InvertedIndex]:
+    return {name: store.index(name) for name in VIZ_DICTIONARY_COLUMNS if name in store}
+
+
+def run_chart(name: str, profiler: Profiler) -> None:
+    import viz.chart.charts as charts
+    from viz.chart.chart_builder import render_html_chart
+
+    plot = profiler.measure("build", getattr(charts, name))
+    profiler.measure("render_html_chart", render_html_chart, plot)
+
+
+def chart_names() -> List[str]:
+    import viz.chart.charts as charts
+
+    return sorted(name for name in dir(charts) if name.startswith("show_"))
+
+
+def benchmark(
+    sizes: Sequence[int],
+    charts: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    seed: int = 0,
+    with_worker: bool = False,
+    log: Callable[[str], None] = print,
+) -> Results:
+    """
+    Runs every chart at every data size.
+
+    Each chart runs once cold, ``repeat`` times for latency (the fastest run
+    is kept) and once under ``tracemalloc`` for peak memory. Every run gets a
+    fresh store, so rollups and invalid users are rebuilt rather than read
+    back from the previous run.
+
+    Returns:
+        Results: size -> chart -> stage -> ``seconds``, ``cold_seconds``,
+            ``peak_bytes`` and ``output_bytes``.
+    """
+    charts = list(charts or chart_names())
+    results: Results = {}
+
+    for size in sizes:
+        start = time.perf_counter()
+        columns = generate(size, seed)
+        indexes = store_indexes(install_store(columns))
+        log(f"{size} events generated in {time.perf_counter() - start:.2f}s")
+
+        results[str(size)] = {}
+        for name in charts:
+            runs: List[Profiler] = []
+
+            try:
+                for _ in range(repeat + 1):
+                    profiler = Profiler()
+                    install_store(columns, indexes)
+                    with instrumented(profiler, with_worker):
+                        run_chart(name, profiler)
+                    runs.append(profiler)
+
+                memory = Profiler()
+                install_store(columns, indexes)
+                tracemalloc.start()
+                try:
+                    with instrumented(memory, with_worker):
+                        run_chart(name, memory)
+                finally:
+                    tracemalloc.stop()
+
+            except Exception as exc:
+                log(f"{size} {name}: failed with {exc!r}")
+                results[str(size)][name] = {"error": {"message": repr(exc)}}
+                continue
+
+            cold, warm = runs[0], runs[1:]
+            stages: Dict[str, Dict[str, float]] = {}
+            for stage, totals in cold.stages.items():
+                stages[stage] = {
+                    "seconds": min(
+                        run.stages.get(stage, totals)["seconds"] for run in warm
+                    ),
+                    "cold_seconds": totals["seconds"],
+                    "peak_bytes": memory.stages.get(stage, {}).get("peak_bytes", 0),
+                    "output_bytes": totals["output_bytes"],
+                }
+
+            results[str(size)][name] = stages
+            log(
+                f"{size} {name}: "
+                + ", ".join(
+                    f"{stage} {values['seconds'] * 1000:.1f}ms"
+                    f" {values['peak_bytes'] / 1e6:.1f}MB peak"
+                    f" {values['output_bytes'] / 1e3:.1f}kB out"
+                    for stage, values in stages.items()
+                )
+            )
+
+    return results
+
+
+def compare(
+    results: Results,
+    baseline: Results,
+    tolerance: float,
+    floor_seconds: float = 0.005,
+) -> List[str]:
+    """
+    Lists the stages that got slower, hungrier or bigger than the baseline.
+
+    A metric regresses when it grows by more than ``tolerance`` (a fraction)
+    and, for latency, by more than ``floor_seconds``, which keeps timer noise
+    on very fast stages from failing the run.
+    """
+    regressions: List[str] = []
+
+    for size, charts in results.items():
+        for name, stages in charts.items():
+            for stage, values in stages.items():
+                expected = baseline.get(size, {}).get(name, {}).get(stage)
+                if not expected:
+                    continue
+
+                for metric in ("seconds", "peak_bytes", "output_bytes"):
+                    old, new = expected.get(metric), values.get(metric)
+                    if not old or new is None:
+                        continue
+
+                    if new <= old * (1 + tolerance):
+                        continue
+
+                    if metric == "seconds" and new - old <= floor_seconds:
+                        continue
+
+                    regressions.append(
+                        f"{size} {name} {stage} {metric}: {old:.4g} -> {new:.4g}"
+                    )
+
+    return regressions
+
+
+def load_results(path: str) -> Results:
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(results: Results, path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, sort_keys=True)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from viz.config import VIZ_PAGE_CACHE_SIZE, VIZ_PAGE_CACHE_TTL
+from viz.store.events import data_version, on_append
+
+CacheKey = Tuple[str, Tuple, int]
+
+
+def normalize_kwargs(kwargs: Dict) -> Tuple:
+    """
+    Turns chart kwargs into a hashable key that ignores argument order.
+    """
+    return tuple(
+        (name, value if isinstance(value, Hashable) else repr(value))
+        for name, value in sorted(kwargs.items())
+    )
+
+
+class PageCache:
+    """
+    TTL + LRU cache for fully rendered chart pages.
+
+    Entries are keyed on the view, its kwargs and the dataset version, so new
+    data never serves a stale page. Concurrent misses on the same key wait for
+    a single render instead of all rendering the page themselves.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._pending: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self, *args) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: CacheKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, page = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return page
+
+    def get(self, view: str, **kwargs) -> Optional[str]:
+        """
+        Returns the cached page for ``view`` without ever rendering it.
+        """
+        key: CacheKey = (view, normalize_kwargs(kwargs), data_version())
+
+        with self._lock:
+            return self._lookup(key)
+
+    def claim(
+        self, view: str, **kwargs
+    ) -> Tuple[CacheKey, Optional[str], Future, bool]:
+        """
+        Looks up the page of ``view`` and, on a miss, joins or starts its render.
+
+        Returns the cache key, the cached page (None on a miss), and on a miss
+        the future of the pending render and whether the caller owns it, in
+        which case it has to ``fill`` it.
+        """
+        key: CacheKey = (view, normalize_kwargs(kwargs), data_version())
+
+        with self._lock:
+            page = self._lookup(key)
+            if page is not None:
+                return key, page, Future(), False
+
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._pending[key] = pending
+
+        return key, None, pending, owner
+
+    def fill(
+        self, key: CacheKey, pending: Future, render: Callable[..., str], **kwargs
+    ) -> None:
+        """
+        Renders a claimed page and resolves its pending future with the page,
+        or with the exception of a failed render.
+        """
+        try:
+            page = render(**kwargs)
+        except BaseException as exc:
+            self.fail(key, pending, exc)
+            return
+
+        # The page is stored in the same step that retires the pending render,
+        # so a request arriving in between always finds one or the other
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, page)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+
+        if not pending.done():
+            pending.set_result(page)
+
+    def fail(self, key: CacheKey, pending: Future, exc: BaseException) -> None:
+        """
+        Resolves a claimed render that could not finish with ``exc``, so the
+        next request renders the page again.
+        """
+        with self._lock:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+
+        if not pending.done():
+            pending.set_exception(exc)
+
+    def get_or_render(self, view: str, render: Callable[..., str], **kwargs) -> str:
+        """
+        Returns the cached page for ``view``, calling ``render(**kwargs)`` on a miss.
+        """
+        key, page, pending, owner = self.claim(view, **kwargs)
+        if page is not None:
+            return page
+
+        if owner:
+            self.fill(key, pending, render, **kwargs)
+
+        return pending.result()
+
+
+page_cache = PageCache(VIZ_PAGE_CACHE_TTL, VIZ_PAGE_CACHE_SIZE)
+
+# New data makes every cached page unreachable, drop them right away
+on_append(page_cache.clear)
@@ -1,5 +1,6 @@
 from typing import Callable, List, Optional
 
+import numpy as np
 import pandas as pd
 from bokeh.models import (
     ColumnDataSource,
@@ -16,7 +17,10 @@ from viz.config import (
     VIZ_CHART_WIDTH,
     VIZ_CHART_HEIGHT,
 )
+from viz.chart.columns import source_data
 from viz.chart.theme import blues, reds
+from viz.threads.stats_worker import Aggregate, precomputed
+from viz.timing import timed
 from viz.utils import build_empty
 
 
@@ -27,26 +31,82 @@ def make_human_readable(key: str) -> str:
     return " ".join(word.capitalize() for word in key.split("_"))
 
 
-def preprocess_data(
+def group_codes(
+    groups: pd.Series,
+    values: Optional[pd.Series] = None,
+    value_avg: Optional[bool] = False,
+) -> pd.DataFrame:
+    """
+    Totals a dictionary-encoded column per category with ``bincount`` over its
+    codes. The groups stay categorical, so labels are only decoded for the
+    rows that end up plotted.
+    """
+    codes = groups.cat.codes.to_numpy()
+    present = codes >= 0
+    size = len(groups.cat.categories)
+
+    observed = np.bincount(codes[present], minlength=size)
+    if values is None:
+        totals = observed
+    else:
+        array = values.to_numpy(np.float64)
+        valid = present & ~np.isnan(array)
+        totals = np.bincount(codes[valid], weights=array[valid], minlength=size)
+
+        if value_avg:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                totals = totals / np.bincount(codes[valid], minlength=size)
+
+    kept = np.flatnonzero(observed)
+
+    return pd.DataFrame(
+        {
+            groups.name: pd.Categorical.from_codes(kept, dtype=groups.dtype),
+            "count" if values is None else "total_value": totals[kept],
+        }
+    )
+
+
+def group_values(
     data: pd.DataFrame,
     group_by: str,
-    lowest: bool = False,
-    lower_than: Optional[float] = None,
-    greater_than: Optional[float] = None,
     value_col: Optional[str] = None,
     value_avg: Optional[bool] = False,
 ) -> pd.DataFrame:
+    grouped = precomputed(data, Aggregate(None, value_col, bool(value_avg), group_by))
+    if grouped is not None:
+        return grouped
+
+    if isinstance(data[group_by].dtype, pd.CategoricalDtype) and (
+        not value_col or data[value_col].dtype.kind == "f"
+    ):
+        return group_codes(
+            data[group_by], data[value_col] if value_col else None, value_avg
+        )
+
     if value_col:
         agg_func = "mean" if value_avg else "sum"
-        grouped = (
-            data.groupby(group_by)[value_col]
+        return (
+            data.groupby(group_by, observed=True)[value_col]
             .agg(agg_func)
             .reset_index(name="total_value")
         )
-        value_column = "total_value"
-    else:
-        grouped = data.groupby(group_by).size().reset_index(name="count")
-        value_column = "count"
+
+    return data.groupby(group_by, observed=True).size().reset_index(name="count")
+
+
+@timed
+def preprocess_data(
+    data: pd.DataFrame,
+    group_by: str,
+    lowest: bool = False,
+    lower_than: Optional[float] = None,
+    greater_than: Optional[float] = None,
+    value_col: Optional[str] = None,
+    value_avg: Optional[bool] = False,
+) -> pd.DataFrame:
+    grouped = group_values(data, group_by, value_col, value_avg)
+    value_column = "total_value" if value_col else "count"
 
     if lower_than is not None:
         grouped = grouped[grouped[value_column] < lower_than]
@@ -60,7 +120,8 @@ def preprocess_data(
     # Limit the number of items to display if top_n is provided
     grouped = grouped.head(len(blues))
 
-    return grouped
+    # Only the displayed groups are decoded back to their labels
+    return grouped.astype({group_by: object})
 
 
 def create_chart(
@@ -79,7 +140,7 @@ def create_chart(
         stylesheets.append(InlineStyleSheet(css=kwargs["custom_css"]))
 
     # Create a ColumnDataSource from the grouped data
-    source = ColumnDataSource(grouped)
+    source = ColumnDataSource(source_data(grouped, [group_by, value_column]))
 
     # Create the bar chart figure
     plot = figure(
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 from bokeh.models import (
     DataRange1d,
@@ -10,13 +11,88 @@ from bokeh.models import (
 from bokeh.models.formatters import DatetimeTickFormatter
 from bokeh.plotting import figure
 
+from viz.aggregate.buckets import period_ns
+from viz.aggregate.hyperloglog import (
+    DistinctBucketAggregator,
+    hash_values,
+    precision_for,
+)
 from viz.config import (
     VIZ_CHART_WIDTH,
     VIZ_CHART_HEIGHT,
+    VIZ_DISTINCT_ERROR,
+    VIZ_DISTINCT_EXACT_ROWS,
 )
-from viz.utils import build_insert, last_cycle
+from viz.store.events import get_store
+from viz.threads.stats_worker import Aggregate, precomputed
+from viz.timing import timed
+from viz.utils import last_cycle
+
+
+def resample_from_store(
+    data: pd.DataFrame,
+    period: str,
+    key_mean: bool = False,
+    key_sum: Optional[str] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Reads the resampled frame from the store's running rollups.
+
+    Only frames coming straight from ``get_data`` carry their selection; the
+    row count check catches frames that were filtered afterwards or that
+    predate newly appended events. Returns None when pandas has to resample.
+    """
+    selection = data.attrs.get("selection")
+    if selection is None:
+        return None
+
+    key = key_sum if key_sum is not None and key_sum in data.columns else None
+    rollup = get_store().rollup(selection, key)
+    if rollup is None or rollup.rows != len(data):
+        return None
+
+    if key is None:
+        return rollup.frame(period, "count")
+
+    return rollup.frame(period, "mean" if key_mean else "sum")
 
 
+def resample_distinct(
+    data: pd.DataFrame, period: str, key_sum: str
+) -> Optional[pd.DataFrame]:
+    """
+    Estimates the distinct values of ``key_sum`` per period with HyperLogLog
+    sketches, within the ``VIZ_DISTINCT_ERROR`` standard error.
+
+    Frames coming straight from ``get_data`` merge the store's per-bucket
+    sketches, other frames are sketched on the fly. Returns None for exact
+    counts, the default, which small frames always get.
+    """
+    if VIZ_DISTINCT_ERROR is None or len(data) < VIZ_DISTINCT_EXACT_ROWS:
+        return None
+
+    length = period_ns(period)
+    if length is None:
+        return None
+
+    precision = precision_for(VIZ_DISTINCT_ERROR)
+
+    selection = data.attrs.get("selection")
+    if selection is not None:
+        rollup = get_store().rollup(selection, key_sum, precision=precision)
+        if rollup is not None and rollup.rows == len(data):
+            resampled = rollup.frame(period, "nunique")
+            if resampled is not None:
+                return resampled
+
+    hashes, present = hash_values(data[key_sum])
+    aggregator = DistinctBucketAggregator(length, precision)
+    aggregator.add(data["created"].to_numpy(), hashes, present=present)
+
+    return aggregator.frame("nunique")
+
+
+@timed
 def resample_data(
     data: pd.DataFrame,
     period: str,
@@ -24,6 +100,14 @@ def resample_data(
     key_sum: Optional[str] = None,
     **kwargs
 ) -> pd.DataFrame:
+    resampled = precomputed(data, Aggregate(period, key_sum, bool(key_mean)))
+    if resampled is not None:
+        return resampled
+
+    resampled = resample_from_store(data, period, key_mean, key_sum)
+    if resampled is not None:
+        return resampled
+
     # Resample data to the specified period and sum or count values
     if key_sum is None or key_sum not in data.columns:
         resampled = (
@@ -56,7 +140,11 @@ def resample_data(
                     .reset_index()
                 )
             else:
-                # If numeric, sum the values
+                # Distinct values, estimated from sketches on large data
+                resampled = resample_distinct(data, period, key_sum)
+                if resampled is not None:
+                    return resampled
+
                 resampled = (
                     data.set_index("created")
                     .resample(period)
@@ -68,6 +156,7 @@ def resample_data(
     return resampled
 
 
+@timed
 def apply_smoothing(
     resampled: pd.DataFrame, window_size: int, **kwargs
 ) -> pd.DataFrame:
@@ -83,38 +172,99 @@ def apply_smoothing(
     return resampled
 
 
+@timed
 def build_data_boundaries(
-    resampled: pd.DataFrame, period: str, **kwargs
+    resampled: pd.DataFrame, period: str, group_by: Optional[str] = None, **kwargs
 ) -> pd.DataFrame:
-    rows: List[pd.DataFrame] = []
-    tdelta = pd.Timedelta(period)
+    """
+    Pads the resampled data with zero rows at the lookback start, right before
+    the first and after the last period, and at the current time.
 
-    should_trail: bool = kwargs.get("trail_values", False)
+    With ``group_by`` every group gets its own padding, so each line of a
+    multi-line chart drops to zero around its data. All rows are written into
+    preallocated arrays in one pass.
+    """
+    tdelta = pd.Timedelta(period).value
 
-    rows.append(build_insert(last_cycle(), period))
-    if len(resampled) > 0:
-        rows.append(build_insert(resampled.iloc[0]["period"] - tdelta, period))
-    rows.append(resampled)
+    def floor(values):
+        return values - values % tdelta
+
+    lookback = floor(np.datetime64(last_cycle(), "ns").astype(np.int64))
+    now = floor(np.datetime64(datetime.now(), "ns").astype(np.int64))
+
+    if len(resampled) < 1:
+        return pd.DataFrame(
+            {
+                "count": np.zeros(2),
+                "period": np.array([lookback, now]).view("datetime64[ns]"),
+                "count_smoothed": np.zeros(2),
+            }
+        )
 
     # Trail the last value to the right side of the chart
     # Makes some charts look less buggy (weights & averages)
-    if len(resampled) > 0 and should_trail:
-        rows.append(
-            build_insert(
-                #
-                datetime.now(),
-                period,
-                last_count=resampled.iloc[-1]["count"],
-            )
-        )
+    should_trail: bool = kwargs.get("trail_values", False)
 
+    if group_by is not None and group_by in resampled.columns:
+        codes, labels = pd.factorize(
+            resampled[group_by], sort=True, use_na_sentinel=False
+        )
     else:
-        rows.append(build_insert(resampled.iloc[-1]["period"] + tdelta, period))
-        rows.append(build_insert(datetime.now(), period))
+        codes, labels = np.zeros(len(resampled), dtype=np.int64), None
+
+    # Lay the groups out one after the other, each one as
+    # [lookback, first - period, *rows, last + period, now]
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes)
+    ends = np.cumsum(counts)
+    lead, tail = 2, 1 if should_trail else 2
+    sizes = counts + lead + tail
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    total = int(sizes.sum())
+
+    ranks = np.arange(len(order)) - np.repeat(ends - counts, counts)
+    positions = starts[codes[order]] + lead + ranks
+    after = starts + lead + counts
+
+    periods = resampled["period"].to_numpy("datetime64[ns]").view(np.int64)[order]
+    last_counts = resampled["count"].to_numpy(np.float64)[order][ends - 1]
+
+    padded = {}
+    for name in resampled.columns:
+        if name == "period":
+            values = np.empty(total, dtype=np.int64)
+            values[starts] = lookback
+            values[starts + 1] = floor(periods[ends - counts] - tdelta)
+            if should_trail:
+                values[after] = now
+            else:
+                values[after] = floor(periods[ends - 1] + tdelta)
+                values[after + 1] = now
+            values[positions] = periods
+            values = values.view("datetime64[ns]")
+
+        elif name == group_by and labels is not None:
+            values = np.repeat(np.asarray(labels, dtype=object), sizes)
+
+        elif name in ("count", "count_smoothed"):
+            values = np.zeros(total)
+            if should_trail:
+                values[after] = last_counts
+            values[positions] = resampled[name].to_numpy(np.float64)[order]
+
+        else:
+            column = resampled[name].to_numpy()
+            values = np.full(
+                total, np.nan, dtype=float if column.dtype.kind in "iufb" else object
+            )
+            values[positions] = column[order]
+
+        padded[name] = values
 
-    return pd.concat(rows, ignore_index=True)
+    return pd.DataFrame(padded)
 
 
+@timed
 def create_plot(title: str, stylesheets: List[InlineStyleSheet], **kwargs) -> figure:
     plot = figure(
         tools="",
@@ -1,16 +1,219 @@
-from typing import List
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from string import Template
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
 
-from bokeh.embed import file_html
+from bokeh.embed import file_html, json_item
 from bokeh.layouts import column
+from bokeh.models import ColumnDataSource, GlyphRenderer
 from bokeh.plotting import figure
 from bokeh.resources import CDN
 
+from viz.config import VIZ_CHART_REFRESH, VIZ_CHART_WORKERS
+from viz.timing import for_chart, stage
+from viz.chart.columns import binary_columns, json_columns
 from viz.chart.theme import (
     cleanup,
     add_autoreload,
     find_theme,
 )
 
+SHELL_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>Human Validator Bot</title>
+    $resources
+    <style>
+        body {
+            margin: 0;
+        }
+    </style>
+</head>
+<body>
+    <div id="charts"></div>
+    <noscript><a href="?static=1">Show the charts without JavaScript</a></noscript>
+    <script>
+    (async function () {
+        let etag = null;
+        let version = null;
+
+        // The ETag of the item and data ends with the data version
+        function track(response) {
+            etag = response.headers.get("ETag");
+            const match = etag && etag.match(/(\\d+)"?$$/);
+            version = match ? parseInt(match[1]) : null;
+        }
+
+        const item = await fetch("$item_url", { cache: "no-cache" });
+        track(item);
+        await Bokeh.embed.embed_item(await item.json(), "charts");
+        const doc = Bokeh.documents[Bokeh.documents.length - 1];
+
+        // Fetches every source column again, the layout stays in place
+        async function refresh() {
+            const headers = etag ? { "If-None-Match": etag } : {};
+            const response = await fetch("$data_url", { headers, cache: "no-cache" });
+            if (response.status !== 200) {
+                return;
+            }
+
+            track(response);
+            const sources = await response.json();
+            for (const [name, data] of Object.entries(sources)) {
+                const source = doc.get_model_by_name(name);
+                if (source) {
+                    source.data = Object.fromEntries(
+                        Object.entries(data).map(([key, column]) => [key, decode(column)])
+                    );
+                }
+            }
+        }
+
+        const ARRAYS = {
+            float64: Float64Array,
+            float32: Float32Array,
+            int32: Int32Array,
+            uint8: Uint8Array,
+        };
+
+        // Numeric columns arrive as base64 typed arrays, labels as JSON lists
+        function decode(column) {
+            if (Array.isArray(column)) {
+                return column.map((item) => (item && item.dtype ? decode(item) : item));
+            }
+
+            const bytes = Uint8Array.from(atob(column.data), (char) => char.charCodeAt(0));
+            return new ARRAYS[column.dtype](bytes.buffer);
+        }
+
+        // Applies the changed rows and the appended rows of a source
+        function apply(source, diff) {
+            if (diff.data) {
+                source.data = diff.data;
+                return;
+            }
+
+            const data = {};
+            for (const [name, values] of Object.entries(source.data)) {
+                const column = Array.from(values);
+                diff.rows.forEach((row, index) => {
+                    column[row] = diff.columns[name][index];
+                });
+                data[name] = column.concat(diff.append[name] || []);
+            }
+            source.data = data;
+        }
+
+        // Polls the data until the event stream is open, and again whenever
+        // it drops or the server does not stream (a 204 under WSGI)
+        let timer = null;
+        function poll() {
+            timer = timer ?? setInterval(refresh, $interval);
+        }
+        function unpoll() {
+            clearInterval(timer);
+            timer = null;
+        }
+
+        poll();
+        if (!window.EventSource) {
+            return;
+        }
+
+        const events = new EventSource("$events_url?version=" + (version ?? ""));
+        events.addEventListener("open", unpoll);
+        events.addEventListener("error", poll);
+
+        events.addEventListener("update", (event) => {
+            const update = JSON.parse(event.data);
+            if (update.since !== version) {
+                refresh();
+                return;
+            }
+
+            for (const [name, diff] of Object.entries(update.sources)) {
+                const source = doc.get_model_by_name(name);
+                if (source) {
+                    apply(source, diff);
+                }
+            }
+            version = update.version;
+        });
+
+        events.addEventListener("reload", refresh);
+    })();
+    </script>
+</body>
+</html>
+""")
+
+
+class ChartSpec(NamedTuple):
+    """
+    A chart that still has to be built, e.g. ``ChartSpec(show_votes, {"period": "1h"})``.
+    """
+
+    func: Callable[..., figure]
+    kwargs: Dict[str, Any] = {}
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=VIZ_CHART_WORKERS, thread_name_prefix="viz-chart"
+                )
+
+    return _executor
+
+
+def run_spec(spec: ChartSpec) -> figure:
+    name = getattr(spec.func, "__name__", "chart")
+    with for_chart(name), stage("chart"):
+        return spec.func(**spec.kwargs)
+
+
+def build_figures(charts: Sequence[Union[figure, ChartSpec]]) -> List[figure]:
+    """
+    Builds every ChartSpec on the bounded chart pool, keeping the given order.
+
+    Most of the time of a chart goes to pandas aggregations that release the
+    GIL, so a page takes about as long as its slowest chart. Figures that are
+    already built are passed through untouched.
+    """
+    specs = [chart for chart in charts if isinstance(chart, ChartSpec)]
+    if len(specs) < 2:
+        return [
+            run_spec(chart) if isinstance(chart, ChartSpec) else chart
+            for chart in charts
+        ]
+
+    # Chart threads report their timings to the request that started them
+    executor = get_executor()
+    futures = [
+        (
+            executor.submit(copy_context().run, run_spec, chart)
+            if isinstance(chart, ChartSpec)
+            else None
+        )
+        for chart in charts
+    ]
+
+    return [
+        future.result() if future is not None else chart
+        for chart, future in zip(charts, futures)
+    ]
+
 
 def build_chart(chart_funcs: List[figure]) -> figure:
     to_return = column(
@@ -38,17 +241,96 @@ def show_chart_types(*chart_funcs: List[figure], **kwargs) -> None:
     sys.exit(0)
 
 
-def render_html_chart(*chart_funcs: List[figure], **kwargs) -> str:
-    theme = find_theme(**kwargs)
-    return add_autoreload(
-        cleanup(
-            file_html(
-                build_chart(chart_funcs),
-                CDN,
-                theme=theme,
-                title="Human Validator Bot",
-            ),
-            **kwargs,
+def name_sources(charts: Sequence[figure]) -> Dict[str, ColumnDataSource]:
+    """
+    Gives every data source a stable name based on the chart and renderer
+    positions, so a page can find them again in a later render. A source
+    shared by several renderers keeps the name of the first one and is
+    listed once.
+    """
+    sources: Dict[str, ColumnDataSource] = {}
+    named = set()
+
+    for chart_index, chart in enumerate(charts):
+        renderers = [
+            renderer
+            for renderer in chart.renderers
+            if isinstance(renderer, GlyphRenderer)
+        ]
+        for renderer_index, renderer in enumerate(renderers):
+            if renderer.data_source.id in named:
+                continue
+            named.add(renderer.data_source.id)
+
+            name = f"chart-{chart_index}-{renderer_index}"
+            renderer.data_source.name = name
+            sources[name] = renderer.data_source
+
+    return sources
+
+
+def render_json_item(*chart_funcs: Union[figure, ChartSpec], **kwargs) -> str:
+    """
+    Renders the page layout as a ``json_item`` for ``Bokeh.embed.embed_item``.
+    """
+    charts = build_figures(chart_funcs)
+    name_sources(charts)
+
+    with stage("json_item"):
+        item = json_item(build_chart(charts), theme=find_theme(**kwargs))
+
+    return json.dumps(item)
+
+
+def render_columns(
+    *chart_funcs: Union[figure, ChartSpec], **kwargs
+) -> Dict[str, Dict[str, List]]:
+    """
+    Returns the JSON-ready columns of every named data source of the page.
+    """
+    sources = name_sources(build_figures(chart_funcs))
+
+    with stage("json_data"):
+        return {name: json_columns(source) for name, source in sources.items()}
+
+
+def render_json_data(*chart_funcs: Union[figure, ChartSpec], **kwargs) -> str:
+    """
+    Renders only the columns of every named data source of the page, numeric
+    ones as base64 typed arrays like in the page itself.
+    """
+    sources = name_sources(build_figures(chart_funcs))
+
+    with stage("json_data"):
+        return json.dumps(
+            {name: binary_columns(source) for name, source in sources.items()}
+        )
+
+
+def render_html_shell(item_url: str, data_url: str, events_url: str, **kwargs) -> str:
+    """
+    Renders a static page that embeds the layout from ``item_url`` and then
+    applies the source changes pushed by ``events_url``, falling back to
+    polling every source column from ``data_url`` while no event stream is
+    open.
+    """
+    return cleanup(
+        SHELL_TEMPLATE.substitute(
+            resources=CDN.render_js(),
+            item_url=item_url,
+            data_url=data_url,
+            events_url=events_url,
+            interval=VIZ_CHART_REFRESH * 1000,
         ),
         **kwargs,
     )
+
+
+def render_html_chart(*chart_funcs: Union[figure, ChartSpec], **kwargs) -> str:
+    theme = find_theme(**kwargs)
+    layout = build_chart(build_figures(chart_funcs))
+
+    with stage("file_html"):
+        html = file_html(layout, CDN, theme=theme, title="Human Validator Bot")
+
+    return add_autoreload(cleanup(html, **kwargs), **kwargs)
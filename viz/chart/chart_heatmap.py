@@ -0,0 +1,159 @@
+from collections import Counter
+from typing import Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+from bokeh.models import (
+    ColorBar,
+    ColumnDataSource,
+    FactorRange,
+    HoverTool,
+    InlineStyleSheet,
+    LinearColorMapper,
+)
+from bokeh.plotting import figure
+
+from viz.aggregate.correlation import correlate_groups
+from viz.config import (
+    VIZ_CHART_HEIGHT,
+    VIZ_CHART_INTERVAL,
+    VIZ_CHART_WIDTH,
+    VIZ_CORRELATION_TOP,
+)
+from viz.chart.chart_bar import chart_bar, make_human_readable
+from viz.chart.chart_lines import prepare_and_aggregate_data
+from viz.chart.columns import plot_column
+from viz.chart.theme import blues, reds
+from viz.utils import build_empty
+
+# Negative correlations in red, positive ones in blue, brightest at -1 and 1
+DIVERGING = reds + blues[::-1]
+
+# Longer labels (e.g. hotkeys) are shortened to their first and last characters
+LABEL_LENGTH = 12
+
+
+def factor_labels(labels: Sequence[Any]) -> List[str]:
+    """
+    Turns group labels into axis factors that are short and unique.
+
+    Long labels keep their first and last characters, the way hotkeys are
+    usually abbreviated. Labels that would still share a factor, shortened
+    or not (e.g. ``1`` and ``"1"``), get a running number.
+    """
+    names = ["Unknown" if label is None else str(label) for label in labels]
+
+    factors = [
+        f"{name[:6]}…{name[-4:]}" if len(name) > LABEL_LENGTH else name
+        for name in names
+    ]
+    counts = Counter(factors)
+    factors = [
+        name if counts[factor] > 1 and len(name) > LABEL_LENGTH else factor
+        for name, factor in zip(names, factors)
+    ]
+
+    unique: List[str] = []
+    used = set()
+    for factor in factors:
+        candidate, number = factor, 1
+        while candidate in used:
+            number += 1
+            candidate = f"{factor} ({number})"
+
+        used.add(candidate)
+        unique.append(candidate)
+
+    return unique
+
+
+def chart_heatmap(
+    data: pd.DataFrame,
+    title: str,
+    group_by: str,
+    **kwargs,
+) -> figure:
+    """
+    Creates a heatmap of how the event counts of the busiest groups
+    correlate over time.
+
+    Args:
+        data (pd.DataFrame): The input DataFrame containing the data.
+        title (str): The title of the chart.
+        group_by (str): The column name to group the data by.
+        **kwargs: Additional keyword arguments.
+            period (str): The bucket length the counts are correlated over.
+            top (int): The number of busiest groups shown.
+
+    Returns:
+        bokeh.plotting.figure: The heatmap figure.
+    """
+    if len(data) < 1 or group_by not in data.columns:
+        return chart_bar(build_empty(), title, "_id")
+
+    period: str = kwargs.pop("period", VIZ_CHART_INTERVAL)
+    top: int = int(kwargs.pop("top", VIZ_CORRELATION_TOP))
+
+    grouped = prepare_and_aggregate_data(data, period, group_by, None, False)
+    labels, correlation = correlate_groups(grouped, group_by, period, top)
+    names = ["Unknown" if label is None else str(label) for label in labels]
+    factors = factor_labels(labels)
+
+    stylesheets: List[InlineStyleSheet] = []
+    if kwargs.get("custom_css", False):
+        stylesheets.append(InlineStyleSheet(css=kwargs["custom_css"]))
+
+    size = len(factors)
+    source = ColumnDataSource(
+        {
+            "x": np.repeat(factors, size).astype(object),
+            "y": np.tile(factors, size).astype(object),
+            "x_label": np.repeat(names, size).astype(object),
+            "y_label": np.tile(names, size).astype(object),
+            "correlation": plot_column(correlation.ravel()),
+        }
+    )
+
+    plot = figure(
+        tools="",
+        width=VIZ_CHART_WIDTH,
+        height=VIZ_CHART_HEIGHT,
+        toolbar_location=None,
+        sizing_mode="stretch_both",
+        x_range=FactorRange(*factors),
+        y_range=FactorRange(*factors[::-1]),
+        stylesheets=stylesheets,
+    )
+
+    plot.title.text = title if not kwargs.get("notitle", False) else None
+
+    label = make_human_readable(group_by)
+    plot.add_tools(
+        HoverTool(
+            tooltips=[
+                (label, "@x_label"),
+                (label, "@y_label"),
+                ("Correlation", "@correlation{0.00}"),
+            ]
+        )
+    )
+
+    mapper = LinearColorMapper(palette=DIVERGING, low=-1, high=1, nan_color="#00000000")
+
+    plot.rect(
+        x="x",
+        y="y",
+        width=1,
+        height=1,
+        source=source,
+        line_color=None,
+        fill_color={"field": "correlation", "transform": mapper},
+    )
+
+    plot.add_layout(ColorBar(color_mapper=mapper), "right")
+
+    plot.grid.grid_line_color = None
+    plot.axis.major_label_text_font_size = "8pt"
+    plot.xaxis.major_label_orientation = np.pi / 2
+
+    return plot
@@ -17,6 +17,8 @@ from viz.chart.chart_base import (
     create_plot,
     resample_data,
 )
+from viz.chart.columns import source_data
+from viz.chart.downsample import downsample_data
 from viz.utils import build_empty
 
 
@@ -40,6 +42,7 @@ def chart_line(
             period (str): The resampling period (e.g., '5min', '1h').
             key_sum (str): The column name to sum values for.
             key_mean (bool): If we should average the values
+            downsample (int | bool): Maximum points drawn, capped by the chart width
 
     Returns:
         bokeh.plotting.figure: The line chart figure.
@@ -48,13 +51,16 @@ def chart_line(
         return chart_line(build_empty(key_sum), title=title)
 
     data["created"] = pd.to_datetime(data["created"], unit="s")
-    period: str = kwargs.get("period", VIZ_CHART_INTERVAL)
+    period: str = kwargs.pop("period", VIZ_CHART_INTERVAL)
 
-    resampled = resample_data(data, period, key_sum, key_mean, **kwargs)
+    resampled = resample_data(
+        data, period, key_mean=key_mean, key_sum=key_sum, **kwargs
+    )
     resampled = apply_smoothing(resampled, VIZ_CHART_SMOOTH, **kwargs)
+    resampled = downsample_data(resampled, **kwargs)
     resampled = build_data_boundaries(resampled, period, **kwargs)
 
-    source = ColumnDataSource(resampled)
+    source = ColumnDataSource(source_data(resampled, ["period", "count_smoothed"]))
 
     stylesheets: List[InlineStyleSheet] = []
     if kwargs.get("custom_css", False):
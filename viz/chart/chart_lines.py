@@ -1,6 +1,9 @@
 import random
+from functools import lru_cache
+from itertools import cycle
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 from bokeh.models import (
     ColumnDataSource,
@@ -18,13 +21,70 @@ from viz.chart.chart_base import (
     create_plot,
 )
 from viz.chart.chart_line import chart_line
+from viz.chart.columns import plot_column, source_data
+from viz.chart.downsample import downsample_data
 from viz.chart.theme import generate_colors
+from viz.store.events import get_store
+from viz.threads.stats_worker import Aggregate, precomputed
+from viz.timing import timed
 from viz.utils import build_empty
 
-random.seed(100)
-COLORS: List[str] = generate_colors(256)
 
+@lru_cache(maxsize=None)
+def get_colors() -> List[str]:
+    """
+    Returns the line colors, generated on first use with a fixed seed so
+    every process draws the same groups in the same colors.
+    """
+    random.seed(100)
+    return generate_colors(256)
+
+
+def aggregate_from_store(
+    data: pd.DataFrame,
+    period: str,
+    group_by: str,
+    key_sum: Optional[str],
+    key_mean: bool,
+) -> Optional[pd.DataFrame]:
+    """
+    Reads the grouped aggregates from the store's running rollups.
+
+    Returns None when the frame did not come straight from ``get_data`` or
+    the rollups cannot answer the period, in which case pandas aggregates.
+    """
+    selection = data.attrs.get("selection")
+    if selection is None or group_by not in data.columns:
+        return None
+
+    if key_sum and key_sum not in data.columns:
+        return None
+
+    store = get_store()
+    rollup = store.rollup(selection, key_sum, group_by)
+    if rollup is None or rollup.rows != len(data):
+        return None
+
+    cells = rollup.frame(
+        period, ("mean" if key_mean else "sum") if key_sum else "count"
+    )
+    if cells is None:
+        return None
+
+    resampled = pd.DataFrame(
+        {
+            "created": cells["period"],
+            group_by: store.index(group_by).labels(cells["code"].to_numpy()),
+            "_id": cells["size"],
+        }
+    )
+    if key_sum:
+        resampled[key_sum] = cells["count"]
+
+    return resampled.sort_values(["created", group_by], ignore_index=True)
 
+
+@timed
 def prepare_and_aggregate_data(
     data: pd.DataFrame,
     period: str,
@@ -45,6 +105,16 @@ def prepare_and_aggregate_data(
     Returns:
         pd.DataFrame: The processed DataFrame ready for plotting.
     """
+    resampled_data = precomputed(
+        data, Aggregate(period, key_sum, bool(key_mean), group_by)
+    )
+    if resampled_data is not None:
+        return resampled_data
+
+    resampled_data = aggregate_from_store(data, period, group_by, key_sum, key_mean)
+    if resampled_data is not None:
+        return resampled_data
+
     data["created"] = pd.to_datetime(data["created"], unit="s")
 
     aggregation = {"_id": "size"}  # Default aggregation
@@ -54,7 +124,7 @@ def prepare_and_aggregate_data(
     # Resample data with grouping
     resampled_data = (
         data.set_index("created")
-        .groupby([pd.Grouper(freq=period), group_by])
+        .groupby([pd.Grouper(freq=period), group_by], observed=True)
         .agg(aggregation)
         .reset_index()
     )
@@ -62,6 +132,51 @@ def prepare_and_aggregate_data(
     return resampled_data
 
 
+def create_multi_line(
+    plot: figure, resampled: pd.DataFrame, group_by: str
+) -> ColumnDataSource:
+    """
+    Draws every group as one entry of a single ``multi_line`` glyph.
+
+    The groups are packed into one source holding the x/y arrays of each
+    line and its color, instead of one source and renderer per group.
+
+    Returns:
+        ColumnDataSource: The source backing the lines.
+    """
+    codes, labels = pd.factorize(resampled[group_by], sort=True)
+    colors = get_colors()
+
+    # Rows without a group are skipped, like groupby does
+    present = codes >= 0
+    codes = codes[present]
+    order = np.argsort(codes, kind="stable")
+    splits = np.cumsum(np.bincount(codes, minlength=len(labels)))[:-1]
+
+    periods = resampled["period"].to_numpy("datetime64[ns]")[present][order]
+    counts = resampled["count_smoothed"].to_numpy(np.float64)[present][order]
+
+    source = ColumnDataSource(
+        {
+            "xs": np.split(plot_column(periods), splits),
+            "ys": np.split(counts, splits),
+            group_by: list(labels),
+            "color": [colors[code % len(colors)] for code in range(len(labels))],
+        }
+    )
+
+    plot.multi_line(
+        "xs",
+        "ys",
+        source=source,
+        line_color="color",
+        line_width=3,
+        line_alpha=0.4,
+    )
+
+    return source
+
+
 def create_chart(
     title: str,
     stylesheets: List[InlineStyleSheet],
@@ -77,17 +192,24 @@ def create_chart(
         title (str): The title of the chart.
         group_by (str): The column used for grouping the data.
         stylesheets (List[InlineStyleSheet]): A list of custom stylesheets.
+        **kwargs: Additional keyword arguments.
+            batched (bool): Draw all groups with a single multi_line glyph
+                (default), or one line renderer per group when False.
 
     Returns:
         bokeh.plotting.figure: The configured and populated plot.
     """
     plot = create_plot(title, stylesheets, use_tool=False, **kwargs)
 
-    grouped_data = resampled.groupby(group_by)
-    color_cycle = iter(COLORS)
+    if kwargs.get("batched", True):
+        create_multi_line(plot, resampled, group_by)
+        return plot
+
+    grouped_data = resampled.groupby(group_by, observed=True)
+    color_cycle = cycle(get_colors())
 
     for _group, sub_df in grouped_data:
-        source = ColumnDataSource(sub_df)
+        source = ColumnDataSource(source_data(sub_df, ["period", "count_smoothed"]))
         color = next(color_cycle)
 
         plot.line(
@@ -131,7 +253,7 @@ def chart_lines(
     if len(data) < 1:
         return chart_line(build_empty(key_sum), title=title)
 
-    period: str = kwargs.get("period", VIZ_CHART_INTERVAL)
+    period: str = kwargs.pop("period", VIZ_CHART_INTERVAL)
 
     stylesheets: List[InlineStyleSheet] = []
     if kwargs.get("custom_css", False):
@@ -146,7 +268,8 @@ def chart_lines(
         resampled = resampled.rename(columns={"_id": "count"})
 
     resampled = apply_smoothing(resampled, VIZ_CHART_SMOOTH, **kwargs)
-    resampled = build_data_boundaries(resampled, period, **kwargs)
+    resampled = downsample_data(resampled, group_by=group_by, **kwargs)
+    resampled = build_data_boundaries(resampled, period, group_by=group_by, **kwargs)
 
     plot = create_chart(title, stylesheets, resampled, group_by, **kwargs)
 
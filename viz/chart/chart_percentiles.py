@@ -0,0 +1,132 @@
+from typing import List, Sequence
+
+import pandas as pd
+from bokeh.models import (
+    ColumnDataSource,
+    HoverTool,
+    InlineStyleSheet,
+)
+from bokeh.plotting import figure
+
+from viz.aggregate.buckets import period_ns
+from viz.aggregate.quantiles import QuantileBucketAggregator
+from viz.config import (
+    VIZ_CHART_INTERVAL,
+    VIZ_LATENCY_PERCENTILES,
+)
+from viz.chart.chart_base import create_plot
+from viz.chart.chart_line import chart_line
+from viz.chart.columns import source_data
+from viz.store.events import QUANTILE_BINS, get_store
+from viz.timing import timed
+from viz.utils import build_empty
+
+
+@timed
+def resample_quantiles(
+    data: pd.DataFrame, period: str, key: str, percentiles: Sequence[int]
+) -> pd.DataFrame:
+    """
+    Computes percentiles of ``key`` per period from quantile sketches.
+
+    Frames coming straight from ``get_data`` merge the store's per-bucket
+    sketches, other frames are sketched on the fly. Periods the sketches
+    cannot be bucketed by fall back to exact pandas quantiles.
+
+    Returns:
+        pd.DataFrame: ``period`` and a ``p{percentile}`` column per percentile.
+    """
+    selection = data.attrs.get("selection")
+    if selection is not None:
+        rollup = get_store().rollup(selection, key, quantiles=True)
+        if rollup is not None and rollup.rows == len(data):
+            resampled = rollup.quantiles(period, percentiles)
+            if resampled is not None:
+                return resampled
+
+    length = period_ns(period)
+    if length is None:
+        resampler = data.set_index("created").resample(period)[key]
+        resampled = pd.DataFrame(
+            {f"p{value}": resampler.quantile(value / 100) for value in percentiles}
+        )
+        return resampled.rename_axis("period").reset_index()
+
+    aggregator = QuantileBucketAggregator(length, QUANTILE_BINS)
+    aggregator.add(data["created"].to_numpy(), data[key].to_numpy())
+
+    return aggregator.quantiles(percentiles)
+
+
+def chart_percentiles(
+    data: pd.DataFrame,
+    title: str,
+    key: str,
+    percentiles: Sequence[int] = VIZ_LATENCY_PERCENTILES,
+    **kwargs,
+) -> figure:
+    """
+    Creates a line chart of percentiles of a value over time, with the
+    lowest percentile as a line and bands up to each higher one.
+
+    Args:
+        data (pd.DataFrame): The input DataFrame containing the data.
+        title (str): The title of the chart.
+        key (str): The column name of the values.
+        percentiles (Sequence[int]): The percentiles drawn, ascending.
+        **kwargs: Additional keyword arguments.
+            period (str): The resampling period (e.g., '5min', '1h').
+
+    Returns:
+        bokeh.plotting.figure: The percentile chart figure.
+    """
+    if len(data) < 1 or key not in data.columns:
+        return chart_line(build_empty(key), title=title)
+
+    period: str = kwargs.pop("period", VIZ_CHART_INTERVAL)
+    percentiles = sorted(percentiles)
+
+    resampled = resample_quantiles(data, period, key, percentiles)
+    columns = [f"p{value}" for value in percentiles]
+
+    stylesheets: List[InlineStyleSheet] = []
+    if kwargs.get("custom_css", False):
+        stylesheets.append(InlineStyleSheet(css=kwargs["custom_css"]))
+
+    plot = create_plot(title, stylesheets, **kwargs)
+    source = ColumnDataSource(source_data(resampled, ["period", *columns]))
+
+    # Bands fade out towards the tail
+    for position, (lower, upper) in enumerate(zip(columns, columns[1:])):
+        plot.varea(
+            x="period",
+            y1=lower,
+            y2=upper,
+            source=source,
+            fill_color="white",
+            fill_alpha=0.3 / (position + 1),
+        )
+
+    line = plot.line(
+        "period",
+        columns[0],
+        source=source,
+        color="white",
+        line_width=2,
+        line_alpha=0.5,
+    )
+
+    plot.add_tools(
+        HoverTool(
+            tooltips=[
+                ("Date", "@period{%F}"),
+                ("Time", "@period{%T}"),
+                *[(column, f"@{column}{{0,0.00}}") for column in columns],
+            ],
+            formatters={"@period": "datetime"},
+            mode="vline",
+            renderers=[line],
+        )
+    )
+
+    return plot
@@ -3,11 +3,19 @@ from bokeh.plotting import figure
 
 from loguru import logger
 
-from viz.chart.chart_bar import chart_bar
+from viz.chart.chart_bar import chart_bar, make_human_readable
+from viz.chart.chart_heatmap import chart_heatmap
 from viz.chart.chart_line import chart_line
 from viz.chart.chart_lines import chart_lines
-from viz.threads.stats_worker import MetricType
-from viz.mockdata import data
+from viz.chart.chart_percentiles import chart_percentiles
+from viz.config import VIZ_DATA_SOURCE
+from viz.store.database import load_events
+from viz.store.events import Selection, get_store
+from viz.timing import timed
+from viz.threads.stats_worker import MetricType, get_stats
+from viz.utils import last_cycle
+
+FILTER_COLUMNS = ("user_id", "miner_hotkey", "miner", "validator")
 
 
 def check_empty(key: str, df: pd.DataFrame) -> None:
@@ -15,35 +23,59 @@ def check_empty(key: str, df: pd.DataFrame) -> None:
         logger.warning(f"Dataframe is empty, {key} not found in dataset")
 
 
+@timed
 def get_data(key: MetricType, **kwargs) -> pd.DataFrame:
-    df = pd.DataFrame(data)
+    # Unfiltered charts read the data and aggregates of the stats worker
+    if VIZ_DATA_SOURCE == "memory" and not any(
+        column in kwargs for column in FILTER_COLUMNS
+    ):
+        stats = get_stats(key, load_unfiltered)
+        if stats is not None:
+            return stats.data.copy(deep=False)
+
+    return load_data(key, **kwargs)
 
-    # Filtering by user_id
-    if "user_id" in kwargs and "user_id" in df.columns:
-        df = df[df["user_id"] == kwargs.get("user_id")]
-        check_empty("user_id", df)
 
-    # Filtering by miner
-    if "miner_hotkey" in kwargs and "miner_hotkey" in df.columns:
-        df = df[df["miner_hotkey"] == kwargs.get("miner_hotkey")]
-        check_empty("miner_hotkey", df)
+def load_data(key: MetricType, **kwargs) -> pd.DataFrame:
+    if VIZ_DATA_SOURCE == "database":
+        return get_database_data(key, **kwargs)
 
-    if "miner" in kwargs and "miner" in df.columns:
-        df = df[df["miner"] == kwargs.get("miner")]
-        check_empty("miner", df)
+    store = get_store()
 
-    if "validator" in kwargs and "validator" in df.columns:
-        df = df[df["validator"] == kwargs.get("validator")]
-        check_empty("validator", df)
+    # Filtering by user_id, miner, etc. through the store's inverted indexes
+    filters = {
+        column: kwargs[column]
+        for column in FILTER_COLUMNS
+        if column in kwargs and column in store
+    }
 
     # Cleanup user latency unless we're looking at a user chart
     # i.e. cheaters will not be shown on the main charts
-    if "user_id" not in kwargs:
-        if "is_valid" in df.columns:
-            # Filter out users with any invalid items
-            valid_users = df.groupby("user_id")["is_valid"].all()
-            valid_user_ids = valid_users[valid_users].index
-            df = df[df["user_id"].isin(valid_user_ids)]
+    selection = Selection.build(filters, valid_only="user_id" not in kwargs)
+
+    df = store.select(selection)
+    if filters:
+        check_empty(", ".join(filters), df)
+
+    return df
+
+
+def load_unfiltered() -> pd.DataFrame:
+    """
+    Loads the events every unfiltered chart starts from, the metrics only
+    differ in how they aggregate them.
+    """
+    return load_data(MetricType.VOTES)
+
+
+def get_database_data(key: MetricType, **kwargs) -> pd.DataFrame:
+    filters = {column: kwargs[column] for column in FILTER_COLUMNS if column in kwargs}
+
+    # Same rules as the in-memory store, but filtered by the database and
+    # limited to the charted lookback
+    df = load_events(filters, valid_only="user_id" not in kwargs, since=last_cycle())
+    if filters:
+        check_empty(", ".join(filters), df)
 
     return df
 
@@ -59,7 +91,7 @@ def show_votes(**kwargs) -> figure:
 
 
 def show_votes_by_user(**kwargs) -> figure:
-    # data: pd.DataFrame = get_data(MetricType.VOTES, **kwargs)
+    data: pd.DataFrame = get_data(MetricType.VOTES, **kwargs)
 
     return chart_bar(
         group_by="user_id",
@@ -165,6 +197,17 @@ def show_user_latency(**kwargs) -> figure:
     )
 
 
+def show_user_latency_percentiles(**kwargs) -> figure:
+    data: pd.DataFrame = get_data(MetricType.VOTES, **kwargs)
+
+    return chart_percentiles(
+        key="user_latency",
+        title="User latency Percentiles Over Time (ms)",
+        data=data,
+        **kwargs,
+    )
+
+
 def show_user_latency_by_user(**kwargs) -> figure:
     data = get_data(MetricType.VOTES, **kwargs)
 
@@ -232,3 +275,14 @@ def show_rounds(**kwargs) -> figure:
         data=data,
         **kwargs,
     )
+
+
+def show_votes_correlation(group_by: str = "user_id", **kwargs) -> figure:
+    data: pd.DataFrame = get_data(MetricType.VOTES_CORRELATION, **kwargs)
+
+    return chart_heatmap(
+        group_by=group_by,
+        title=f"Vote Correlation By {make_human_readable(group_by)}",
+        data=data,
+        **kwargs,
+    )
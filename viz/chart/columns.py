@@ -0,0 +1,113 @@
+import base64
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from bokeh.models import ColumnDataSource
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def plot_column(values: Any) -> np.ndarray:
+    """
+    Converts a column to the contiguous array Bokeh encodes most compactly.
+
+    Datetimes become float64 epoch milliseconds (NaT as NaN), integers become
+    int32 when they fit and float64 otherwise, since BokehJS has no int64
+    arrays. Labels that have no numeric form (e.g. bar chart factors) stay
+    object arrays.
+    """
+    array = np.asarray(values)
+
+    if array.dtype.kind == "M":
+        missing = np.isnat(array)
+        array = array.astype("datetime64[ns]").view(np.int64) / 1e6
+        array[missing] = np.nan
+
+    elif array.dtype.kind in "iu":
+        if len(array) and (array.min() < INT32_MIN or array.max() > INT32_MAX):
+            array = array.astype(np.float64)
+        else:
+            array = array.astype(np.int32)
+
+    elif array.dtype.kind == "f":
+        array = array.astype(np.float64, copy=False)
+
+    elif array.dtype.kind == "b":
+        array = array.astype(np.uint8)
+
+    return np.ascontiguousarray(array)
+
+
+def source_data(frame: pd.DataFrame, columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Builds ColumnDataSource data holding only the plotted ``columns``.
+    """
+    return {name: plot_column(frame[name].to_numpy()) for name in columns}
+
+
+def json_column(values: Any) -> List:
+    """
+    Converts a ColumnDataSource column to plain JSON values.
+
+    Datetimes become epoch milliseconds like BokehJS expects, and NaN/NaT
+    become null since JSON has no NaN.
+    """
+    if isinstance(values, (list, tuple)):
+        return [
+            json_column(item) if isinstance(item, (np.ndarray, list)) else item
+            for item in values
+        ]
+
+    array = np.asarray(values)
+
+    if array.dtype.kind == "M":
+        missing = np.isnat(array)
+        array = array.astype("datetime64[ns]").view(np.int64) / 1e6
+        array[missing] = np.nan
+
+    if array.dtype.kind == "f":
+        return [None if np.isnan(item) else item for item in array.tolist()]
+
+    if array.dtype.kind == "O":
+        return [
+            None if isinstance(item, float) and np.isnan(item) else item
+            for item in array.tolist()
+        ]
+
+    return array.tolist()
+
+
+def json_columns(source: ColumnDataSource) -> Dict[str, List]:
+    return {name: json_column(values) for name, values in source.data.items()}
+
+
+def binary_column(values: Any) -> Union[Dict[str, str], List]:
+    """
+    Encodes a ColumnDataSource column for the JSON data endpoint the way
+    Bokeh ships it in a page: numeric columns become the base64 of the
+    little-endian typed array ``plot_column`` builds, with its dtype.
+
+    Labels stay plain JSON values, and lists of arrays (e.g. the lines of a
+    ``multi_line``) are encoded item by item.
+    """
+    if isinstance(values, (list, tuple)):
+        return [
+            binary_column(item) if isinstance(item, (np.ndarray, list)) else item
+            for item in values
+        ]
+
+    array = plot_column(values)
+    if array.dtype.kind == "O":
+        return json_column(array)
+
+    array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+
+    return {
+        "dtype": array.dtype.name,
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def binary_columns(source: ColumnDataSource) -> Dict[str, Any]:
+    return {name: binary_column(values) for name, values in source.data.items()}
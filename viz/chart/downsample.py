@@ -0,0 +1,106 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from viz.config import VIZ_CHART_DOWNSAMPLE, VIZ_CHART_WIDTH
+from viz.timing import timed
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Picks ``threshold`` points of a line with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and dips.
+
+    Args:
+        x (np.ndarray): The x values, sorted ascending.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The ascending indices of the kept points.
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # threshold - 2 buckets over the points between the first and the last one,
+    # the last point alone acts as the bucket following the final one
+    edges = np.append(np.linspace(1, size - 1, threshold - 1).astype(np.int64), size)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        lower, upper = edges[bucket], edges[bucket + 1]
+        next_x = x[upper : edges[bucket + 2]].mean()
+        next_y = y[upper : edges[bucket + 2]].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[lower:upper] - y[previous])
+            - (x[previous] - x[lower:upper]) * (next_y - y[previous])
+        )
+
+        previous = lower + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+
+    return kept
+
+
+@timed
+def downsample_data(
+    resampled: pd.DataFrame, group_by: Optional[str] = None, **kwargs
+) -> pd.DataFrame:
+    """
+    Shrinks every line of the resampled data to at most one point per pixel.
+
+    Args:
+        resampled (pd.DataFrame): Smoothed data with ``period`` and
+            ``count_smoothed`` columns.
+        group_by (Optional[str]): Downsample each group as its own line.
+        **kwargs: Additional keyword arguments.
+            downsample (int | bool): Maximum points per line, capped by the
+                chart width. Defaults to ``VIZ_CHART_DOWNSAMPLE``, where None
+                (the default), False or 0 disables downsampling.
+
+    Returns:
+        pd.DataFrame: The kept rows, in their original order.
+    """
+    threshold = kwargs.get("downsample", VIZ_CHART_DOWNSAMPLE)
+    if not threshold:
+        return resampled
+
+    threshold = min(int(threshold), VIZ_CHART_WIDTH)
+
+    if group_by is None or group_by not in resampled.columns:
+        if len(resampled) <= threshold:
+            return resampled
+
+        kept = lttb(
+            resampled["period"].to_numpy("datetime64[ns]").view(np.int64),
+            resampled["count_smoothed"].to_numpy(),
+            threshold,
+        )
+        return resampled.iloc[kept].reset_index(drop=True)
+
+    groups = resampled.groupby(group_by, sort=False, observed=True).indices
+    if all(len(rows) <= threshold for rows in groups.values()):
+        return resampled
+
+    periods = resampled["period"].to_numpy("datetime64[ns]").view(np.int64)
+    counts = resampled["count_smoothed"].to_numpy()
+
+    kept: List[np.ndarray] = []
+    for rows in groups.values():
+        if len(rows) > threshold:
+            rows = rows[lttb(periods[rows], counts[rows], threshold)]
+        kept.append(rows)
+
+    return resampled.iloc[np.sort(np.concatenate(kept))].reset_index(drop=True)
@@ -1,5 +1,8 @@
 from bokeh.themes import Theme
 
+from viz.config import VIZ_CHART_REFRESH
+from viz.timing import timed
+
 VIZ_CHART_FOREGROUND = "white"
 VIZ_CHART_BACKGROUND = "#1380af"
 VIZ_CHART_FOREGROUND_BAD = "white"
@@ -212,6 +215,7 @@ def find_color_fg(**kwargs) -> str:
     return VIZ_CHART_FOREGROUND
 
 
+@timed
 def cleanup(to_clean: str, **kwargs) -> str:
     color: str = VIZ_CHART_BACKGROUND
     if kwargs.get("theme_bad", False):
@@ -220,9 +224,10 @@ def cleanup(to_clean: str, **kwargs) -> str:
     return to_clean.replace("body {", "body {\n\t\t" + f" background-color: {color};")
 
 
+@timed
 def add_autoreload(to_clean: str, **kwargs) -> str:
     if not kwargs.get("reload"):
         return to_clean
 
-    meta_tag = '<meta http-equiv="refresh" content="60">'
+    meta_tag = f'<meta http-equiv="refresh" content="{VIZ_CHART_REFRESH}">'
     return to_clean.replace("<head>", "<head>" + meta_tag, 1)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3.9
 
-VIZ_CHART_INTERVAL = "2H"
+VIZ_CHART_INTERVAL = "2h"
 VIZ_CYCLE_LOOKBACK = 86400
 VIZ_CHART_SMOOTH = 1
 VIZ_CHART_FOREGROUND = "white"
@@ -11,3 +11,43 @@ VIZ_CHART_FOREGROUND_NONE = "white"
 VIZ_CHART_BACKGROUND_NONE = "#00000000"
 VIZ_CHART_WIDTH = 1024
 VIZ_CHART_HEIGHT = 512
+VIZ_CHART_DOWNSAMPLE = None
+VIZ_CHART_WORKERS = 4
+VIZ_CHART_REFRESH = 60
+VIZ_PAGE_CACHE_TTL = VIZ_CHART_REFRESH
+VIZ_PAGE_CACHE_SIZE = 64
+VIZ_ROLLUP_PERIODS = ["5min", "1h", "2h", "1D"]
+VIZ_ROLLUP_LIMIT = 256
+VIZ_DISTINCT_ERROR = None
+VIZ_DISTINCT_EXACT_ROWS = 100_000
+VIZ_DISTINCT_PERIODS = ["1h", "2h", "1D"]
+VIZ_QUANTILE_ACCURACY = 0.01
+VIZ_QUANTILE_RANGE = (1e-3, 1e6)
+VIZ_QUANTILE_PERIODS = ["1h", "2h", "1D"]
+VIZ_LATENCY_PERCENTILES = (50, 95, 99)
+VIZ_DATA_SOURCE = "memory"
+VIZ_DATABASE_POLL = 5
+VIZ_SNAPSHOT_DIR = None
+VIZ_DICTIONARY_COLUMNS = [
+    "user_id",
+    "miner",
+    "miner_hotkey",
+    "validator",
+    "round_id",
+    "compute_id",
+]
+VIZ_STATS_INTERVAL = VIZ_CHART_REFRESH
+VIZ_STATS_WAIT = 5
+VIZ_CORRELATION_TOP = 32
+VIZ_RENDER_WORKERS = 2
+VIZ_RENDER_CONCURRENCY = 8
+VIZ_RENDER_TIMEOUT = 30
+VIZ_LIVE_HEARTBEAT = 15
+VIZ_LIVE_DURATION = 300
+VIZ_STARTUP_BUDGET = 0.5
+VIZ_BENCHMARK_SIZES = [5_000, 100_000, 1_000_000, 10_000_000]
+VIZ_BENCHMARK_BASELINE = "benchmarks/baseline.json"
+VIZ_MOCK_SIZE = 5000
+VIZ_MOCK_SEED = None
+VIZ_METRICS_WINDOW = 1024
+VIZ_METRICS_PERCENTILES = (50, 95, 99)
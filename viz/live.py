@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from viz.store.events import data_version, on_append
+
+Columns = Dict[str, Dict[str, List[Any]]]
+
+# (version the update applies to, new version, JSON payload)
+Update = Tuple[Optional[int], int, str]
+
+
+def diff_columns(
+    old: Optional[Dict[str, List[Any]]], new: Dict[str, List[Any]]
+) -> Optional[Dict[str, Any]]:
+    """
+    Describes how the columns of one data source changed.
+
+    Returns None when nothing changed, ``{"data": ...}`` when the source has
+    to be replaced (new columns, or fewer rows), and otherwise the rows that
+    changed plus the rows appended at the end, which is what new buckets of a
+    time series look like.
+    """
+    if old is None or set(old) != set(new):
+        return {"data": new}
+
+    old_size = len(next(iter(old.values()), []))
+    new_size = len(next(iter(new.values()), []))
+    if new_size < old_size:
+        return {"data": new}
+
+    rows = [
+        row
+        for row in range(old_size)
+        if any(old[name][row] != values[row] for name, values in new.items())
+    ]
+    if not rows and new_size == old_size:
+        return None
+
+    return {
+        "rows": rows,
+        "columns": {
+            name: [values[row] for row in rows] for name, values in new.items()
+        },
+        "append": {name: values[old_size:] for name, values in new.items()},
+    }
+
+
+class LiveUpdates:
+    """
+    The changes of a page's data sources between consecutive data versions.
+
+    The diff for a version is computed once, on the first request for it, and
+    then handed to every open page, so the server's work follows the data
+    changes rather than the number of viewers.
+    """
+
+    def __init__(self, render: Callable[[], Columns]) -> None:
+        self._render = render
+        self._lock = threading.Lock()
+
+        self._columns: Optional[Columns] = None
+        self._update: Optional[Update] = None
+
+    def update(self) -> Update:
+        """
+        Returns the update to the current data version, rendering it if no
+        other page did yet.
+        """
+        with self._lock:
+            version = data_version()
+            if self._update is not None and self._update[1] == version:
+                return self._update
+
+            columns = self._render()
+
+            since = self._update[1] if self._update is not None else None
+            previous = self._columns or {}
+            sources = {
+                name: diff
+                for name, values in columns.items()
+                if (diff := diff_columns(previous.get(name), values)) is not None
+            }
+
+            self._columns = columns
+            self._update = (
+                since,
+                version,
+                json.dumps({"since": since, "version": version, "sources": sources}),
+            )
+
+            return self._update
+
+
+class VersionNotifier:
+    """
+    Wakes the coroutines waiting for new data, whichever thread appended it.
+
+    Every event loop gets an ``asyncio.Event`` that is swapped for a fresh one
+    on each append, so all of its waiters wake up at once.
+    """
+
+    def __init__(self) -> None:
+        self._events: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Event]" = (
+            WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def _event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if not self._listening:
+                on_append(self.notify)
+                self._listening = True
+
+            event = self._events.get(loop)
+            if event is None:
+                event = self._events[loop] = asyncio.Event()
+
+        return event
+
+    def _wake(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            event = self._events.get(loop)
+            self._events[loop] = asyncio.Event()
+
+        if event is not None:
+            event.set()
+
+    def notify(self, *args) -> None:
+        with self._lock:
+            loops = list(self._events.keys())
+
+        for loop in loops:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._wake, loop)
+
+    async def wait(self, version: int, timeout: float) -> int:
+        """
+        Waits until the data version differs from ``version``, at most
+        ``timeout`` seconds, and returns the current version.
+        """
+        event = self._event()
+        if data_version() == version:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return data_version()
+
+
+notifier = VersionNotifier()
+
+
+async def event_stream(
+    updates: Callable[[], "asyncio.Future[Update]"],
+    version: Optional[int],
+    heartbeat: float,
+    duration: float,
+) -> AsyncIterator[str]:
+    """
+    Streams the updates of a page as server-sent events.
+
+    Pages get an ``update`` event holding the diff of their data sources
+    whenever the data changes, or a ``reload`` event when they missed a
+    version and have to fetch all of their data again. A comment every
+    ``heartbeat`` seconds keeps idle connections open.
+
+    The stream ends after ``duration`` seconds, the EventSource then
+    reconnects with the last version it got, so no connection is held open
+    for good.
+    """
+    if version is None:
+        version = data_version()
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    while (remaining := deadline - loop.time()) > 0:
+        current = await notifier.wait(version, min(heartbeat, remaining))
+        if current == version:
+            yield ": keep-alive\n\n"
+            continue
+
+        since, new_version, payload = await updates()
+        if since != version:
+            yield f"event: reload\nid: {new_version}\ndata: {{}}\n\n"
+        else:
+            yield f"event: update\nid: {new_version}\ndata: {payload}\n\n"
+
+        version = new_version
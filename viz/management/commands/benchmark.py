@@ -0,0 +1,76 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from viz.benchmark import benchmark, compare, load_results, save_results
+from viz.config import VIZ_BENCHMARK_BASELINE, VIZ_BENCHMARK_SIZES
+
+
+class Command(BaseCommand):
+    help = "Benchmarks every chart pipeline stage at growing data sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default=",".join(str(size) for size in VIZ_BENCHMARK_SIZES),
+            help="Comma separated event counts",
+        )
+        parser.add_argument(
+            "--charts", default="", help="Comma separated show_* functions"
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--with-worker",
+            action="store_true",
+            help="Read unfiltered data from the stats worker like requests do",
+        )
+        parser.add_argument("--baseline", default=VIZ_BENCHMARK_BASELINE)
+        parser.add_argument(
+            "--save", action="store_true", help="Store the results as the baseline"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed growth over the baseline, as a fraction",
+        )
+        parser.add_argument("--output", help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        sizes = [int(size) for size in options["sizes"].split(",") if size]
+        charts = [name for name in options["charts"].split(",") if name]
+
+        results = benchmark(
+            sizes,
+            charts,
+            repeat=options["repeat"],
+            seed=options["seed"],
+            with_worker=options["with_worker"],
+            log=self.stdout.write,
+        )
+
+        if options["output"]:
+            save_results(results, options["output"])
+
+        baseline = options["baseline"]
+        if options["save"]:
+            os.makedirs(os.path.dirname(baseline) or ".", exist_ok=True)
+            save_results(results, baseline)
+            self.stdout.write(self.style.SUCCESS(f"Saved the baseline to {baseline}"))
+            return
+
+        if not os.path.exists(baseline):
+            self.stdout.write(f"No baseline at {baseline}, run with --save first")
+            return
+
+        regressions = compare(results, load_results(baseline), options["tolerance"])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions against {baseline}")
+
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from viz.mockdata import data
+from viz.models import Event
+
+
+class Command(BaseCommand):
+    help = "Loads the mock events into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear", action="store_true", help="Delete existing events first"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            Event.objects.all().delete()
+
+        inserted = Event.objects.bulk_insert(data, batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Inserted {inserted} events"))
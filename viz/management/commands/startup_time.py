@@ -0,0 +1,76 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from viz.config import VIZ_STARTUP_BUDGET
+
+# Runs in a fresh interpreter: boots Django, loads the URLconf like a worker
+# does and reports the time taken and which heavy modules got imported
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dataviz.settings")
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "heavy": sorted(
+        name for name in ("bokeh", "numpy", "pandas", "viz.mockdata")
+        if name in sys.modules
+    ),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measures the time a process takes to boot Django and load the URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=VIZ_STARTUP_BUDGET,
+            help="Fail when the median startup exceeds this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        samples = []
+        heavy = []
+
+        for _ in range(options["runs"]):
+            probe = subprocess.run(
+                [sys.executable, "-c", PROBE],
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+            result = json.loads(probe.stdout.strip().splitlines()[-1])
+            samples.append(result["seconds"])
+            heavy = result["heavy"]
+
+        median = statistics.median(samples)
+
+        self.stdout.write(
+            f"Startup: median {median * 1000:.0f}ms, "
+            f"min {min(samples) * 1000:.0f}ms over {len(samples)} runs"
+        )
+        if heavy:
+            self.stdout.write(
+                self.style.WARNING(f"Imported at startup: {', '.join(heavy)}")
+            )
+
+        if median > options["budget"]:
+            raise CommandError(
+                f"Startup takes {median * 1000:.0f}ms, "
+                f"over the {options['budget'] * 1000:.0f}ms budget"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Within the {options['budget'] * 1000:.0f}ms budget")
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from viz.config import VIZ_SNAPSHOT_DIR
+from viz.store.events import EventStore, get_store
+from viz.store.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Writes the events as a memory-mapped snapshot shared by all workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", nargs="?", default=VIZ_SNAPSHOT_DIR)
+        parser.add_argument(
+            "--from-database",
+            action="store_true",
+            help="Snapshot the Event table instead of the in-memory store",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not directory:
+            raise CommandError("No directory given and VIZ_SNAPSHOT_DIR is not set")
+
+        if options["from_database"]:
+            from viz.store.database import load_events
+
+            df = load_events({}, valid_only=False)
+            store = EventStore({name: df[name].to_numpy() for name in df})
+        else:
+            store = get_store()
+
+        manifest = write_snapshot(store, directory)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {manifest['rows']} events to {directory}")
+        )
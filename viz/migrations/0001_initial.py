@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_id", models.BigIntegerField(db_column="_id", null=True)),
+                ("user_id", models.CharField(max_length=128)),
+                ("created", models.DateTimeField()),
+                ("user_latency", models.FloatField(null=True)),
+                ("miner", models.CharField(max_length=128, null=True)),
+                ("miner_hotkey", models.CharField(max_length=128, null=True)),
+                ("validator", models.CharField(max_length=128, null=True)),
+                ("round_id", models.CharField(max_length=128, null=True)),
+                ("compute_id", models.CharField(max_length=128, null=True)),
+                ("weight", models.FloatField(null=True)),
+                ("amount", models.FloatField(null=True)),
+                ("is_valid", models.BooleanField(default=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["created"], name="viz_event_created"),
+                    models.Index(fields=["user_id", "created"], name="viz_event_user"),
+                    models.Index(
+                        fields=["miner_hotkey", "created"], name="viz_event_hotkey"
+                    ),
+                    models.Index(
+                        condition=models.Q(("is_valid", False)),
+                        fields=["user_id"],
+                        name="viz_event_invalid_user",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -1,37 +1,106 @@
-import random
+from typing import Dict, Optional
+
 import numpy as np
-from datetime import datetime, timedelta
+import pandas as pd
+
+from viz.config import VIZ_MOCK_SEED, VIZ_MOCK_SIZE
+
+BASE58 = np.array(list("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"))
+
+
+def zipf_choice(
+    rng: np.random.Generator, count: int, size: int, exponent: float = 1.1
+) -> np.ndarray:
+    """
+    Draws ``size`` indices below ``count`` where index ``i`` is picked with a
+    probability proportional to ``1 / (i + 1) ** exponent``, so a few entities
+    produce most of the events like real users and miners do.
+    """
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return rng.choice(count, size=size, p=weights / weights.sum())
+
+
+def labels(prefix: str, count: int) -> np.ndarray:
+    return np.char.add(prefix, np.arange(count).astype(str)).astype(object)
+
+
+def hotkeys(rng: np.random.Generator, count: int) -> np.ndarray:
+    # SS58-looking addresses, 48 base58 characters starting with a 5
+    chars = BASE58[rng.integers(0, len(BASE58), (count, 47))]
+    return np.char.add("5", chars.view("<U47").ravel()).astype(object)
+
+
+def generate(
+    size: int = VIZ_MOCK_SIZE,
+    seed: Optional[int] = VIZ_MOCK_SEED,
+    days: int = 30,
+    users: int = 5000,
+    miners: int = 256,
+    validators: int = 16,
+    round_seconds: int = 600,
+) -> Dict[str, np.ndarray]:
+    """
+    Generates ``size`` synthetic events covering every column the charts use.
+
+    All columns are built with vectorized numpy draws, so tens of millions of
+    events take seconds. Users, miners and validators are Zipf distributed,
+    rounds follow time, every miner runs a few computes, weights drift
+    around a per-miner level and payouts follow the weights. About 1% of the
+    users are cheaters whose events are partly invalid.
+
+    Args:
+        size (int): The number of events.
+        seed (Optional[int]): Seed for reproducible data, random when None.
+        days (int): How far back the events go.
+        users (int): The number of distinct users.
+        miners (int): The number of distinct miners (one hotkey each).
+        validators (int): The number of distinct validators.
+        round_seconds (int): The length of a round.
+
+    Returns:
+        Dict[str, np.ndarray]: The event columns, sorted by ``created``.
+    """
+    rng = np.random.default_rng(seed)
 
-# Get the current date and time
-current_date = datetime.now()
+    now = pd.Timestamp.now().floor("s").to_datetime64().astype("datetime64[s]")
+    offsets = np.sort(rng.integers(0, days * 86400, size))[::-1]
+    created = (now - offsets).astype("datetime64[ns]")
 
-# Calculate the date from one month ago
-one_month_ago = current_date - timedelta(days=30)
+    user = zipf_choice(rng, users, size)
+    miner = zipf_choice(rng, miners, size, exponent=0.8)
+    validator = zipf_choice(rng, validators, size, exponent=0.5)
+    compute = miner * 4 + rng.integers(0, 4, size)
 
-# Generate an array of timestamps for the past month
-timestamps = []
-for _ in range(5000):
-    # Generate a random timestamp between one month ago and now
-    timestamp = one_month_ago + timedelta(
-        seconds=random.randint(0, int((current_date - one_month_ago).total_seconds()))
-    )
-    timestamps.append(timestamp)
+    # Rounds are numbered from the oldest possible event onwards
+    rounds = (days * 86400 - offsets) // round_seconds
 
-# Sort the timestamps
-timestamps.sort()
+    # Per-miner weight levels with some noise per event
+    levels = rng.dirichlet(np.full(miners, 0.5))
+    weight = np.clip(levels[miner] * rng.normal(1.0, 0.1, size), 0, None)
 
+    cheaters = rng.random(users) < 0.01
+    is_valid = ~(cheaters[user] & (rng.random(size) < 0.3))
 
-# Define the size of the array
-def biased_random():
-    return random.random() ** 2 * 25
+    return {
+        "_id": np.arange(size),
+        "user_id": np.arange(1, users + 1).astype(str).astype(object)[user],
+        "created": created,
+        "user_latency": rng.random(size) ** 2 * 25,
+        "miner": labels("miner-", miners)[miner],
+        "miner_hotkey": hotkeys(rng, miners)[miner],
+        "validator": labels("validator-", validators)[validator],
+        "round_id": labels("", int(rounds.max(initial=0)) + 1)[rounds],
+        "compute_id": labels("compute-", miners * 4)[compute],
+        "weight": weight,
+        "amount": weight * rng.exponential(1e-3, size),
+        "is_valid": is_valid,
+    }
 
 
-# Generate the array
-array = [biased_random() for _ in range(5000)]
+def __getattr__(name: str):
+    # ``data`` is only generated when something first reads it
+    if name == "data":
+        globals()["data"] = generate()
+        return globals()["data"]
 
-data = {
-    "_id": [i for i in range(5000)],
-    "user_id": [str(random.randint(1, 5000)) for _ in range(5000)],
-    "created": timestamps,
-    "user_latency": array,
-}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,107 @@
+from datetime import timezone
+from typing import Dict, Iterator, List, Mapping, Sequence
+
 from django.db import models
+from django.db.models import Q
+
+# Frame column -> model field, ``_id`` can't be used as a field name
+EVENT_COLUMNS: Dict[str, str] = {
+    "_id": "event_id",
+    "user_id": "user_id",
+    "created": "created",
+    "user_latency": "user_latency",
+    "miner": "miner",
+    "miner_hotkey": "miner_hotkey",
+    "validator": "validator",
+    "round_id": "round_id",
+    "compute_id": "compute_id",
+    "weight": "weight",
+    "amount": "amount",
+    "is_valid": "is_valid",
+}
+
+
+def python_values(values: Sequence) -> Sequence:
+    """
+    Converts numpy columns to Python values the database layer accepts.
+    """
+    dtype = getattr(values, "dtype", None)
+    if dtype is None:
+        return values
+
+    if dtype.kind == "M":
+        # Microsecond precision turns into datetime objects, in UTC
+        return [
+            value.replace(tzinfo=timezone.utc) if value is not None else None
+            for value in values.astype("datetime64[us]").tolist()
+        ]
+
+    return values.tolist()
+
+
+class EventManager(models.Manager):
+    def bulk_insert(
+        self, columns: Mapping[str, Sequence], batch_size: int = 5000
+    ) -> int:
+        """
+        Inserts events given as frame columns (like ``viz.mockdata.data``).
+
+        Rows are converted and inserted ``batch_size`` at a time, so only one
+        batch of model instances is held in memory at once.
+
+        Returns the number of inserted events.
+        """
+        columns = {
+            EVENT_COLUMNS[name]: values
+            for name, values in columns.items()
+            if name in EVENT_COLUMNS
+        }
+        size = len(next(iter(columns.values()), ()))
+
+        def batches() -> Iterator[List[models.Model]]:
+            for start in range(0, size, batch_size):
+                fields = {
+                    field: python_values(values[start : start + batch_size])
+                    for field, values in columns.items()
+                }
+                yield [
+                    self.model(**dict(zip(fields, row)))
+                    for row in zip(*fields.values())
+                ]
+
+        inserted = 0
+        for batch in batches():
+            self.bulk_create(batch, batch_size=batch_size)
+            inserted += len(batch)
+
+        return inserted
+
+
+class Event(models.Model):
+    event_id = models.BigIntegerField(db_column="_id", null=True)
+    user_id = models.CharField(max_length=128)
+    created = models.DateTimeField()
+    user_latency = models.FloatField(null=True)
+    miner = models.CharField(max_length=128, null=True)
+    miner_hotkey = models.CharField(max_length=128, null=True)
+    validator = models.CharField(max_length=128, null=True)
+    round_id = models.CharField(max_length=128, null=True)
+    compute_id = models.CharField(max_length=128, null=True)
+    weight = models.FloatField(null=True)
+    amount = models.FloatField(null=True)
+    is_valid = models.BooleanField(default=True)
+
+    objects = EventManager()
 
-# Create your models here.
+    class Meta:
+        indexes = [
+            models.Index(fields=["created"], name="viz_event_created"),
+            models.Index(fields=["user_id", "created"], name="viz_event_user"),
+            models.Index(fields=["miner_hotkey", "created"], name="viz_event_hotkey"),
+            # Cheaters are rare, only their events are indexed
+            models.Index(
+                fields=["user_id"],
+                condition=Q(is_valid=False),
+                name="viz_event_invalid_user",
+            ),
+        ]
@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class ColumnBuffer:
+    """
+    Append-only array with amortized O(1) growth.
+
+    Readers take read-only views of a prefix of the buffer; appending only
+    writes past the current size (or into a new, larger array), so views handed
+    out earlier are never modified.
+
+    With ``copy=False`` the buffer starts on top of ``values`` (e.g. a
+    read-only memory map) and only moves to its own memory on the first append.
+    """
+
+    def __init__(self, values: np.ndarray, copy: bool = True) -> None:
+        self._data: np.ndarray = np.array(values, copy=True) if copy else values
+        self._size: int = len(values)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    def view(self, size: int = -1) -> np.ndarray:
+        """
+        Returns a read-only view of the first ``size`` values (all by default).
+        """
+        values = self._data[: self._size if size < 0 else size]
+        values.flags.writeable = False
+        return values
+
+    def extend(self, values: np.ndarray) -> None:
+        needed = self._size + len(values)
+
+        if needed > len(self._data):
+            grown = np.empty(
+                max(needed, 2 * len(self._data), 64), dtype=self._data.dtype
+            )
+            grown[: self._size] = self._data[: self._size]
+            self._data = grown
+
+        self._data[self._size : needed] = values
+        self._size = needed
+
+    def clear(self, positions: np.ndarray, value=False) -> None:
+        """
+        Overwrites the given positions in place.
+
+        Only meant for flag columns that are read through fancy indexing,
+        where a reader either sees the old or the new value.
+        """
+        self._data[positions] = value
@@ -0,0 +1,151 @@
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from django.db import close_old_connections
+from django.db.models import Count, FloatField, Max
+from loguru import logger
+
+from viz.config import VIZ_DATABASE_POLL, VIZ_DICTIONARY_COLUMNS
+from viz.models import EVENT_COLUMNS, Event
+
+
+def load_events(
+    filters: Dict[str, Any], valid_only: bool, since: Optional[datetime] = None
+) -> pd.DataFrame:
+    """
+    Loads events from the database with the filtering pushed down into SQL.
+
+    The column filters and the lookback window are answered by the
+    ``(column, created)`` indexes, and cheaters are excluded with a subquery
+    over the partial index of invalid events, so only the rows a chart plots
+    leave the database. Like the in-memory store, users are judged on the
+    loaded events only.
+
+    Args:
+        filters (Dict[str, Any]): Frame column to the value it must equal.
+        valid_only (bool): Drop every event of users with an invalid event
+            among the loaded ones.
+        since (Optional[datetime]): Only load events created from then on, a
+            naive datetime is taken as UTC.
+
+    Returns:
+        pd.DataFrame: The events in the layout of the in-memory store, sorted
+            by ``created``.
+    """
+    conditions = {EVENT_COLUMNS[column]: value for column, value in filters.items()}
+
+    if since is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        conditions["created__gte"] = since
+
+    queryset = Event.objects.filter(**conditions)
+
+    if valid_only:
+        queryset = queryset.exclude(
+            user_id__in=Event.objects.filter(is_valid=False, **conditions).values(
+                "user_id"
+            )
+        )
+
+    df = pd.DataFrame.from_records(
+        queryset.order_by("created").values_list(*EVENT_COLUMNS.values()),
+        columns=list(EVENT_COLUMNS),
+    )
+
+    # Nullable float fields come back as objects when every value is missing
+    for column, field in EVENT_COLUMNS.items():
+        if isinstance(Event._meta.get_field(field), FloatField):
+            df[column] = df[column].astype(np.float64)
+
+    # Dictionary-encode the id columns like the in-memory store does
+    for column in VIZ_DICTIONARY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+
+    # Match the naive UTC timestamps of the in-memory store
+    df["created"] = pd.to_datetime(df["created"], utc=True).dt.tz_localize(None)
+
+    return df
+
+
+def table_version() -> int:
+    """
+    Returns the data version of the ``Event`` table.
+
+    Ids only grow, so twice the largest id minus the row count grows with
+    every insert, and with every delete of older events (which is how a
+    table gets pruned).
+    """
+    stats = Event.objects.aggregate(last=Max("id"), count=Count("id"))
+
+    return 2 * (stats["last"] or 0) - stats["count"]
+
+
+class VersionPoller(threading.Thread):
+    """
+    Background thread following the data version of the ``Event`` table.
+
+    Requests read the version on the event loop, where Django does not allow
+    queries, so it is polled every ``VIZ_DATABASE_POLL`` seconds instead.
+    When it moves, the ``on_append`` listeners are told, so the page cache,
+    the stats worker and the live updates follow rows written by any process.
+    """
+
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="viz-version-poller", daemon=True)
+
+        self.interval = interval
+        self.version = table_version()
+
+        self._stopping = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def poll(self) -> bool:
+        """
+        Reads the table's version, returns whether it changed.
+        """
+        version = table_version()
+        if version == self.version:
+            return False
+
+        self.version = version
+        return True
+
+    def run(self) -> None:
+        from viz.store.events import data_changed
+
+        while not self._stopping.wait(self.interval):
+            try:
+                if self.poll():
+                    data_changed()
+            except Exception:
+                logger.exception("Failed to poll the events table")
+            finally:
+                close_old_connections()
+
+
+_poller: Optional[VersionPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_poller() -> VersionPoller:
+    """
+    Returns the process-wide version poller, starting it on first use, which
+    has to happen off the event loop since it reads the table.
+    """
+    global _poller
+
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                poller = VersionPoller(VIZ_DATABASE_POLL)
+                poller.start()
+                _poller = poller
+
+    return _poller
@@ -0,0 +1,659 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+
+from viz.aggregate.quantiles import LogBins
+from viz.aggregate.rollup import Rollup
+from viz.config import (
+    VIZ_DATA_SOURCE,
+    VIZ_DICTIONARY_COLUMNS,
+    VIZ_DISTINCT_PERIODS,
+    VIZ_QUANTILE_ACCURACY,
+    VIZ_QUANTILE_PERIODS,
+    VIZ_QUANTILE_RANGE,
+    VIZ_ROLLUP_LIMIT,
+    VIZ_ROLLUP_PERIODS,
+    VIZ_SNAPSHOT_DIR,
+)
+from viz.store.buffer import ColumnBuffer
+from viz.store.index import EMPTY_POSITIONS, EncodedColumn, InvertedIndex, intersect
+from viz.store.validity import FilteredInvalidUsers, InvalidUsers
+
+Rows = Union[slice, np.ndarray, None]
+
+Filters = Tuple[Tuple[str, Any], ...]
+
+# The bins of every quantile rollup
+QUANTILE_BINS = LogBins(VIZ_QUANTILE_ACCURACY, *VIZ_QUANTILE_RANGE)
+
+
+@dataclass(frozen=True)
+class Selection:
+    """
+    Which events a chart looks at: ``column == value`` filters, and whether
+    the rows of invalid users are left out.
+    """
+
+    filters: Filters = ()
+    valid_only: bool = False
+
+    @classmethod
+    def build(cls, filters: Mapping[str, Any], valid_only: bool = False) -> "Selection":
+        return cls(tuple(sorted(filters.items())), valid_only)
+
+    @property
+    def filters_dict(self) -> Dict[str, Any]:
+        return dict(self.filters)
+
+    def matches(
+        self, columns: Mapping[str, np.ndarray], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Returns the mask of ``rows`` (all rows by default) matching the filters.
+        """
+        size = len(next(iter(columns.values()))) if rows is None else len(rows)
+        mask = np.ones(size, dtype=bool)
+
+        for name, value in self.filters:
+            values = columns[name] if rows is None else columns[name][rows]
+            mask &= values == value
+
+        return mask
+
+
+def _coerce_column(name: str, values: Sequence) -> np.ndarray:
+    """
+    Converts a raw column into a typed numpy array.
+
+    ``created`` may arrive either as datetimes or as epoch seconds (which is what
+    the charts expect when they call ``pd.to_datetime(..., unit="s")``), so it is
+    always normalized to ``datetime64[ns]``.
+    """
+    if name == "created":
+        array = np.asarray(values)
+        if array.dtype == np.dtype("datetime64[ns]"):
+            return array
+        if array.dtype.kind in "iuf":
+            return pd.to_datetime(array, unit="s").to_numpy()
+        return pd.to_datetime(array).to_numpy()
+
+    array = np.asarray(values)
+    if array.dtype.kind == "U":
+        array = array.astype(object)
+
+    return array
+
+
+def _coerce_columns(columns: Mapping[str, Sequence]) -> Dict[str, np.ndarray]:
+    typed: Dict[str, np.ndarray] = {
+        name: _coerce_column(name, values) for name, values in columns.items()
+    }
+
+    if len({len(values) for values in typed.values()}) > 1:
+        raise ValueError("All event columns must have the same length")
+
+    # Already sorted input (e.g. a snapshot) is kept as-is, without copying
+    created = typed.get("created")
+    if created is not None and np.any(created[1:] < created[:-1]):
+        order = np.argsort(typed["created"], kind="stable")
+        typed = {name: values[order] for name, values in typed.items()}
+
+    return typed
+
+
+class EventStore:
+    """
+    Columnar copy of the event dataset.
+
+    Every column is a typed numpy array and the rows are kept sorted by
+    ``created``, so time windows resolve to contiguous slices. Frames handed
+    out by the store are built on top of these arrays and must be treated as
+    read-only by callers.
+
+    New events are appended in place. Readers never lock, they only see the
+    rows published by the last completed append.
+
+    The id columns of ``VIZ_DICTIONARY_COLUMNS`` are dictionary-encoded once,
+    when the store is built: their inverted indexes hold an integer code per
+    row, are the only storage of those columns, and frames carry them as
+    categoricals over those codes.
+
+    ``indexes`` seeds prebuilt inverted indexes, an encoded column with one
+    may then be given as its row codes. ``copy=False`` keeps the given arrays
+    as the storage, which is how snapshots stay memory-mapped.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, Sequence],
+        version: int = 0,
+        indexes: Optional[Mapping[str, InvertedIndex]] = None,
+        copy: bool = True,
+    ) -> None:
+        typed = _coerce_columns(columns)
+
+        self._size: int = len(next(iter(typed.values()))) if typed else 0
+        self.version: int = version
+
+        self._indexes: Dict[str, InvertedIndex] = dict(indexes or {})
+        self._invalid_users: Optional[InvalidUsers] = None
+        self._filtered_invalid: "OrderedDict[Filters, FilteredInvalidUsers]" = (
+            OrderedDict()
+        )
+        self._rollups: "OrderedDict[Tuple, Rollup]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._encoded: Tuple[str, ...] = tuple(
+            name for name in VIZ_DICTIONARY_COLUMNS if name in typed
+        )
+
+        # Dictionary-encoded columns are only kept by their index
+        self._buffers: Dict[str, Union[ColumnBuffer, EncodedColumn]] = {}
+        for name, values in typed.items():
+            if name in self._encoded:
+                if name not in self._indexes:
+                    self._indexes[name] = InvertedIndex(values)
+                self._buffers[name] = EncodedColumn(self._indexes[name])
+            else:
+                self._buffers[name] = ColumnBuffer(values, copy=copy)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._buffers
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        size = self._size
+        return {name: buffer.view(size) for name, buffer in self._buffers.items()}
+
+    def column(self, name: str) -> np.ndarray:
+        return self._buffers[name].view(self._size)
+
+    def index(self, name: str) -> InvertedIndex:
+        """
+        Returns the inverted index of a column, building it on first use.
+        """
+        index = self._indexes.get(name)
+
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = InvertedIndex(self._buffers[name].view())
+                    self._indexes[name] = index
+
+        return index
+
+    def invalid_users(self) -> Optional[InvalidUsers]:
+        """
+        Returns the set of users with invalid events, or None when the
+        dataset does not carry an ``is_valid`` flag.
+        """
+        if "is_valid" not in self._buffers or "user_id" not in self._buffers:
+            return None
+
+        if self._invalid_users is None:
+            with self._lock:
+                if self._invalid_users is None:
+                    self._invalid_users = InvalidUsers(
+                        self.index("user_id"), self._buffers["is_valid"].view()
+                    )
+
+        return self._invalid_users
+
+    def filtered_invalid_users(
+        self, filters: Filters
+    ) -> Optional[FilteredInvalidUsers]:
+        """
+        Returns the users with invalid events among the rows matching
+        ``filters``, or None when the dataset does not carry an ``is_valid``
+        flag. Built on first use and kept for the ``VIZ_ROLLUP_LIMIT`` most
+        recently used filters.
+        """
+        if "is_valid" not in self._buffers or "user_id" not in self._buffers:
+            return None
+
+        users = self._filtered_invalid.get(filters)
+
+        with self._lock:
+            if users is None:
+                users = self._filtered_invalid.get(filters)
+                if users is None:
+                    size = self._size
+                    rows = self.lookup(dict(filters))
+                    users = FilteredInvalidUsers(
+                        self.index("user_id").row_codes(size)[rows],
+                        self._buffers["is_valid"].view(size)[rows],
+                    )
+                    self._filtered_invalid[filters] = users
+
+            if filters in self._filtered_invalid:
+                self._filtered_invalid.move_to_end(filters)
+                while len(self._filtered_invalid) > VIZ_ROLLUP_LIMIT:
+                    self._filtered_invalid.popitem(last=False)
+
+        return users
+
+    def lookup(self, filters: Mapping[str, Any]) -> np.ndarray:
+        """
+        Returns the sorted row positions matching every ``column == value`` filter.
+        """
+        size = self._size
+        rows = intersect(
+            [self.index(name).positions(value) for name, value in filters.items()]
+        )
+
+        # Postings may already hold rows of an append that is not published yet
+        if len(rows) and rows[-1] >= size:
+            rows = rows[: np.searchsorted(rows, size)]
+
+        return rows
+
+    def rows(self, selection: "Selection", size: int = -1) -> Rows:
+        """
+        Resolves a selection to row positions, or None for every row.
+        """
+        size = self._size if size < 0 else size
+        rows: Rows = self.lookup(selection.filters_dict) if selection.filters else None
+
+        if selection.valid_only:
+            invalid_users = self.invalid_users()
+            if invalid_users is not None and not invalid_users.all_valid:
+                if rows is None:
+                    rows = invalid_users.valid_positions(size)
+                else:
+                    # Users are judged on the filtered rows only
+                    filtered = self.filtered_invalid_users(selection.filters)
+                    rows = rows[
+                        filtered.valid(self.index("user_id").row_codes(size)[rows])
+                    ]
+
+        return rows
+
+    def frame(self, rows: Rows = None, size: int = -1) -> pd.DataFrame:
+        """
+        Builds a DataFrame for the given rows.
+
+        A slice keeps every column a numpy view of the store, while an array of
+        row positions only copies the matching rows. Dictionary-encoded columns
+        are categoricals built from the row codes.
+        """
+        size = self._size if size < 0 else size
+        if rows is None:
+            rows = slice(None)
+
+        return pd.DataFrame(
+            {
+                name: (
+                    self._indexes[name].categorical(rows, size)
+                    if name in self._encoded
+                    else buffer.view(size)[rows]
+                )
+                for name, buffer in self._buffers.items()
+            },
+            copy=False,
+        )
+
+    def select(self, selection: "Selection") -> pd.DataFrame:
+        """
+        Returns the frame of a selection, tagged with it in ``DataFrame.attrs``
+        so later stages can answer from the store's aggregates.
+        """
+        size = self._size
+        df = self.frame(self.rows(selection, size), size)
+        df.attrs["selection"] = selection
+
+        return df
+
+    def rollup(
+        self,
+        selection: "Selection",
+        key: Optional[str] = None,
+        group_by: Optional[str] = None,
+        precision: Optional[int] = None,
+        quantiles: bool = False,
+    ) -> Optional[Rollup]:
+        """
+        Returns the running rollup of a selection, optionally split by the
+        values of ``group_by``, building it on first use. Returns None when
+        ``key`` is not a numeric column.
+
+        With a ``precision`` the rollup sketches the distinct values of
+        ``key`` instead, which may then be of any type but not grouped. With
+        ``quantiles`` it sketches the distribution of ``key`` per bucket.
+        """
+        if (precision is not None or quantiles) and (
+            key is None or group_by is not None
+        ):
+            return None
+
+        if precision is not None:
+            if key not in self._buffers:
+                return None
+
+        elif key is not None and (
+            key not in self._buffers or self._buffers[key].dtype.kind not in "iufb"
+        ):
+            return None
+
+        if group_by is not None and group_by not in self._buffers:
+            return None
+
+        cache_key = (selection, key, group_by, precision, quantiles)
+        rollup = self._rollups.get(cache_key)
+
+        if rollup is None:
+            with self._lock:
+                rollup = self._rollups.get(cache_key)
+                if rollup is None:
+                    rows = self.rows(selection)
+                    if rows is None:
+                        rows = slice(None)
+
+                    resolutions = VIZ_ROLLUP_PERIODS
+                    if precision:
+                        resolutions = VIZ_DISTINCT_PERIODS
+                    elif quantiles:
+                        resolutions = VIZ_QUANTILE_PERIODS
+
+                    rollup = Rollup(
+                        resolutions,
+                        grouped=group_by is not None,
+                        precision=precision,
+                        bins=QUANTILE_BINS if quantiles else None,
+                    )
+                    rollup.add(
+                        self.column("created")[rows],
+                        self._values(key, rows) if key else None,
+                        codes=(
+                            self.index(group_by).row_codes(self._size)[rows]
+                            if group_by
+                            else None
+                        ),
+                    )
+                    self._rollups[cache_key] = rollup
+
+        with self._lock:
+            if cache_key in self._rollups:
+                self._rollups.move_to_end(cache_key)
+                while len(self._rollups) > VIZ_ROLLUP_LIMIT:
+                    self._rollups.popitem(last=False)
+
+        return rollup
+
+    def _values(self, name: str, rows: Union[slice, np.ndarray]) -> Any:
+        """
+        Returns the values of a column for ``rows``, as a categorical when the
+        column is dictionary-encoded.
+        """
+        if name in self._encoded:
+            return self._indexes[name].categorical(rows, self._size)
+
+        return self.column(name)[rows]
+
+    def _matches(self, selection: "Selection", rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the mask of stored ``rows`` matching the selection's filters,
+        comparing codes for the dictionary-encoded columns.
+        """
+        mask = np.ones(len(rows), dtype=bool)
+
+        for name, value in selection.filters:
+            if name in self._encoded:
+                index = self._indexes[name]
+                mask &= index.row_codes()[rows] == index.code(value)
+            else:
+                mask &= self._buffers[name].view()[rows] == value
+
+        return mask
+
+    def _extend_filtered(
+        self,
+        filters: Filters,
+        typed: Dict[str, np.ndarray],
+        codes: Dict[str, np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Feeds the matching rows of a batch that is not published yet to the
+        invalid users of ``filters``. Returns the mask of batch rows from
+        users that stay valid, and the earlier matching rows of the users
+        the batch flagged.
+        """
+        users = self.filtered_invalid_users(filters)
+        matches = Selection(filters).matches(typed)
+        user_codes = codes["user_id"]
+
+        newly_invalid = users.extend(user_codes[matches], typed["is_valid"][matches])
+
+        removed = EMPTY_POSITIONS
+        if len(newly_invalid):
+            earlier = self.lookup(dict(filters))
+            user_rows = self.index("user_id").row_codes()[earlier]
+            removed = earlier[np.isin(user_rows, newly_invalid)]
+
+        return users.valid(user_codes), removed
+
+    def _update_rollups(
+        self,
+        typed: Dict[str, np.ndarray],
+        codes: Dict[str, np.ndarray],
+        valid: np.ndarray,
+        removed: np.ndarray,
+        filtered: Dict[Filters, Tuple[np.ndarray, np.ndarray]],
+    ) -> None:
+        """
+        Feeds a freshly appended batch to every live rollup, and takes the
+        earlier rows of newly flagged users back out of the valid-only ones.
+        Rollups that cannot take events back out are dropped instead, and get
+        rebuilt on their next use.
+
+        Filtered valid-only rollups judge users on their filtered rows, with
+        the batch's outcome per filter in ``filtered``.
+        """
+        stale = []
+
+        for cache_key, rollup in list(self._rollups.items()):
+            selection, key, group_by = cache_key[:3]
+
+            selection_valid, selection_removed = valid, removed
+            if selection.valid_only and selection.filters:
+                if selection.filters not in filtered:
+                    filtered[selection.filters] = self._extend_filtered(
+                        selection.filters, typed, codes
+                    )
+                selection_valid, selection_removed = filtered[selection.filters]
+
+            matches = selection.matches(typed)
+            if selection.valid_only:
+                matches &= selection_valid
+
+            rollup.add(
+                typed["created"][matches],
+                typed[key][matches] if key else None,
+                codes=codes[group_by][matches] if group_by else None,
+            )
+
+            removed_rows = selection_removed
+            if selection.valid_only and len(removed_rows):
+                rows = removed_rows[self._matches(selection, removed_rows)]
+                if not rollup.subtractable:
+                    if len(rows):
+                        stale.append(cache_key)
+                    continue
+
+                rollup.add(
+                    self._buffers["created"].view()[rows],
+                    self._buffers[key].view()[rows] if key else None,
+                    sign=-1,
+                    codes=self.index(group_by).row_codes()[rows] if group_by else None,
+                )
+
+        for cache_key in stale:
+            del self._rollups[cache_key]
+
+    def append(self, columns: Mapping[str, Sequence]) -> bool:
+        """
+        Appends new events in place and updates the derived structures.
+
+        Returns False without touching the store when the batch holds events
+        older than the newest stored one, since those cannot be appended
+        without reordering existing rows.
+        """
+        typed = _coerce_columns(columns)
+
+        if set(typed) != set(self._buffers):
+            raise ValueError("Appended events must carry the same columns as the store")
+
+        count = len(typed["created"]) if "created" in typed else 0
+        if count < 1:
+            return True
+
+        with self._lock:
+            size = self._size
+            if size and typed["created"][0] < self._buffers["created"].view(size)[-1]:
+                return False
+
+            for name, values in typed.items():
+                self._buffers[name].extend(values)
+
+            codes = {
+                name: index.extend(typed[name], offset=size)
+                for name, index in self._indexes.items()
+            }
+
+            valid = np.ones(count, dtype=bool)
+            removed = EMPTY_POSITIONS
+            if self._invalid_users is not None:
+                removed = self._invalid_users.extend(
+                    codes["user_id"], typed["is_valid"]
+                )
+                valid = self._invalid_users.valid_mask()[size:]
+
+            filtered = {
+                filters: self._extend_filtered(filters, typed, codes)
+                for filters in list(self._filtered_invalid)
+            }
+
+            self._update_rollups(typed, codes, valid, removed, filtered)
+
+            # Publishing the size makes the new rows visible to readers
+            self._size = size + count
+            self.version += 1
+
+        return True
+
+    def merged(self, columns: Mapping[str, Sequence]) -> "EventStore":
+        """
+        Returns a new store holding the current rows plus ``columns``.
+        """
+        current = self.columns
+        typed = _coerce_columns(columns)
+
+        return EventStore(
+            {
+                name: np.concatenate((values, typed[name]))
+                for name, values in current.items()
+            },
+            version=self.version + 1,
+        )
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+_listeners: List[Callable[..., None]] = []
+
+
+def get_store() -> EventStore:
+    """
+    Returns the process-wide event store, building it on first use.
+
+    The store maps the snapshot in ``VIZ_SNAPSHOT_DIR`` when there is one,
+    otherwise it is built from the mock data.
+    """
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if VIZ_SNAPSHOT_DIR:
+                    from viz.store.snapshot import load_snapshot
+
+                    _store = load_snapshot(VIZ_SNAPSHOT_DIR)
+
+                if _store is None:
+                    from viz.mockdata import data
+
+                    _store = EventStore(data)
+
+    return _store
+
+
+def append_events(columns: Mapping[str, Sequence]) -> EventStore:
+    """
+    Adds new events to the process-wide store.
+
+    Events arriving in time order are appended in place. A batch reaching back
+    before the newest stored event swaps in a rebuilt store instead, so
+    readers holding the previous one keep a consistent view.
+    """
+    global _store
+
+    get_store()
+
+    # The store is looked up under the lock, so an append never lands in a
+    # store that a concurrent merge has already replaced
+    with _store_lock:
+        store = _store
+        if not store.append(columns):
+            _store = store.merged(columns)
+        store = _store
+
+    data_changed(store)
+
+    return store
+
+
+def data_version() -> int:
+    """
+    Returns a number that changes every time new events reach the data
+    source: the store's version, or the ``Event`` table's when charts read
+    the database.
+    """
+    if VIZ_DATA_SOURCE == "database":
+        from viz.store.database import get_poller
+
+        return get_poller().version
+
+    return get_store().version
+
+
+def data_changed(*args) -> None:
+    """
+    Invokes the ``on_append`` listeners, with the store when it got the events.
+    """
+    for listener in list(_listeners):
+        listener(*args)
+
+
+def on_append(listener: Callable[..., None]) -> None:
+    """
+    Registers a callback invoked after new events are added, with the store
+    they were added to unless they went to the database.
+    """
+    _listeners.append(listener)
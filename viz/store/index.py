@@ -0,0 +1,241 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from viz.store.buffer import ColumnBuffer
+
+EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+EMPTY_POSITIONS.flags.writeable = False
+
+
+class InvertedIndex:
+    """
+    Maps every value of a column to the sorted row positions holding it.
+
+    Values are numbered in order of first appearance and every row keeps the
+    code of its value, which lets other structures (e.g. the valid-user
+    bitmap) work on dense integers instead of the raw values.
+
+    The codes double as the dictionary encoding of the column: frames get it
+    as a categorical, so charts group and rank integers instead of strings.
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        self._codes: Dict[Any, int] = {}
+        self._labels: List[Any] = []
+        self._postings: List[np.ndarray] = []
+        self._row_codes = ColumnBuffer(np.empty(0, dtype=np.int64))
+
+        # (label count, dtype, ranks) of the last built categorical dictionary
+        self._dictionary: Optional[Tuple[int, pd.CategoricalDtype, np.ndarray]] = None
+
+        self.extend(values, offset=0)
+
+    @classmethod
+    def from_dictionary(
+        cls,
+        row_codes: np.ndarray,
+        labels: Sequence[Any],
+        positions: np.ndarray,
+        bounds: np.ndarray,
+    ) -> "InvertedIndex":
+        """
+        Restores an index from an already dictionary-encoded column.
+
+        ``positions`` holds the row positions grouped by code and ascending
+        within each group, and ``bounds`` the start of every group plus the
+        end of the last one. The arrays are used as-is, so a memory-mapped
+        snapshot is indexed without copying or hashing any row.
+        """
+        index = cls(np.empty(0, dtype=object))
+
+        index._labels = list(labels)
+        index._codes = {label: code for code, label in enumerate(index._labels)}
+        index._postings = [
+            positions[lower:upper] for lower, upper in zip(bounds[:-1], bounds[1:])
+        ]
+        index._row_codes = ColumnBuffer(row_codes, copy=False)
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._codes
+
+    def code(self, value: Any) -> int:
+        """
+        Returns the code of ``value``, or -1 if it was never seen.
+        """
+        return self._codes.get(value, -1)
+
+    def labels(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Decodes codes back to the column values, -1 to None.
+        """
+        # The trailing None decodes the -1 codes of missing values
+        labels = np.empty(len(self._labels) + 1, dtype=object)
+        labels[: len(self._labels)] = self._labels
+
+        return labels[codes]
+
+    def row_codes(self, size: int = -1) -> np.ndarray:
+        """
+        Returns the code of every row; rows with a missing value get -1.
+        """
+        return self._row_codes.view(size)
+
+    def dictionary(self) -> Tuple[pd.CategoricalDtype, np.ndarray]:
+        """
+        Returns the categorical dtype of the column, with the labels sorted
+        like ``groupby`` sorts them, and the array translating row codes to
+        its category codes. The last entry of that array keeps the -1 of
+        missing values.
+
+        Labels are only ever appended, so both are rebuilt only after new
+        values were seen.
+        """
+        count = len(self._labels)
+        dictionary = self._dictionary
+
+        if dictionary is None or dictionary[0] != count:
+            labels = np.empty(count, dtype=object)
+            labels[:] = self._labels[:count]
+
+            try:
+                order = np.argsort(labels, kind="stable")
+            except TypeError:
+                # Labels of mixed types keep their order of appearance
+                order = np.arange(count)
+
+            ranks = np.empty(count + 1, dtype=np.int64)
+            ranks[order] = np.arange(count)
+            ranks[count] = -1
+
+            dictionary = (count, pd.CategoricalDtype(labels[order]), ranks)
+            self._dictionary = dictionary
+
+        return dictionary[1], dictionary[2]
+
+    def categorical(self, rows: Union[slice, np.ndarray], size: int) -> pd.Categorical:
+        """
+        Returns the values of ``rows`` as a categorical sharing the column's
+        dictionary, without touching any label.
+        """
+        row_codes = self.row_codes(size)[rows]
+        dtype, ranks = self.dictionary()
+
+        return pd.Categorical.from_codes(ranks[row_codes], dtype=dtype, validate=False)
+
+    def positions(self, value: Any) -> np.ndarray:
+        """
+        Returns the ascending row positions where the column equals ``value``.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            return EMPTY_POSITIONS
+
+        return self._postings[code]
+
+    def code_positions(self, code: int) -> np.ndarray:
+        return self._postings[code]
+
+    def extend(self, values: np.ndarray, offset: int) -> np.ndarray:
+        """
+        Indexes ``values`` as the rows starting at ``offset``.
+
+        Only the posting lists of values present in the batch are touched.
+        Returns the codes of the new rows.
+        """
+        if len(values) < 1:
+            return np.empty(0, dtype=np.int64)
+
+        local_codes, labels = pd.factorize(values, use_na_sentinel=True)
+
+        # Translate batch-local codes to the index's global codes
+        mapping = np.empty(len(labels), dtype=np.int64)
+        for local, label in enumerate(labels):
+            code = self._codes.get(label)
+            if code is None:
+                code = len(self._postings)
+                self._codes[label] = code
+                self._labels.append(label)
+                self._postings.append(EMPTY_POSITIONS)
+            mapping[local] = code
+
+        present = local_codes >= 0
+        codes = np.full(len(values), -1, dtype=np.int64)
+        codes[present] = mapping[local_codes[present]]
+
+        positions = np.flatnonzero(present) + offset
+        local_codes = local_codes[present]
+
+        # A stable sort keeps the positions of each value in ascending order
+        order = np.argsort(local_codes, kind="stable")
+        counts = np.bincount(local_codes, minlength=len(labels))
+        chunks = np.split(positions[order], np.cumsum(counts)[:-1])
+
+        for local, chunk in enumerate(chunks):
+            code = mapping[local]
+            existing = self._postings[code]
+
+            postings = np.concatenate((existing, chunk)) if len(existing) else chunk
+            postings.flags.writeable = False
+            self._postings[code] = postings
+
+        # Row codes are published last so readers never see a code without postings
+        self._row_codes.extend(codes)
+
+        return codes
+
+
+class EncodedColumn:
+    """
+    A dictionary-encoded column held only by its inverted index.
+
+    The row codes and labels of the index are the column's storage, so the
+    values are never materialized per row unless ``view`` asks for them,
+    which only slow paths (merging stores, writing snapshots) do. Appends go
+    through the index, which the store extends itself.
+    """
+
+    dtype = np.dtype(object)
+
+    def __init__(self, index: InvertedIndex) -> None:
+        self.index = index
+
+    def __len__(self) -> int:
+        return len(self.index.row_codes())
+
+    def view(self, size: int = -1) -> np.ndarray:
+        return self.index.labels(self.index.row_codes(size))
+
+    def extend(self, values: np.ndarray) -> None:
+        pass
+
+
+def intersect(postings: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Intersects sorted position arrays, starting from the shortest one.
+
+    Each step probes the surviving candidates into the next array with a binary
+    search, so the cost follows the size of the smallest posting list rather
+    than the number of rows in the store.
+    """
+    if not postings:
+        return EMPTY_POSITIONS
+
+    ordered = sorted(postings, key=len)
+    result = ordered[0]
+
+    for other in ordered[1:]:
+        if len(result) < 1 or len(other) < 1:
+            return EMPTY_POSITIONS
+
+        hits = np.searchsorted(other, result)
+        np.minimum(hits, len(other) - 1, out=hits)
+        result = result[other[hits] == result]
+
+    return result
@@ -0,0 +1,176 @@
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from viz.config import VIZ_DICTIONARY_COLUMNS
+from viz.store.events import EventStore
+from viz.store.index import InvertedIndex
+
+MANIFEST = "snapshot.json"
+
+
+def _save(directory: str, filename: str, array: np.ndarray) -> None:
+    with open(os.path.join(directory, filename), "wb") as file:
+        np.save(file, np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _encode(values: np.ndarray):
+    """
+    Dictionary-encodes an object column into int32 codes (-1 for missing
+    values), its labels, and the row positions grouped by code.
+    """
+    codes, labels = pd.factorize(values, use_na_sentinel=True)
+    codes = codes.astype(np.int32)
+
+    present = np.flatnonzero(codes >= 0)
+    order = np.argsort(codes[present], kind="stable")
+    positions = present[order].astype(np.int64)
+    bounds = np.concatenate(
+        ([0], np.cumsum(np.bincount(codes[present], minlength=len(labels))))
+    ).astype(np.int64)
+
+    return codes, labels.tolist(), positions, bounds
+
+
+def write_snapshot(store: EventStore, directory: str) -> Dict[str, Any]:
+    """
+    Writes the store as a columnar snapshot that ``load_snapshot`` maps
+    into memory.
+
+    Every numeric column becomes one ``.npy`` file. Object columns (e.g.
+    ``user_id``) are stored as int32 codes, a JSON dictionary of their labels
+    and the positions of every label, which is the store's inverted index.
+
+    Files are written under fresh names and the manifest is replaced last.
+    The files of the replaced snapshot are kept until the next write, so a
+    process that just read its manifest can still map them, and processes
+    mapping older ones keep reading consistent (unlinked) files. Nothing but
+    the files named by the snapshot manifests is ever removed.
+
+    Args:
+        store (EventStore): The store to write.
+        directory (str): The snapshot directory, created if needed.
+
+    Returns:
+        Dict[str, Any]: The written manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    token = uuid.uuid4().hex[:12]
+    size = len(store)
+    columns: Dict[str, Dict[str, str]] = {}
+
+    for name, values in store.columns.items():
+        prefix = f"{name}.{token}"
+
+        if values.dtype.kind != "O":
+            _save(directory, f"{prefix}.npy", values)
+            columns[name] = {"values": f"{prefix}.npy"}
+            continue
+
+        codes, labels, positions, bounds = _encode(values)
+        _save(directory, f"{prefix}.codes.npy", codes)
+        _save(directory, f"{prefix}.positions.npy", positions)
+        _save(directory, f"{prefix}.bounds.npy", bounds)
+        with open(os.path.join(directory, f"{prefix}.labels.json"), "w") as file:
+            json.dump(labels, file)
+
+        columns[name] = {
+            "codes": f"{prefix}.codes.npy",
+            "labels": f"{prefix}.labels.json",
+            "positions": f"{prefix}.positions.npy",
+            "bounds": f"{prefix}.bounds.npy",
+        }
+
+    # The snapshot being replaced stays on disk until the next write, for
+    # readers that already read its manifest but did not map its files yet
+    previous = read_manifest(directory)
+    manifest = {
+        "version": store.version,
+        "rows": size,
+        "columns": columns,
+        "previous": _files(previous) if previous is not None else [],
+    }
+
+    temporary = os.path.join(directory, f"{MANIFEST}.{token}")
+    with open(temporary, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary, os.path.join(directory, MANIFEST))
+
+    # Only the generation before the replaced one is dropped, and only the
+    # files its manifest named; mapped copies stay readable
+    if previous is not None:
+        for filename in previous.get("previous", []):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
+
+    return manifest
+
+
+def _files(manifest: Dict[str, Any]) -> List[str]:
+    return [
+        filename
+        for files in manifest["columns"].values()
+        for filename in files.values()
+    ]
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as file:
+        return json.load(file)
+
+
+def load_snapshot(directory: str) -> Optional[EventStore]:
+    """
+    Opens a snapshot written by ``write_snapshot`` without copying it.
+
+    Numeric columns, codes and posting lists are read-only memory maps, so
+    every worker process shares the same page cache pages and opening costs
+    no parsing. The ``VIZ_DICTIONARY_COLUMNS`` are kept as their mapped codes,
+    which frames turn into categoricals; other object columns are decoded by
+    indexing their labels with the codes.
+
+    Returns:
+        Optional[EventStore]: The store, or None when there is no snapshot.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    def mapped(filename: str) -> np.ndarray:
+        return np.load(os.path.join(directory, filename), mmap_mode="r")
+
+    columns: Dict[str, np.ndarray] = {}
+    indexes: Dict[str, InvertedIndex] = {}
+
+    for name, files in manifest["columns"].items():
+        if "values" in files:
+            columns[name] = mapped(files["values"])
+            continue
+
+        with open(os.path.join(directory, files["labels"])) as file:
+            labels: List[Any] = json.load(file)
+
+        codes = mapped(files["codes"])
+        indexes[name] = InvertedIndex.from_dictionary(
+            codes, labels, mapped(files["positions"]), mapped(files["bounds"])
+        )
+
+        # Dictionary-encoded columns stay as their mapped codes
+        columns[name] = (
+            codes
+            if name in VIZ_DICTIONARY_COLUMNS
+            else indexes[name].labels(np.asarray(codes))
+        )
+
+    return EventStore(columns, version=manifest["version"], indexes=indexes, copy=False)
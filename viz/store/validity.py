@@ -0,0 +1,140 @@
+from typing import List, Optional
+
+import numpy as np
+
+from viz.store.buffer import ColumnBuffer
+from viz.store.index import EMPTY_POSITIONS, InvertedIndex
+
+
+class InvalidUsers:
+    """
+    Incrementally maintained set of users that sent at least one invalid event.
+
+    The set is a bitmap over the user codes of the ``user_id`` index. A per-row
+    validity mask is derived from it and kept up to date as events arrive, so
+    filtering cheaters out of a chart is a lookup instead of a groupby.
+    """
+
+    def __init__(self, users: InvertedIndex, is_valid: np.ndarray) -> None:
+        self._users = users
+        self._bitmap = np.zeros(0, dtype=bool)
+        self._valid_rows = ColumnBuffer(np.empty(0, dtype=bool))
+        self._valid_positions: Optional[np.ndarray] = None
+        self._invalid_rows = 0
+
+        self.extend(users.row_codes(), is_valid)
+
+    def __len__(self) -> int:
+        return int(self._bitmap.sum())
+
+    def __contains__(self, user_id) -> bool:
+        code = self._users.code(user_id)
+        return code >= 0 and bool(self._bitmap[code])
+
+    @property
+    def all_valid(self) -> bool:
+        return self._invalid_rows == 0
+
+    def extend(self, codes: np.ndarray, is_valid: np.ndarray) -> np.ndarray:
+        """
+        Accounts for new rows, given their user codes and ``is_valid`` flags.
+
+        Users flagged for the first time get their earlier rows cleared from
+        the mask through the ``user_id`` postings, so the cost follows the
+        number of affected rows. Returns the positions of those earlier rows.
+        """
+        if len(self._bitmap) < len(self._users):
+            self._bitmap = np.concatenate(
+                (self._bitmap, np.zeros(len(self._users) - len(self._bitmap), bool))
+            )
+
+        flagged = codes[~is_valid.astype(bool) & (codes >= 0)]
+        newly_invalid = np.unique(flagged)
+        newly_invalid = newly_invalid[~self._bitmap[newly_invalid]]
+        self._bitmap[newly_invalid] = True
+
+        cleared: List[np.ndarray] = []
+        for code in newly_invalid:
+            positions = self._users.code_positions(code)
+            positions = positions[positions < len(self._valid_rows)]
+            self._valid_rows.clear(positions)
+            self._invalid_rows += len(positions)
+            cleared.append(positions)
+
+        # Events without a user can never be attributed, treat them as invalid
+        new_rows = (codes >= 0) & ~self._bitmap[np.maximum(codes, 0)]
+        self._invalid_rows += int(len(new_rows) - new_rows.sum())
+        self._valid_rows.extend(new_rows)
+
+        self._valid_positions = None
+
+        if not cleared:
+            return EMPTY_POSITIONS
+
+        return np.sort(np.concatenate(cleared))
+
+    def valid_mask(self, size: int = -1) -> np.ndarray:
+        return self._valid_rows.view(size)
+
+    def valid_positions(self, size: int = -1) -> np.ndarray:
+        """
+        Returns the positions of all rows from valid users, cached between updates.
+        """
+        positions = self._valid_positions
+        if positions is None:
+            positions = np.flatnonzero(self._valid_rows.view())
+            positions.flags.writeable = False
+            self._valid_positions = positions
+
+        if size >= 0:
+            positions = positions[: np.searchsorted(positions, size)]
+
+        return positions
+
+
+class FilteredInvalidUsers:
+    """
+    The users that sent an invalid event among the rows of one filter.
+
+    Cheaters are judged within the rows a filtered chart looks at, the way a
+    groupby over the filtered frame does: a user is only left out of a
+    miner's chart for invalid events sent to that miner. The set is a bitmap
+    over the user codes, fed with the matching rows of each appended batch.
+    """
+
+    def __init__(self, codes: np.ndarray, is_valid: np.ndarray) -> None:
+        self._bitmap = np.zeros(0, dtype=bool)
+
+        self.extend(codes, is_valid)
+
+    def extend(self, codes: np.ndarray, is_valid: np.ndarray) -> np.ndarray:
+        """
+        Accounts for new matching rows and returns the codes of the users
+        they flag for the first time.
+        """
+        flagged = codes[~is_valid.astype(bool) & (codes >= 0)]
+        if len(flagged) < 1:
+            return EMPTY_POSITIONS
+
+        size = int(flagged.max()) + 1
+        if len(self._bitmap) < size:
+            self._bitmap = np.concatenate(
+                (self._bitmap, np.zeros(size - len(self._bitmap), bool))
+            )
+
+        newly_invalid = np.unique(flagged)
+        newly_invalid = newly_invalid[~self._bitmap[newly_invalid]]
+        self._bitmap[newly_invalid] = True
+
+        return newly_invalid
+
+    def valid(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Returns the mask of rows, given their user codes, whose user is valid.
+        Events without a user are treated as invalid.
+        """
+        valid = codes >= 0
+        known = valid & (codes < len(self._bitmap))
+        valid[known] = ~self._bitmap[codes[known]]
+
+        return valid
@@ -1,3 +1,1510 @@
-from django.test import TestCase
+import asyncio
+import base64
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from viz.aggregate.correlation import correlate, top_entities
+from viz.aggregate.hyperloglog import (
+    DistinctBucketAggregator,
+    hash_values,
+    precision_for,
+)
+from viz.aggregate.quantiles import LogBins, QuantileBucketAggregator
+from viz.aggregate.rollup import Rollup
+from viz import views
+from viz.benchmark import benchmark, chart_names, compare, load_results
+from viz.cache import PageCache, page_cache
+from viz.chart import chart_base
+from viz.chart.chart_bar import group_codes, group_values
+from viz.chart.chart_base import (
+    build_data_boundaries,
+    resample_data,
+    resample_from_store,
+)
+from viz.chart.chart_builder import ChartSpec, build_figures
+from viz.chart.chart_lines import (
+    aggregate_from_store,
+    create_chart,
+    prepare_and_aggregate_data,
+)
+from viz.chart import charts
+from viz.chart.charts import get_database_data, load_data
+from viz.chart.chart_heatmap import factor_labels
+from viz.chart.columns import binary_column, plot_column, source_data
+from viz.chart.downsample import downsample_data, lttb
+from viz.config import (
+    VIZ_BENCHMARK_BASELINE,
+    VIZ_CHART_INTERVAL,
+    VIZ_CHART_WIDTH,
+    VIZ_METRICS_PERCENTILES,
+)
+from viz.live import event_stream
+from viz.mockdata import generate
+from viz.models import Event
+from viz.store import database, events
+from viz.store.events import EventStore, Selection, append_events
+from viz.store.index import InvertedIndex, intersect
+from viz.store.snapshot import load_snapshot, read_manifest, write_snapshot
+from viz.threads import stats_worker
+from viz import timing
+from viz.timing import RollingHistogram, StageMetrics
+from viz.utils import build_insert
+from viz.threads.stats_worker import (
+    METRIC_AGGREGATES,
+    Aggregate,
+    MetricType,
+    StatsWorker,
+)
+
+Columns = Dict[str, np.ndarray]
+
+
+def split(columns: Columns, parts: int) -> List[Columns]:
+    """
+    Cuts events sorted by ``created`` into consecutive batches.
+    """
+    bounds = np.linspace(0, len(columns["created"]), parts + 1).astype(int)
+
+    return [
+        {name: values[lower:upper] for name, values in columns.items()}
+        for lower, upper in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def concat(batches: List[Columns]) -> Columns:
+    return {
+        name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]
+    }
+
+
+def valid_frame(columns: Columns, **filters) -> pd.DataFrame:
+    """
+    The rows matching ``filters`` of users that sent no invalid event among
+    them, computed with pandas the way ``get_data`` filtered frames.
+    """
+    df = pd.DataFrame(columns)
+    for name, value in filters.items():
+        df = df[df[name] == value]
+
+    valid_users = df.groupby("user_id")["is_valid"].all()
+
+    return df[df["user_id"].isin(valid_users[valid_users].index)]
+
+
+def with_gap(columns: Columns, start: str, end: str) -> Columns:
+    """
+    Drops the events of ``[start, end)`` after the first one, leaving a run of
+    empty buckets in the middle of the data.
+    """
+    created = pd.DatetimeIndex(columns["created"])
+    origin = created[0].floor("1D")
+    inside = (created >= origin + pd.Timedelta(start)) & (
+        created < origin + pd.Timedelta(end)
+    )
+
+    return {name: values[~inside] for name, values in columns.items()}
+
+
+def detached(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copies a store frame without its selection, so charts resample it with
+    pandas instead of reading the store's rollups.
+    """
+    plain = data.copy()
+    plain.attrs = {}
+
+    return plain
+
+
+@contextmanager
+def using_store(store: EventStore) -> Iterator[EventStore]:
+    previous = events._store
+    events._store = store
+
+    try:
+        yield store
+    finally:
+        events._store = previous
+
+
+def flag_earlier_user(batches: List[Columns]) -> Tuple[List[Columns], str]:
+    """
+    Marks an event of the last batch invalid, for a user that only sent valid
+    events so far and already appears in the first batch.
+    """
+    earlier = concat(batches[:-1])
+    invalid = set(earlier["user_id"][~earlier["is_valid"]])
+
+    last = {name: values.copy() for name, values in batches[-1].items()}
+    candidates = [
+        row
+        for row, user in enumerate(last["user_id"])
+        if user not in invalid and user in set(batches[0]["user_id"])
+    ]
+    last["is_valid"][candidates[0]] = False
+
+    return [*batches[:-1], last], last["user_id"][candidates[0]]
+
+
+class IndexTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.columns = generate(size=2000, seed=3, days=1)
+
+    def test_intersect_matches_numpy(self) -> None:
+        rng = np.random.default_rng(5)
+        postings = [
+            np.unique(rng.integers(0, 1000, size)) for size in (400, 30, 700, 120)
+        ]
+
+        for count in range(1, len(postings) + 1):
+            expected = postings[0]
+            for other in postings[1:count]:
+                expected = np.intersect1d(expected, other)
+
+            np.testing.assert_array_equal(intersect(postings[:count]), expected)
+
+        self.assertEqual(len(intersect([])), 0)
+        self.assertEqual(len(intersect([postings[0], postings[0][:0]])), 0)
+
+    def test_positions_follow_appends(self) -> None:
+        values = self.columns["miner"]
+        index = InvertedIndex(values[:1500])
+        index.extend(values[1500:], offset=1500)
+
+        for value in set(values):
+            np.testing.assert_array_equal(
+                index.positions(value), np.flatnonzero(values == value)
+            )
+        self.assertEqual(len(index.positions("unknown")), 0)
+        np.testing.assert_array_equal(index.labels(index.row_codes()), values)
+
+    def test_lookup_matches_masks(self) -> None:
+        store = EventStore(self.columns)
+        df = pd.DataFrame(self.columns)
+        user, miner = df.loc[7, "user_id"], df.loc[7, "miner"]
+
+        for filters in ({"user_id": user}, {"user_id": user, "miner": miner}):
+            mask = np.logical_and.reduce(
+                [df[name] == value for name, value in filters.items()]
+            )
+            np.testing.assert_array_equal(store.lookup(filters), np.flatnonzero(mask))
+
+        self.assertEqual(len(store.lookup({"user_id": user, "miner": "unknown"})), 0)
+
+
+class GroupCodesTests(SimpleTestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(37)
+        miners = np.array(["miner-0", "miner-1", "miner-2", "miner-3", None], object)
+
+        # miner-3 is never seen, and rows without a miner have code -1
+        miner = miners[rng.choice([0, 1, 2, 4], 400, p=[0.5, 0.3, 0.15, 0.05])]
+        weight = rng.random(400)
+        weight[rng.random(400) < 0.1] = np.nan
+        weight[miner == "miner-2"] = np.nan
+
+        self.data = pd.DataFrame(
+            {
+                "miner": pd.Categorical(miner, categories=miners[:4]),
+                "weight": weight,
+            }
+        )
+
+    def expected(self, agg: str, name: str) -> pd.DataFrame:
+        grouped = self.data.groupby("miner", observed=True)
+        result = grouped.size() if agg == "size" else grouped["weight"].agg(agg)
+
+        return result.reset_index(name=name)
+
+    def test_counts(self) -> None:
+        pd.testing.assert_frame_equal(
+            group_codes(self.data["miner"]), self.expected("size", "count")
+        )
+
+    def test_totals(self) -> None:
+        pd.testing.assert_frame_equal(
+            group_codes(self.data["miner"], self.data["weight"]),
+            self.expected("sum", "total_value"),
+        )
+
+    def test_averages(self) -> None:
+        grouped = group_codes(self.data["miner"], self.data["weight"], value_avg=True)
+
+        # miner-2 only has missing weights, which average to NaN either way
+        pd.testing.assert_frame_equal(grouped, self.expected("mean", "total_value"))
+        self.assertTrue(np.isnan(grouped["total_value"].iloc[-1]))
+
+    def test_matches_plain_columns(self) -> None:
+        plain = self.data.astype({"miner": object})
+
+        for value_col, value_avg in (
+            (None, False),
+            ("weight", False),
+            ("weight", True),
+        ):
+            with self.subTest(value_col=value_col, value_avg=value_avg):
+                encoded = group_values(self.data, "miner", value_col, value_avg)
+                expected = group_values(plain, "miner", value_col, value_avg)
+
+                pd.testing.assert_frame_equal(
+                    encoded.astype({"miner": object}), expected
+                )
+
+
+class AppendEventsTests(SimpleTestCase):
+    """
+    Appending batches must leave the store, its invalid users and its rollups
+    exactly as a store rebuilt from all the events.
+    """
+
+    def setUp(self) -> None:
+        batches = split(generate(size=4000, seed=3, days=3), 4)
+        self.batches, self.flagged = flag_earlier_user(batches)
+        self.columns = concat(self.batches)
+
+        self.store = EventStore(self.batches[0])
+        self.valid = Selection(valid_only=True)
+        self.miner = Selection.build({"miner": "miner-0"}, valid_only=True)
+
+        # The miner the flagged user sent its invalid event to
+        last = self.batches[-1]
+        flagged_row = np.flatnonzero(
+            (last["user_id"] == self.flagged) & ~last["is_valid"]
+        )[0]
+        self.flagged_miner = Selection.build(
+            {"miner": last["miner"][flagged_row]}, valid_only=True
+        )
+
+        # Rollups built before the appends are then only updated in place
+        self.store.rollup(self.valid)
+        self.store.rollup(self.valid, "weight")
+        self.store.rollup(self.miner, "amount")
+        self.store.rollup(self.flagged_miner)
+        self.store.rollup(self.valid, "weight", group_by="validator")
+        self.store.rollup(self.valid, "user_id", precision=precision_for(0.05))
+        self.store.rollup(self.valid, "user_latency", quantiles=True)
+
+        for batch in self.batches[1:]:
+            self.assertTrue(self.store.append(batch))
+
+        self.fresh = EventStore(self.columns)
+
+    def test_frames_match_rebuild(self) -> None:
+        self.assertEqual(len(self.store), len(self.fresh))
+        pd.testing.assert_frame_equal(self.store.frame(), self.fresh.frame())
+
+        for selection in (self.valid, self.miner):
+            pd.testing.assert_frame_equal(
+                self.store.select(selection), self.fresh.select(selection)
+            )
+
+    def test_flags_earlier_rows(self) -> None:
+        invalid_users = self.store.invalid_users()
+        self.assertIn(self.flagged, invalid_users)
+
+        expected = valid_frame(self.columns)
+        selected = self.store.select(self.valid)
+
+        self.assertNotIn(self.flagged, set(selected["user_id"]))
+        np.testing.assert_array_equal(selected["_id"], expected["_id"])
+        np.testing.assert_array_equal(
+            invalid_users.valid_mask(), self.fresh.invalid_users().valid_mask()
+        )
+
+    def test_rollups_match_rebuild(self) -> None:
+        for selection, key, group_by, how in (
+            (self.valid, None, None, "count"),
+            (self.valid, "weight", None, "sum"),
+            (self.valid, "weight", None, "mean"),
+            (self.miner, "amount", None, "sum"),
+            (self.flagged_miner, None, None, "count"),
+            (self.valid, "weight", "validator", "mean"),
+        ):
+            with self.subTest(selection=selection, key=key, how=how):
+                updated = self.store.rollup(selection, key, group_by)
+                rebuilt = self.fresh.rollup(selection, key, group_by)
+
+                self.assertEqual(updated.rows, rebuilt.rows)
+                pd.testing.assert_frame_equal(
+                    updated.frame("1h", how), rebuilt.frame("1h", how)
+                )
+
+    def test_filtered_users_judged_on_their_rows(self) -> None:
+        df = pd.DataFrame(self.columns)
+        invalid = set(df.loc[~df["is_valid"], "user_id"])
+        miners = df.loc[df["user_id"].isin(invalid), "miner"].unique()
+
+        kept = 0
+        for miner in miners:
+            with self.subTest(miner=miner):
+                selection = Selection.build({"miner": miner}, valid_only=True)
+                expected = valid_frame(self.columns, miner=miner)
+
+                for store in (self.store, self.fresh):
+                    np.testing.assert_array_equal(
+                        store.select(selection)["_id"], expected["_id"]
+                    )
+                kept += len(set(expected["user_id"]) & invalid)
+
+        # Users with invalid events elsewhere stay on a miner's chart
+        self.assertGreater(kept, 0)
+
+        # The flagged user only has earlier rows on this miner taken out
+        miner = self.flagged_miner.filters_dict["miner"]
+        earlier = concat(self.batches[:-1])
+        self.assertTrue(
+            np.any((earlier["user_id"] == self.flagged) & (earlier["miner"] == miner))
+        )
+        self.assertNotIn(
+            self.flagged, set(self.store.select(self.flagged_miner)["user_id"])
+        )
+
+    def test_rollups_match_pandas(self) -> None:
+        resampler = valid_frame(self.columns).set_index("created").resample("1h")
+
+        counts = self.store.rollup(self.valid).frame("1h", "count")
+        np.testing.assert_array_equal(counts["count"], resampler.size())
+
+        sums = self.store.rollup(self.valid, "weight").frame("1h", "sum")
+        np.testing.assert_allclose(sums["count"], resampler["weight"].sum())
+
+        miner = self.flagged_miner.filters_dict["miner"]
+        counts = self.store.rollup(self.flagged_miner).frame("1h", "count")
+        expected = (
+            valid_frame(self.columns, miner=miner)
+            .set_index("created")
+            .resample("1h")
+            .size()
+        )
+        np.testing.assert_array_equal(
+            counts.set_index("period")["count"].reindex(expected.index, fill_value=0),
+            expected,
+        )
+
+    def test_sketches_match_rebuild(self) -> None:
+        precision = precision_for(0.05)
+        distinct = self.store.rollup(self.valid, "user_id", precision=precision)
+        pd.testing.assert_frame_equal(
+            distinct.frame("1h", "nunique"),
+            self.fresh.rollup(self.valid, "user_id", precision=precision).frame(
+                "1h", "nunique"
+            ),
+        )
+
+        percentiles = (50, 95, 99)
+        quantiles = self.store.rollup(self.valid, "user_latency", quantiles=True)
+        pd.testing.assert_frame_equal(
+            quantiles.quantiles("1h", percentiles),
+            self.fresh.rollup(self.valid, "user_latency", quantiles=True).quantiles(
+                "1h", percentiles
+            ),
+        )
+
+    def test_append_events_follows_merged_store(self) -> None:
+        first, second, third, fourth = self.batches
+
+        with using_store(EventStore(concat([first, third]))) as initial:
+            # Reaching back before the newest event swaps in a merged store,
+            # later appends must land in that one
+            merged = append_events(second)
+            self.assertIsNot(merged, initial)
+            self.assertIs(append_events(fourth), merged)
+            self.assertIs(events._store, merged)
+
+        self.assertEqual(len(merged), len(self.fresh))
+        pd.testing.assert_frame_equal(
+            merged.select(self.valid), self.fresh.select(self.valid)
+        )
+
+
+class BuildFiguresTests(SimpleTestCase):
+    def test_keeps_input_order(self) -> None:
+        threads = []
+
+        def chart(name: str, delay: float) -> str:
+            threads.append(threading.current_thread().name)
+            time.sleep(delay)
+            return name
+
+        # Later charts finish first, figures that are already built pass through
+        charts = [
+            ChartSpec(chart, {"name": "slow", "delay": 0.2}),
+            "built",
+            ChartSpec(chart, {"name": "medium", "delay": 0.1}),
+            ChartSpec(chart, {"name": "fast", "delay": 0}),
+        ]
+
+        self.assertEqual(build_figures(charts), ["slow", "built", "medium", "fast"])
+        self.assertTrue(all(name.startswith("viz-chart") for name in threads))
+
+    def test_single_spec_runs_inline(self) -> None:
+        charts = [ChartSpec(threading.current_thread), "built"]
+
+        self.assertEqual(build_figures(charts), [threading.current_thread(), "built"])
+
+
+class FixedNow(datetime):
+    @classmethod
+    def now(cls, tz=None) -> datetime:
+        return cls(2026, 10, 17, 12, 34, 56)
+
+
+class BoundaryTests(SimpleTestCase):
+    lookback = datetime(2026, 10, 15, 8, 10, 0)
+
+    def setUp(self) -> None:
+        patcher = mock.patch.multiple(
+            chart_base, datetime=FixedNow, last_cycle=lambda: self.lookback
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        periods = pd.date_range("2026-10-16 03:00", periods=6, freq="1h")
+        self.resampled = pd.DataFrame(
+            {
+                "period": periods.repeat(2),
+                "count": np.arange(12, dtype=float) + 1,
+                "count_smoothed": np.arange(12, dtype=float) + 0.5,
+                "miner": ["miner-b", "miner-a"] * 6,
+            }
+        )
+        # miner-a only has its last four periods
+        self.resampled = self.resampled.drop(index=[1, 3]).reset_index(drop=True)
+
+    def padded(self, resampled: pd.DataFrame, trail: bool) -> pd.DataFrame:
+        """
+        The padding that ``build_insert`` rows used to give a single line.
+        """
+        period = "1h"
+        rows = [
+            build_insert(self.lookback, period),
+            build_insert(resampled.iloc[0]["period"] - pd.Timedelta(period), period),
+            resampled[["count", "period", "count_smoothed"]],
+        ]
+        if trail:
+            last = resampled.iloc[-1]["count"]
+            rows.append(build_insert(FixedNow.now(), period, last_count=last))
+        else:
+            last = resampled.iloc[-1]["period"] + pd.Timedelta(period)
+            rows.append(build_insert(last, period))
+            rows.append(build_insert(FixedNow.now(), period))
+
+        return pd.concat(rows, ignore_index=True)
+
+    def assert_padded(self, built: pd.DataFrame, expected: pd.DataFrame) -> None:
+        for name in ("period", "count", "count_smoothed"):
+            np.testing.assert_array_equal(
+                built[name].to_numpy(), expected[name].to_numpy()
+            )
+
+    def test_single_line_matches_inserts(self) -> None:
+        line = self.resampled[self.resampled["miner"] == "miner-b"]
+        line = line.drop(columns="miner")
+
+        for trail in (False, True):
+            with self.subTest(trail=trail):
+                built = build_data_boundaries(line, "1h", trail_values=trail)
+                self.assert_padded(built, self.padded(line, trail))
+
+    def test_groups_get_their_own_padding(self) -> None:
+        for trail in (False, True):
+            built = build_data_boundaries(
+                self.resampled, "1h", group_by="miner", trail_values=trail
+            )
+            self.assertEqual(list(pd.unique(built["miner"])), ["miner-a", "miner-b"])
+
+            for miner, rows in self.resampled.groupby("miner"):
+                with self.subTest(trail=trail, miner=miner):
+                    self.assert_padded(
+                        built[built["miner"] == miner], self.padded(rows, trail)
+                    )
+
+    def test_empty_data_spans_the_lookback(self) -> None:
+        built = build_data_boundaries(self.resampled.iloc[:0], "1h")
+
+        self.assertEqual(
+            list(built["period"]),
+            [pd.Timestamp("2026-10-15 08:00"), pd.Timestamp("2026-10-17 12:00")],
+        )
+        self.assertEqual(list(built["count"]), [0, 0])
+
+
+class MultiLineTests(SimpleTestCase):
+    def setUp(self) -> None:
+        periods = pd.date_range("2026-10-16", periods=8, freq="1h")
+        self.resampled = pd.DataFrame(
+            {
+                "period": np.tile(periods, 3),
+                "count_smoothed": np.arange(24, dtype=float),
+                "miner": pd.Categorical(["miner-c"] * 8 + ["miner-a"] * 8 + [None] * 8),
+            }
+        ).sample(frac=1, random_state=1)
+
+    def test_packs_every_group_into_one_renderer(self) -> None:
+        batched = create_chart("Lines", [], self.resampled, "miner")
+        lines = create_chart("Lines", [], self.resampled, "miner", batched=False)
+
+        self.assertEqual(len(batched.renderers), 1)
+        self.assertEqual(len(lines.renderers), 2)
+
+        data = batched.renderers[0].data_source.data
+        self.assertEqual(data["miner"], ["miner-a", "miner-c"])
+
+        # Each packed line holds what its own renderer plotted before
+        for xs, ys, color, renderer in zip(
+            data["xs"], data["ys"], data["color"], lines.renderers
+        ):
+            self.assertEqual(color, renderer.glyph.line_color)
+            np.testing.assert_array_equal(xs, renderer.data_source.data["period"])
+            np.testing.assert_array_equal(
+                ys, renderer.data_source.data["count_smoothed"]
+            )
+
+
+class ColumnTests(SimpleTestCase):
+    def decode(self, column: Dict[str, str]) -> np.ndarray:
+        return np.frombuffer(base64.b64decode(column["data"]), dtype=column["dtype"])
+
+    def test_plot_column_dtypes(self) -> None:
+        created = np.array(["2026-10-17T00:00:01", "NaT"], dtype="datetime64[ns]")
+        millis = plot_column(created)
+        self.assertEqual(millis.dtype, np.float64)
+        self.assertEqual(millis[0], pd.Timestamp(created[0]).value / 1e6)
+        self.assertTrue(np.isnan(millis[1]))
+
+        self.assertEqual(plot_column(np.arange(3, dtype=np.int64)).dtype, np.int32)
+        self.assertEqual(plot_column(np.array([2**40])).dtype, np.float64)
+        self.assertEqual(plot_column(np.array([True, False])).dtype, np.uint8)
+        self.assertEqual(plot_column(np.array(["a", None], dtype=object)).dtype, object)
+
+        strided = plot_column(np.arange(10.0)[::2])
+        self.assertTrue(strided.flags.c_contiguous)
+
+    def test_source_data_keeps_plotted_columns(self) -> None:
+        frame = pd.DataFrame({"period": [1, 2], "count": [0.5, 1.5], "extra": [3, 4]})
+        self.assertEqual(
+            list(source_data(frame, ["period", "count"])), ["period", "count"]
+        )
+
+    def test_binary_column_round_trips(self) -> None:
+        for values in (
+            np.array([1.5, np.nan, -2.0]),
+            np.arange(4, dtype=np.int64),
+            np.array(["2026-10-17"], dtype="datetime64[ns]"),
+        ):
+            with self.subTest(dtype=values.dtype):
+                encoded = binary_column(values)
+                np.testing.assert_array_equal(self.decode(encoded), plot_column(values))
+
+        # Labels stay JSON, lists of lines are encoded line by line
+        self.assertEqual(
+            binary_column(np.array(["a", None], dtype=object)), ["a", None]
+        )
+        lines = binary_column([np.arange(2.0), np.arange(3.0)])
+        self.assertEqual([len(self.decode(line)) for line in lines], [2, 3])
+
+
+class DownsampleTests(SimpleTestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(17)
+        self.x = np.arange(5000, dtype=np.int64) * 60
+        self.y = rng.normal(100, 5, 5000)
+
+        # A lone spike and dip the downsampled line must keep
+        self.y[1234], self.y[3821] = 400, -200
+
+    def test_keeps_ends_count_and_peaks(self) -> None:
+        kept = lttb(self.x, self.y, 300)
+
+        self.assertEqual(len(kept), 300)
+        self.assertEqual((kept[0], kept[-1]), (0, 4999))
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertIn(1234, kept)
+        self.assertIn(3821, kept)
+
+    def test_short_lines_are_untouched(self) -> None:
+        np.testing.assert_array_equal(
+            lttb(self.x[:50], self.y[:50], 300), np.arange(50)
+        )
+        np.testing.assert_array_equal(lttb(self.x, self.y, 2), np.arange(5000))
+
+    def test_groups_are_downsampled_apart(self) -> None:
+        resampled = pd.DataFrame(
+            {
+                "period": np.tile(self.x, 2).view("datetime64[s]"),
+                "count_smoothed": np.concatenate((self.y, -self.y)),
+                "miner": ["miner-a"] * 5000 + ["miner-b"] * 5000,
+            }
+        )
+
+        # Off unless asked for
+        self.assertIs(downsample_data(resampled, group_by="miner"), resampled)
+
+        downsampled = downsample_data(resampled, group_by="miner", downsample=200)
+        for miner, line in downsampled.groupby("miner"):
+            with self.subTest(miner=miner):
+                self.assertEqual(len(line), 200)
+                self.assertEqual(line["period"].iloc[0], resampled["period"].iloc[0])
+                self.assertEqual(line["period"].iloc[-1], resampled["period"].iloc[-1])
+                self.assertIn(400, line["count_smoothed"].abs().to_numpy())
+
+        # Capped by the chart width
+        self.assertEqual(
+            len(downsample_data(resampled.iloc[:5000], downsample=10**6)),
+            VIZ_CHART_WIDTH,
+        )
+
+
+class ResampleParityTests(SimpleTestCase):
+    """
+    Resampling from the store's running aggregates must give what
+    ``DataFrame.resample`` gives for the same frame.
+    """
+
+    def setUp(self) -> None:
+        columns = with_gap(generate(size=3000, seed=5, days=3), "1D6h", "1D13h")
+        self.store = EventStore(columns)
+
+    def test_matches_pandas(self) -> None:
+        selections = (
+            Selection(valid_only=True),
+            Selection.build({"miner": "miner-3"}),
+            Selection.build({"validator": "validator-1"}, valid_only=True),
+        )
+
+        with using_store(self.store):
+            for selection in selections:
+                data = self.store.select(selection)
+
+                for period in ("5min", "1h", "2h", "3h", "1D"):
+                    for key_sum, key_mean in (
+                        (None, False),
+                        ("weight", False),
+                        ("weight", True),
+                        ("amount", False),
+                    ):
+                        with self.subTest(
+                            selection=selection, period=period, key=key_sum
+                        ):
+                            self.assertIsNotNone(
+                                resample_from_store(data, period, key_mean, key_sum)
+                            )
+
+                            resampled = resample_data(data, period, key_mean, key_sum)
+                            expected = resample_data(
+                                detached(data), period, key_mean, key_sum
+                            )
+
+                            np.testing.assert_array_equal(
+                                resampled["period"], expected["period"]
+                            )
+                            np.testing.assert_allclose(
+                                resampled["count"], expected["count"]
+                            )
+
+    def test_empty_buckets(self) -> None:
+        data = self.store.select(Selection())
+
+        with using_store(self.store):
+            resampled = resample_data(data, "1h", key_sum="weight", key_mean=True)
+
+        # The gap is kept as zero-row periods, with no mean, like resample
+        gap = resampled["period"].between(
+            data["created"].iloc[0].floor("1D") + pd.Timedelta("1D6h"),
+            data["created"].iloc[0].floor("1D") + pd.Timedelta("1D12h"),
+        )
+        self.assertEqual(gap.sum(), 7)
+        self.assertTrue(resampled.loc[gap, "count"].isna().all())
+
+    def test_filtered_frames_use_pandas(self) -> None:
+        data = self.store.select(Selection())
+        filtered = data[data["weight"] > data["weight"].median()]
+
+        with using_store(self.store):
+            self.assertIsNone(resample_from_store(filtered, "1h", key_sum="weight"))
+
+
+class RollupParityTests(SimpleTestCase):
+    """
+    Every period answered by merging a rollup resolution, grouped or not,
+    must match ``DataFrame.resample(...).agg(...)``.
+    """
+
+    def setUp(self) -> None:
+        columns = with_gap(generate(size=3000, seed=7, days=4), "2D1h", "2D20h")
+        self.store = EventStore(columns)
+        self.selection = Selection.build({"validator": "validator-0"}, valid_only=True)
+        self.data = self.store.select(self.selection)
+
+    def test_resolutions_match_pandas(self) -> None:
+        resampler = detached(self.data).set_index("created")
+
+        for period in ("5min", "15min", "1h", "2h", "4h", "6h", "1D"):
+            for key, how in ((None, "count"), ("weight", "sum"), ("weight", "mean")):
+                with self.subTest(period=period, key=key, how=how):
+                    frame = self.store.rollup(self.selection, key).frame(period, how)
+
+                    if key is None:
+                        expected = resampler.resample(period).size()
+                    else:
+                        expected = resampler.resample(period)[key].agg(how)
+
+                    np.testing.assert_array_equal(frame["period"], expected.index)
+                    np.testing.assert_allclose(frame["count"], expected.to_numpy())
+
+    def test_unaligned_periods_fall_back(self) -> None:
+        rollup = self.store.rollup(self.selection, "weight")
+
+        for period in ("7min", "5h", "2D"):
+            with self.subTest(period=period):
+                self.assertIsNone(rollup.frame(period, "sum"))
+
+    def test_grouped_match_pandas(self) -> None:
+        with using_store(self.store):
+            for group_by in ("miner", "user_id"):
+                for period in ("5min", "1h", "4h", "1D"):
+                    for key_sum, key_mean in (
+                        (None, False),
+                        ("weight", False),
+                        ("weight", True),
+                    ):
+                        with self.subTest(
+                            group_by=group_by, period=period, key=key_sum
+                        ):
+                            self.assertIsNotNone(
+                                aggregate_from_store(
+                                    self.data, period, group_by, key_sum, key_mean
+                                )
+                            )
+
+                            resampled = prepare_and_aggregate_data(
+                                self.data, period, group_by, key_sum, key_mean
+                            )
+                            expected = prepare_and_aggregate_data(
+                                detached(self.data), period, group_by, key_sum, key_mean
+                            ).sort_values(["created", group_by], ignore_index=True)
+
+                            self.assertEqual(list(resampled), list(expected))
+                            np.testing.assert_array_equal(
+                                resampled["created"], expected["created"]
+                            )
+                            np.testing.assert_array_equal(
+                                resampled[group_by], expected[group_by].astype(object)
+                            )
+                            np.testing.assert_array_equal(
+                                resampled["_id"], expected["_id"]
+                            )
+                            if key_sum:
+                                np.testing.assert_allclose(
+                                    resampled[key_sum], expected[key_sum]
+                                )
+
+
+class SketchAccuracyTests(SimpleTestCase):
+    """
+    Sketched distinct counts and quantiles must stay within their documented
+    error bounds of the exact pandas/numpy results.
+    """
+
+    HOUR_NS = pd.Timedelta("1h").value
+
+    def events(self, size: int, hours: int, seed: int) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        created = pd.Timestamp("2026-01-01") + pd.to_timedelta(
+            np.sort(rng.integers(0, hours * 3600, size)), unit="s"
+        )
+
+        return pd.DataFrame(
+            {
+                "created": created,
+                "user_id": rng.integers(0, size // 2, size).astype(str),
+                "user_latency": rng.lognormal(0.0, 1.5, size),
+            }
+        )
+
+    def test_distinct_counts(self) -> None:
+        error = 0.05
+        precision = precision_for(error)
+        standard_error = 1.04 / np.sqrt(1 << precision)
+        self.assertLessEqual(standard_error, error)
+
+        data = self.events(size=200_000, hours=24, seed=23)
+
+        for period in ("1h", "6h", "1D"):
+            with self.subTest(period=period):
+                aggregator = DistinctBucketAggregator(self.HOUR_NS, precision)
+                hashes, present = hash_values(data["user_id"])
+                aggregator.add(data["created"].to_numpy(), hashes, present=present)
+
+                estimated = aggregator.frame(
+                    "nunique", pd.Timedelta(period).value
+                ).set_index("period")["count"]
+                exact = data.set_index("created").resample(period)["user_id"].nunique()
+
+                relative = np.abs(estimated.to_numpy() / exact.to_numpy() - 1)
+                np.testing.assert_array_equal(estimated.index, exact.index)
+                self.assertLess(relative.max(), 3 * standard_error)
+                self.assertLess(relative.mean(), standard_error)
+
+    def test_quantiles(self) -> None:
+        accuracy, minimum, maximum = 0.01, 1e-3, 1e6
+        bins = LogBins(accuracy, minimum, maximum)
+        data = self.events(size=50_000, hours=12, seed=29)
+
+        for period in ("1h", "4h"):
+            with self.subTest(period=period):
+                aggregator = QuantileBucketAggregator(self.HOUR_NS, bins)
+                aggregator.add(
+                    data["created"].to_numpy(), data["user_latency"].to_numpy()
+                )
+                sketched = aggregator.quantiles(
+                    (50, 95, 99), pd.Timedelta(period).value
+                )
+
+                groups = data.set_index("created").resample(period)["user_latency"]
+                for position, (start, values) in enumerate(groups):
+                    self.assertEqual(sketched["period"][position], start)
+                    for percentile in (50, 95, 99):
+                        exact = np.quantile(values, percentile / 100, method="lower")
+                        self.assertLessEqual(
+                            abs(sketched[f"p{percentile}"][position] - exact),
+                            accuracy * exact + minimum,
+                        )
+
+
+class CorrelationTests(SimpleTestCase):
+    def test_correlate_matches_numpy(self) -> None:
+        rng = np.random.default_rng(37)
+        matrix = rng.poisson(3, (48, 6)).astype(float)
+        matrix[:, 4] = 2 * matrix[:, 1] + 1
+        matrix[:, 5] = 7
+
+        correlation = correlate(matrix)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = np.corrcoef(matrix, rowvar=False)
+        np.testing.assert_allclose(correlation, expected, atol=1e-12)
+        self.assertAlmostEqual(correlation[1, 4], 1)
+
+        # A constant column correlates with nothing, itself included
+        self.assertTrue(np.all(np.isnan(correlation[5])))
+        self.assertTrue(np.all(np.isnan(correlation[:, 5])))
+
+    def test_top_entities(self) -> None:
+        codes = np.array([0, 1, 1, 2, 2, 2, 3, 3, 3, 3, 4])
+        weights = np.ones(len(codes))
+        weights[-1] = 5
+
+        np.testing.assert_array_equal(top_entities(codes, weights, 2), [4, 3])
+        np.testing.assert_array_equal(top_entities(codes, weights, 4), [4, 3, 2, 1])
+
+        # Asking for more returns all of them, ties keep the lower code first
+        weights[3] = 2
+        np.testing.assert_array_equal(top_entities(codes, weights, 10), [4, 2, 3, 1, 0])
+
+    def test_factor_labels_are_unique(self) -> None:
+        first = "5FHneW46xGXgs5mUiveU4sbTyGBzmstUspZC92UhjJM694ty"
+        second = first[:-8] + "00000000" + first[-4:]
+
+        factors = factor_labels([first, "5Gx" * 16, 1, "1", None, "miner-3"])
+        self.assertEqual(factors[1], "5Gx5Gx…x5Gx")
+        self.assertEqual(factors[2:], ["1", "1 (2)", "Unknown", "miner-3"])
+
+        # Shortened labels that would collide are shown in full
+        self.assertEqual(factor_labels([first, second]), [first, second])
+
+    def test_page_shows_every_heatmap(self) -> None:
+        with using_store(EventStore(generate(size=2000, seed=41, days=2))):
+            response = self.client.get("/viz/correlation")
+
+        self.assertEqual(response.status_code, 200)
+        for title in ("User Id", "Miner Hotkey", "Miner"):
+            self.assertContains(response, f"Vote Correlation By {title}")
+
+
+class DatabaseSourceTests(TestCase):
+    """
+    Charts served from the database must see the same events as the ones
+    served from the in-memory store.
+    """
+
+    def setUp(self) -> None:
+        self.columns = generate(size=1200, seed=11, days=5)
+        self.store = EventStore(self.columns)
+
+    def test_bulk_insert_in_batches(self) -> None:
+        self.assertEqual(Event.objects.bulk_insert(self.columns, batch_size=500), 1200)
+        self.assertEqual(Event.objects.count(), 1200)
+
+    def test_loads_only_the_lookback(self) -> None:
+        Event.objects.bulk_insert(self.columns, batch_size=500)
+        since = pd.Timestamp(self.columns["created"][-1]) - pd.Timedelta("2D")
+
+        with mock.patch.object(
+            charts, "last_cycle", return_value=since.to_pydatetime()
+        ), CaptureQueriesContext(connection) as queries:
+            loaded = get_database_data(MetricType.VOTES, miner="miner-2")
+
+        # The window is part of the query, older rows never reach pandas
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]["sql"].count('"created" >='), 2)
+
+        recent = {
+            name: values[self.columns["created"] >= since]
+            for name, values in self.columns.items()
+        }
+        expected = valid_frame(recent, miner="miner-2")
+        self.assertLess(len(expected), len(valid_frame(self.columns, miner="miner-2")))
+        np.testing.assert_array_equal(np.sort(loaded["_id"]), np.sort(expected["_id"]))
+
+    def test_matches_memory_source(self) -> None:
+        Event.objects.bulk_insert(self.columns, batch_size=500)
+        user = self.columns["user_id"][0]
+
+        # A lookback before the first event loads what the store holds
+        with using_store(self.store), mock.patch.object(
+            charts, "last_cycle", return_value=datetime(2000, 1, 1)
+        ):
+            for kwargs in ({}, {"user_id": user}, {"miner": "miner-2"}):
+                with self.subTest(**kwargs):
+                    expected = load_data(MetricType.VOTES, **kwargs)
+                    loaded = get_database_data(MetricType.VOTES, **kwargs)
+
+                    # Events created in the same second may come in any order
+                    np.testing.assert_array_equal(
+                        np.sort(loaded["_id"]), np.sort(expected["_id"])
+                    )
+                    np.testing.assert_array_equal(
+                        loaded["created"].to_numpy("datetime64[us]"),
+                        expected["created"].to_numpy("datetime64[us]"),
+                    )
+
+
+class DatabaseVersionTests(TransactionTestCase):
+    """
+    With the database as the source, ETags and cached pages follow the rows
+    of the ``Event`` table.
+    """
+
+    def setUp(self) -> None:
+        self.batches = split(generate(size=600, seed=31, days=1), 2)
+
+        for module in (events, views, charts):
+            patcher = mock.patch.object(module, "VIZ_DATA_SOURCE", "database")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # The test polls itself, in-memory SQLite locks tables across threads
+        patcher = mock.patch.multiple(database, VIZ_DATABASE_POLL=3600, _poller=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: database._poller and database._poller.stop())
+
+        patcher = mock.patch.multiple(views, _store_ready=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_etag_follows_inserted_rows(self) -> None:
+        Event.objects.bulk_insert(self.batches[0])
+
+        with using_store(None):
+            response = self.client.get("/viz/users/data")
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+            cached = self.client.get("/viz/users/data", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(cached.status_code, 304)
+
+            Event.objects.bulk_insert(self.batches[1])
+            self.assertTrue(database.get_poller().poll())
+
+            response = self.client.get("/viz/users/data", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+            # Nothing built the in-memory store
+            self.assertIsNone(events._store)
+
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.batches = split(generate(size=2000, seed=13, days=2), 2)
+        self.store = EventStore(self.batches[0])
+
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def test_keeps_codes_mapped(self) -> None:
+        write_snapshot(self.store, self.directory)
+        loaded = load_snapshot(self.directory)
+
+        pd.testing.assert_frame_equal(loaded.frame(), self.store.frame())
+
+        codes = loaded.index("user_id").row_codes()
+        self.assertIsInstance(codes.base, np.memmap)
+        self.assertIsInstance(loaded.frame()["user_id"].dtype, pd.CategoricalDtype)
+
+        # Appending moves the codes to memory, the results stay the same
+        selection = Selection(valid_only=True)
+        self.assertTrue(loaded.append(self.batches[1]))
+        self.assertTrue(self.store.append(self.batches[1]))
+        pd.testing.assert_frame_equal(
+            loaded.select(selection), self.store.select(selection)
+        )
+
+    def test_only_removes_older_snapshots(self) -> None:
+        unrelated = os.path.join(self.directory, "notes.txt")
+        with open(unrelated, "w") as file:
+            file.write("keep me")
+        os.mkdir(os.path.join(self.directory, "nested"))
+
+        def files(manifest: Dict) -> List[str]:
+            return [
+                os.path.join(self.directory, filename)
+                for columns in manifest["columns"].values()
+                for filename in columns.values()
+            ]
+
+        first = write_snapshot(self.store, self.directory)
+        second = write_snapshot(self.store, self.directory)
+
+        # A reader of the first manifest can still map its files
+        self.assertTrue(all(os.path.exists(path) for path in files(first)))
+
+        third = write_snapshot(self.store, self.directory)
+        self.assertFalse(any(os.path.exists(path) for path in files(first)))
+        self.assertTrue(all(os.path.exists(path) for path in files(second)))
+        self.assertTrue(all(os.path.exists(path) for path in files(third)))
+
+        self.assertTrue(os.path.exists(unrelated))
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, "nested")))
+        self.assertEqual(read_manifest(self.directory), third)
+
+
+class StatsWorkerTests(SimpleTestCase):
+    def test_refresh_loads_and_aggregates_once(self) -> None:
+        store = EventStore(generate(size=1500, seed=17, days=2))
+        loads = []
+
+        def load() -> pd.DataFrame:
+            loads.append(None)
+            return store.select(Selection(valid_only=True))
+
+        worker = StatsWorker(load, interval=60)
+        compute = mock.patch.object(
+            stats_worker,
+            "compute_aggregate",
+            wraps=stats_worker.compute_aggregate,
+        )
+
+        with using_store(store), compute as computed:
+            worker.refresh()
+
+        distinct = {
+            aggregate
+            for aggregates in METRIC_AGGREGATES.values()
+            for aggregate in aggregates
+        }
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(computed.call_count, len(distinct))
+
+        for metric, aggregates in METRIC_AGGREGATES.items():
+            stats = worker.stats(metric)
+            self.assertEqual(stats.data.attrs["metric"], metric)
+            self.assertEqual(set(stats.aggregates), set(aggregates))
+
+        # Charts sharing an aggregation get the same result
+        self.assertIs(
+            worker.stats(MetricType.ROUNDS).aggregates[Aggregate(VIZ_CHART_INTERVAL)],
+            worker.stats(MetricType.BATCHES).aggregates[Aggregate(VIZ_CHART_INTERVAL)],
+        )
+
+
+class PageCacheTests(SimpleTestCase):
+    def test_concurrent_misses_render_once(self) -> None:
+        cache = PageCache(ttl=60, max_entries=4)
+        renders = []
+
+        def render(**kwargs) -> str:
+            renders.append(kwargs)
+            time.sleep(0.05)
+            return "page"
+
+        pages = []
+        threads = [
+            threading.Thread(
+                target=lambda: pages.append(cache.get_or_render("view", render, a=1))
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(pages, ["page"] * 8)
+        self.assertEqual(renders, [{"a": 1}])
+        self.assertEqual(cache.get("view", a=1), "page")
+        self.assertEqual(cache.get_or_render("view", render, a=1), "page")
+        self.assertEqual(len(renders), 1)
+
+    def test_failed_render_is_retried(self) -> None:
+        cache = PageCache(ttl=60, max_entries=4)
+
+        def fail() -> str:
+            raise RuntimeError("render failed")
+
+        with self.assertRaises(RuntimeError):
+            cache.get_or_render("view", fail)
+
+        self.assertEqual(cache.get_or_render("view", lambda: "page"), "page")
+
+
+class RenderPageTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.store = EventStore(generate(size=500, seed=19, days=1))
+
+    def test_joined_requests_leave_the_pool_free(self) -> None:
+        renders = []
+        finished = []
+
+        def slow(**kwargs) -> str:
+            renders.append(kwargs)
+            time.sleep(0.3)
+            return "slow"
+
+        async def request(view: str, render) -> str:
+            page = await views.render_page(view, render, run=id(self))
+            finished.append(view)
+            return page
+
+        async def main():
+            joined = [
+                asyncio.ensure_future(request("test-slow", slow)) for _ in range(6)
+            ]
+            await asyncio.sleep(0.05)
+            fast = await request("test-fast", lambda **kwargs: "fast")
+            return fast, await asyncio.gather(*joined)
+
+        with using_store(self.store):
+            fast, pages = asyncio.run(main())
+
+        self.assertEqual(fast, "fast")
+        self.assertEqual(pages, ["slow"] * 6)
+        self.assertEqual(len(renders), 1)
+        # Waiting requests did not hold render workers back from other pages
+        self.assertEqual(finished[0], "test-fast")
+
+    def test_timed_out_render_keeps_its_permit(self) -> None:
+        def slow(**kwargs) -> str:
+            time.sleep(0.3)
+            return "slow"
+
+        async def main():
+            page = await views.render_page("test-timeout", slow, run=id(self))
+            limit = views.render_limit()
+            held = limit.locked()
+
+            # The render lands in the page cache once it is done
+            while limit.locked():
+                await asyncio.sleep(0.01)
+            cached = await views.render_page("test-timeout", slow, run=id(self))
+
+            return page, held, cached
+
+        with using_store(self.store), mock.patch.multiple(
+            views, VIZ_RENDER_TIMEOUT=0.05, VIZ_RENDER_CONCURRENCY=1
+        ):
+            page, held, cached = asyncio.run(main())
+
+        self.assertIsNone(page)
+        self.assertTrue(held)
+        self.assertEqual(cached, "slow")
+
+
+class DataEndpointTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.batches = split(generate(size=2000, seed=29, days=1), 2)
+        self.store = EventStore(self.batches[0])
+
+    def test_etag_follows_the_data_version(self) -> None:
+        with using_store(self.store):
+            for url in ("/viz/users/item", "/viz/users/data"):
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response["Content-Type"], "application/json")
+
+                    etag = response["ETag"]
+                    cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(cached.status_code, 304)
+                    self.assertEqual(cached.content, b"")
+
+            self.store.append(self.batches[1])
+
+            response = self.client.get("/viz/users/data", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+
+class LiveEventsTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.store = EventStore(generate(size=500, seed=23, days=1))
+
+    def test_shell_is_the_page(self) -> None:
+        with using_store(self.store):
+            response = self.client.get("/viz/users")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+
+        page = response.content.decode()
+        for url in ("/viz/users/item", "/viz/users/data", "/viz/users/events"):
+            self.assertIn(url, page)
+        self.assertNotIn('http-equiv="refresh"', page)
+
+    def test_static_page_does_not_reload(self) -> None:
+        page_cache.clear()
+
+        with using_store(self.store):
+            response = self.client.get("/viz/users?static=1")
+
+        self.assertEqual(response.status_code, 200)
+
+        page = response.content.decode()
+        self.assertIn("Bokeh.embed.embed_items", page)
+        self.assertNotIn('http-equiv="refresh"', page)
+
+    def test_wsgi_polls_instead(self) -> None:
+        with using_store(self.store):
+            response = self.client.get("/viz/users/events")
+
+        # WSGI would buffer an endless stream, the shell polls on a 204
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    def test_stream_ends_after_duration(self) -> None:
+        async def updates():
+            raise AssertionError("the data did not change")
+
+        async def main() -> List[str]:
+            stream = event_stream(updates, None, heartbeat=0.05, duration=0.2)
+            return [message async for message in stream]
+
+        with using_store(self.store):
+            messages = asyncio.run(asyncio.wait_for(main(), 2))
+
+        self.assertTrue(messages)
+        self.assertEqual(set(messages), {": keep-alive\n\n"})
+
+
+class TimingTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.store = EventStore(generate(size=500, seed=29, days=1))
+
+        # Pages cached by other tests would skip the timed stages
+        page_cache.clear()
+
+    def test_histogram_keeps_the_latest_window(self) -> None:
+        histogram = RollingHistogram(4)
+        self.assertEqual(histogram.percentiles((50,)), {})
+
+        for value in range(1, 11):
+            histogram.add(float(value))
+
+        self.assertEqual(histogram.count, 10)
+        self.assertEqual(
+            histogram.percentiles((0, 50, 100)), {"p0": 7.0, "p50": 9.0, "p100": 10.0}
+        )
+
+    def test_stage_metrics_per_chart(self) -> None:
+        stages = StageMetrics(8)
+        stages.add("show_votes", "build", 0.010)
+        stages.add(None, "build", 0.030)
+        stages.add("show_votes", "render", 0.002)
+
+        snapshot = stages.snapshot((50, 100))
+
+        self.assertEqual(snapshot["window"], 8)
+        self.assertEqual(
+            snapshot["stages"],
+            {
+                "build": {"count": 2, "p50": 30.0, "p100": 30.0},
+                "render": {"count": 1, "p50": 2.0, "p100": 2.0},
+            },
+        )
+        self.assertEqual(
+            snapshot["charts"],
+            {
+                "show_votes": {
+                    "build": {"count": 1, "p50": 10.0, "p100": 10.0},
+                    "render": {"count": 1, "p50": 2.0, "p100": 2.0},
+                }
+            },
+        )
+
+        stages.clear()
+        self.assertEqual(stages.snapshot()["stages"], {})
+
+    def test_server_timing_header(self) -> None:
+        with using_store(self.store), mock.patch.object(
+            timing, "metrics", StageMetrics(16)
+        ):
+            response = self.client.get("/viz/users/data")
+
+        entries = response["Server-Timing"].split(", ")
+        names = [entry.split(";")[0] for entry in entries]
+
+        for entry in entries:
+            self.assertRegex(entry, r"^[a-z_]+;dur=\d+\.\d{2}$")
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("chart", names)
+        self.assertEqual(names[-1], "total")
+
+    def test_metrics_endpoint(self) -> None:
+        with using_store(self.store), mock.patch.object(
+            timing, "metrics", StageMetrics(16)
+        ):
+            self.client.get("/viz/users/data")
+            response = self.client.get("/viz/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-store", response["Cache-Control"])
+
+        snapshot = response.json()
+        self.assertEqual(snapshot["window"], 16)
+
+        # The metrics request itself is only recorded once it has answered
+        request = snapshot["stages"]["request"]
+        self.assertEqual(request["count"], 1)
+        self.assertEqual(
+            set(request), {"count", *(f"p{p}" for p in VIZ_METRICS_PERCENTILES)}
+        )
+
+        self.assertTrue(snapshot["charts"])
+        for name, stages in snapshot["charts"].items():
+            self.assertEqual(stages["chart"]["count"], 1, name)
+            self.assertLessEqual(
+                stages["chart"]["p50"], snapshot["stages"]["request"]["p50"]
+            )
+
+
+class MockDataTests(SimpleTestCase):
+    def test_columns(self) -> None:
+        columns = generate(size=3000, seed=5, days=7)
+
+        self.assertEqual(
+            set(columns),
+            {
+                "_id",
+                "user_id",
+                "created",
+                "user_latency",
+                "miner",
+                "miner_hotkey",
+                "validator",
+                "round_id",
+                "compute_id",
+                "weight",
+                "amount",
+                "is_valid",
+            },
+        )
+        for name, values in columns.items():
+            self.assertEqual(len(values), 3000, name)
+
+        created = columns["created"]
+        self.assertEqual(created.dtype, np.dtype("datetime64[ns]"))
+        self.assertTrue(np.all(np.diff(created) >= np.timedelta64(0)))
+        self.assertLessEqual(created[-1] - created[0], np.timedelta64(7, "D"))
+
+        np.testing.assert_array_equal(columns["_id"], np.arange(3000))
+        self.assertEqual(columns["is_valid"].dtype, np.bool_)
+        self.assertTrue(
+            np.all((columns["user_latency"] >= 0) & (columns["user_latency"] <= 25))
+        )
+        self.assertTrue(np.all(columns["weight"] >= 0))
+        self.assertTrue(all(len(hotkey) == 48 for hotkey in columns["miner_hotkey"]))
+
+        # Only the few cheaters send invalid events
+        invalid_users = set(columns["user_id"][~columns["is_valid"]])
+        self.assertTrue(invalid_users)
+        self.assertLess(len(invalid_users), len(set(columns["user_id"])) * 0.05)
+
+    def test_same_seed_same_events(self) -> None:
+        first, second = generate(size=2000, seed=9), generate(size=2000, seed=9)
+
+        for name in first:
+            if name == "created":
+                # Events end at the current time, which may have moved on
+                np.testing.assert_array_equal(
+                    first[name] - first[name][-1], second[name] - second[name][-1]
+                )
+            else:
+                np.testing.assert_array_equal(first[name], second[name], name)
+
+    def test_other_seed_other_events(self) -> None:
+        first, second = generate(size=2000, seed=9), generate(size=2000, seed=10)
+
+        self.assertFalse(np.array_equal(first["user_id"], second["user_id"]))
+        self.assertFalse(np.array_equal(first["user_latency"], second["user_latency"]))
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_every_run_rebuilds_rollups(self) -> None:
+        with using_store(events._store), mock.patch.object(
+            events, "Rollup", wraps=Rollup
+        ) as rollup:
+            results = benchmark([2000], ["show_votes"], repeat=2, log=lambda _: None)
+
+        # A cold run, two timed runs and a traced one, each on its own store
+        self.assertTrue(rollup.call_count)
+        self.assertEqual(rollup.call_count % 4, 0)
+
+        stages = results["2000"]["show_votes"]
+        for stage in ("get_data", "resample_data", "build", "render_html_chart"):
+            self.assertGreater(stages[stage]["peak_bytes"], 0, stage)
+            self.assertGreater(stages[stage]["output_bytes"], 0, stage)
+
+    def test_compare_flags_growth_past_tolerance(self) -> None:
+        baseline = {
+            "5000": {
+                "show_votes": {
+                    "build": {"seconds": 0.1, "peak_bytes": 1000, "output_bytes": 500}
+                }
+            }
+        }
+        results = {
+            "5000": {
+                "show_votes": {
+                    "build": {"seconds": 0.104, "peak_bytes": 2000, "output_bytes": 510}
+                }
+            }
+        }
+
+        regressions = compare(results, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("peak_bytes", regressions[0])
+
+    def test_baseline_covers_every_chart(self) -> None:
+        baseline = load_results(os.path.join(settings.BASE_DIR, VIZ_BENCHMARK_BASELINE))
+
+        for size in ("5000", "100000"):
+            self.assertEqual(sorted(baseline[size]), chart_names())
+            for name, stages in baseline[size].items():
+                self.assertNotIn("error", stages, name)
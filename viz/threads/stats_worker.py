@@ -1,4 +1,13 @@
+import threading
+from dataclasses import dataclass
 from enum import Enum
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional
+
+import pandas as pd
+from loguru import logger
+
+from viz.config import VIZ_CHART_INTERVAL, VIZ_STATS_INTERVAL, VIZ_STATS_WAIT
+from viz.store.events import data_version, on_append
 
 
 class MetricType(str, Enum):
@@ -15,3 +24,244 @@ class MetricType(str, Enum):
 
     # Computed values
     VOTES_CORRELATION = "VOTES_CORRELATION"
+
+
+class Aggregate(NamedTuple):
+    """
+    One aggregation a chart runs on a metric's data.
+
+    ``period`` resamples over time (line charts, split per ``group_by`` when
+    given); without a period the values are totalled per ``group_by`` (bar
+    charts). ``key`` is summed, or averaged with ``mean``, and rows are
+    counted when it is None.
+    """
+
+    period: Optional[str]
+    key: Optional[str] = None
+    mean: bool = False
+    group_by: Optional[str] = None
+
+
+# The aggregations behind the charts of every metric
+METRIC_AGGREGATES: Dict[MetricType, List[Aggregate]] = {
+    MetricType.VOTES: [
+        Aggregate(VIZ_CHART_INTERVAL),
+        Aggregate(VIZ_CHART_INTERVAL, "user_latency", mean=True),
+        Aggregate(None, group_by="user_id"),
+        Aggregate(None, group_by="compute_id"),
+        Aggregate(None, group_by="miner_hotkey"),
+        Aggregate(None, group_by="round_id"),
+        Aggregate(None, "user_latency", mean=True, group_by="user_id"),
+    ],
+    MetricType.ROUNDS: [Aggregate(VIZ_CHART_INTERVAL)],
+    MetricType.BATCHES: [Aggregate(VIZ_CHART_INTERVAL)],
+    MetricType.COMPUTES: [Aggregate(VIZ_CHART_INTERVAL)],
+    MetricType.WEIGHTS: [
+        Aggregate(VIZ_CHART_INTERVAL, "weight", mean=True, group_by="miner")
+    ],
+    MetricType.AVERAGES: [Aggregate(VIZ_CHART_INTERVAL, "weight", group_by="miner")],
+    MetricType.PAYOUTS: [
+        Aggregate(VIZ_CHART_INTERVAL, "amount"),
+        Aggregate(None, "amount", group_by="user_id"),
+    ],
+    MetricType.VOTES_PER_USER: [Aggregate(VIZ_CHART_INTERVAL, group_by="user_id")],
+    MetricType.VOTES_PER_HOTKEY: [
+        Aggregate(VIZ_CHART_INTERVAL, group_by="miner_hotkey")
+    ],
+    MetricType.VOTES_PER_COMPUTE: [
+        Aggregate(VIZ_CHART_INTERVAL, group_by="compute_id")
+    ],
+    MetricType.VOTES_CORRELATION: [
+        Aggregate(VIZ_CHART_INTERVAL, group_by=group_by)
+        for group_by in ("user_id", "miner_hotkey", "miner")
+    ],
+}
+
+
+@dataclass(frozen=True)
+class MetricStats:
+    version: int
+    data: pd.DataFrame
+    aggregates: Mapping[Aggregate, pd.DataFrame]
+
+
+def compute_aggregate(data: pd.DataFrame, aggregate: Aggregate) -> pd.DataFrame:
+    """
+    Runs an aggregation with the same code the charts use inline.
+    """
+    from viz.chart.chart_bar import group_values
+    from viz.chart.chart_base import resample_data
+    from viz.chart.chart_lines import prepare_and_aggregate_data
+
+    if aggregate.period is None:
+        return group_values(data, aggregate.group_by, aggregate.key, aggregate.mean)
+
+    if aggregate.group_by is None:
+        return resample_data(
+            data, aggregate.period, key_mean=aggregate.mean, key_sum=aggregate.key
+        )
+
+    return prepare_and_aggregate_data(
+        data, aggregate.period, aggregate.group_by, aggregate.key, aggregate.mean
+    )
+
+
+class StatsWorker(threading.Thread):
+    """
+    Background thread keeping the aggregates of every metric up to date.
+
+    Every metric charts the same unfiltered events, so each refresh loads
+    them once and runs every distinct aggregation once, then publishes all
+    of them at once by swapping a single dict. It runs every
+    ``VIZ_STATS_INTERVAL`` seconds and right after new events reach the
+    store, skipping refreshes when the data did not change.
+    """
+
+    def __init__(self, load: Callable[[], pd.DataFrame], interval: float) -> None:
+        super().__init__(name="viz-stats-worker", daemon=True)
+
+        self.interval = interval
+
+        self._load = load
+        self._stats: Dict[MetricType, MetricStats] = {}
+        self._version: Optional[int] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._published = threading.Condition()
+
+    def stats(self, metric: MetricType) -> Optional[MetricStats]:
+        return self._stats.get(metric)
+
+    def wait(self, version: int, timeout: float) -> bool:
+        """
+        Waits until stats of ``version`` (or newer) are published, returns
+        False on timeout.
+        """
+        with self._published:
+            return self._published.wait_for(
+                lambda: self._version is not None and self._version >= version,
+                timeout=timeout,
+            )
+
+    def notify(self, *args) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+
+    def refresh(self) -> None:
+        version = data_version()
+        if version == self._version:
+            return
+
+        data = self._load()
+
+        # Metrics sharing an aggregation (e.g. row counts) share its result
+        computed: Dict[Aggregate, pd.DataFrame] = {}
+        stats: Dict[MetricType, MetricStats] = {}
+
+        for metric, aggregates in METRIC_AGGREGATES.items():
+            results: Dict[Aggregate, pd.DataFrame] = {}
+            for aggregate in aggregates:
+                if not all(
+                    column in data.columns
+                    for column in (aggregate.key, aggregate.group_by)
+                    if column is not None
+                ):
+                    continue
+
+                if aggregate not in computed:
+                    computed[aggregate] = compute_aggregate(
+                        data.copy(deep=False), aggregate
+                    )
+                results[aggregate] = computed[aggregate]
+
+            frame = data.copy(deep=False)
+            frame.attrs["metric"] = metric
+            frame.attrs["stats_version"] = version
+
+            stats[metric] = MetricStats(version, frame, results)
+
+        # A single assignment, readers see either the old or the new stats
+        self._stats = stats
+
+        with self._published:
+            self._version = version
+            self._published.notify_all()
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the precomputed stats")
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+_worker: Optional[StatsWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_worker(load: Callable[[], pd.DataFrame]) -> StatsWorker:
+    """
+    Returns the process-wide stats worker, starting it on first use.
+    """
+    global _worker
+
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                worker = StatsWorker(load, VIZ_STATS_INTERVAL)
+                on_append(worker.notify)
+                worker.start()
+                _worker = worker
+
+    return _worker
+
+
+def get_stats(
+    metric: MetricType, load: Callable[[], pd.DataFrame]
+) -> Optional[MetricStats]:
+    """
+    Returns the precomputed stats of ``metric`` for the current data, waiting
+    up to ``VIZ_STATS_WAIT`` seconds for the worker to catch up. ``load``
+    returns the unfiltered events the worker aggregates. Returns None when
+    the metric is not precomputed or the worker is still behind.
+    """
+    if metric not in METRIC_AGGREGATES:
+        return None
+
+    worker = get_worker(load)
+    version = data_version()
+
+    stats = worker.stats(metric)
+    if stats is None or stats.version < version:
+        worker.notify()
+        if not worker.wait(version, VIZ_STATS_WAIT):
+            return None
+        stats = worker.stats(metric)
+
+    return stats
+
+
+def precomputed(data: pd.DataFrame, aggregate: Aggregate) -> Optional[pd.DataFrame]:
+    """
+    Returns a copy of the precomputed ``aggregate`` of a frame handed out by
+    ``get_stats``, or None when the charts have to aggregate it themselves.
+    """
+    metric = data.attrs.get("metric")
+    if metric is None or _worker is None:
+        return None
+
+    stats = _worker.stats(metric)
+    if stats is None or stats.version != data.attrs.get("stats_version"):
+        return None
+
+    if len(stats.data) != len(data):
+        return None
+
+    result = stats.aggregates.get(aggregate)
+    return result.copy() if result is not None else None
@@ -0,0 +1,215 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from viz.config import VIZ_METRICS_PERCENTILES, VIZ_METRICS_WINDOW
+
+
+class Timings:
+    """
+    Time spent per stage while handling one request.
+
+    Charts of a page are built on several threads, which all add to the same
+    request's timings.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        """
+        Formats the timings as a ``Server-Timing`` header value.
+        """
+        with self._lock:
+            stages = list(self.stages.items())
+
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages)
+
+
+class RollingHistogram:
+    """
+    The latest ``window`` samples of a stage, in a ring buffer.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.count = 0
+        self._samples: List[float] = [0.0] * window
+
+    def add(self, value: float) -> None:
+        self._samples[self.count % len(self._samples)] = value
+        self.count += 1
+
+    def percentiles(self, percentiles: Tuple[int, ...]) -> Dict[str, float]:
+        samples = sorted(self._samples[: min(self.count, len(self._samples))])
+        if not samples:
+            return {}
+
+        return {
+            f"p{percentile}": round(
+                samples[min(len(samples) - 1, int(len(samples) * percentile / 100))],
+                3,
+            )
+            for percentile in percentiles
+        }
+
+
+class StageMetrics:
+    """
+    Rolling latency histograms per stage, overall and per chart.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+
+        self._histograms: Dict[Tuple[Optional[str], str], RollingHistogram] = {}
+        self._lock = threading.Lock()
+
+    def add(self, chart: Optional[str], stage: str, seconds: float) -> None:
+        milliseconds = seconds * 1000
+
+        with self._lock:
+            for key in ((None, stage), (chart, stage)) if chart else ((None, stage),):
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = RollingHistogram(self.window)
+                histogram.add(milliseconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self, percentiles: Tuple[int, ...] = VIZ_METRICS_PERCENTILES) -> Dict:
+        """
+        Returns the sample count and latency percentiles (in milliseconds) of
+        every stage, and of every stage of every chart.
+        """
+        with self._lock:
+            histograms = [
+                (chart, stage, histogram.count, histogram.percentiles(percentiles))
+                for (chart, stage), histogram in self._histograms.items()
+            ]
+
+        snapshot: Dict = {"window": self.window, "stages": {}, "charts": {}}
+        for chart, stage, count, values in sorted(
+            histograms, key=lambda item: (item[0] or "", item[1])
+        ):
+            target = (
+                snapshot["stages"]
+                if chart is None
+                else snapshot["charts"].setdefault(chart, {})
+            )
+            target[stage] = {"count": count, **values}
+
+        return snapshot
+
+
+metrics = StageMetrics(VIZ_METRICS_WINDOW)
+
+_timings: ContextVar[Optional[Timings]] = ContextVar("viz_timings", default=None)
+_chart: ContextVar[Optional[str]] = ContextVar("viz_chart", default=None)
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+    metrics.add(_chart.get(), name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as stage ``name`` of the current request/chart.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(func: Callable) -> Callable:
+    """
+    Times every call of ``func`` as a stage named after the function.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+@contextmanager
+def for_chart(name: str) -> Iterator[None]:
+    """
+    Attributes the stages timed in the enclosed block to chart ``name``.
+    """
+    token = _chart.set(name)
+    try:
+        yield
+    finally:
+        _chart.reset(token)
+
+
+class ServerTimingMiddleware:
+    """
+    Collects the stage timings of every request and returns them in a
+    ``Server-Timing`` header, next to the total time of the request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = Timings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        return self.finish(response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+
+        return self.finish(response, timings, time.perf_counter() - start)
+
+    def finish(self, response, timings: Timings, seconds: float):
+        timings.add("total", seconds)
+        metrics.add(None, "request", seconds)
+        response["Server-Timing"] = timings.header()
+
+        return response
@@ -1,4 +1,11 @@
 from django.urls import path
 from . import views
 
-urlpatterns = [path("users", views.show_viz, name="index")]
+urlpatterns = [
+    path("users", views.show_viz, name="index"),
+    path("users/item", views.show_viz_item, name="users-item"),
+    path("users/data", views.show_viz_data, name="users-data"),
+    path("users/events", views.show_viz_events, name="users-events"),
+    path("correlation", views.show_viz_correlation, name="correlation"),
+    path("metrics", views.show_metrics, name="metrics"),
+]
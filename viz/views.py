@@ -1,10 +1,350 @@
-from django.http import HttpResponse
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial, wraps
+from typing import TYPE_CHECKING, Callable, List, Optional, Set
+from weakref import WeakKeyDictionary
 
-from viz.chart.chart_builder import render_html_chart
-from viz.chart.charts import show_user_latency, show_user_latency_by_user
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag
+from loguru import logger
 
+from viz.config import (
+    VIZ_DATA_SOURCE,
+    VIZ_LIVE_DURATION,
+    VIZ_LIVE_HEARTBEAT,
+    VIZ_RENDER_CONCURRENCY,
+    VIZ_RENDER_TIMEOUT,
+    VIZ_RENDER_WORKERS,
+)
 
-def show_viz(param):
-    return HttpResponse(
-        render_html_chart(show_user_latency(), show_user_latency_by_user())
+if TYPE_CHECKING:
+    from viz.chart.chart_builder import ChartSpec
+    from viz.live import LiveUpdates, Update
+
+# Chart modules pull in pandas and bokeh, they are imported on the first
+# request rather than when the URLconf loads, which keeps management
+# commands and worker boot fast
+
+_render_executor: Optional[ThreadPoolExecutor] = None
+_render_executor_lock = threading.Lock()
+_render_limits: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    WeakKeyDictionary()
+)
+_renders: Set["asyncio.Future[None]"] = set()
+_store_ready = False
+_users_live: Optional["LiveUpdates"] = None
+_users_live_lock = threading.Lock()
+
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """
+    Returns the pool pages are rendered on, kept apart from the chart pool
+    since a page render waits on its charts.
+    """
+    global _render_executor
+
+    if _render_executor is None:
+        with _render_executor_lock:
+            if _render_executor is None:
+                _render_executor = ThreadPoolExecutor(
+                    max_workers=VIZ_RENDER_WORKERS, thread_name_prefix="viz-render"
+                )
+
+    return _render_executor
+
+
+def render_limit() -> asyncio.Semaphore:
+    # asyncio primitives belong to one event loop, keep a semaphore per loop
+    loop = asyncio.get_running_loop()
+
+    limit = _render_limits.get(loop)
+    if limit is None:
+        limit = _render_limits[loop] = asyncio.Semaphore(VIZ_RENDER_CONCURRENCY)
+
+    return limit
+
+
+def load_store() -> None:
+    global _store_ready
+
+    # Charts served from the database only need its data version
+    if VIZ_DATA_SOURCE == "database":
+        from viz.store.database import get_poller
+
+        get_poller()
+    else:
+        from viz.store.events import get_store
+
+        get_store()
+
+    _store_ready = True
+
+
+async def ensure_store() -> None:
+    """
+    Builds the event store on a worker thread the first time, since loading
+    the events takes seconds and would stall every request on the loop.
+    With the database as the source, the first read of its data version
+    happens there instead.
+    """
+    if not _store_ready:
+        await sync_to_async(load_store, thread_sensitive=False)()
+
+
+def with_store(view: Callable) -> Callable:
+    """
+    Makes sure the event store exists before ``view`` and its ETag read the
+    data version on the event loop.
+    """
+
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        await ensure_store()
+        return await view(request, *args, **kwargs)
+
+    return inner
+
+
+async def render_page(view: str, render: Callable[..., str], **kwargs) -> Optional[str]:
+    """
+    Returns the page of ``view`` without blocking the event loop.
+
+    Cached pages are answered right away, and requests for a page that is
+    already rendering await that render on the event loop. Otherwise at most
+    ``VIZ_RENDER_CONCURRENCY`` renders run on the render pool, each holding
+    its permit until the pool is done with it, and a request gives up after
+    ``VIZ_RENDER_TIMEOUT`` seconds. Returns None on timeout; the render
+    keeps going and lands in the page cache for the next request.
+    """
+    await ensure_store()
+
+    from viz.cache import page_cache
+
+    key, page, pending, owner = page_cache.claim(view, **kwargs)
+    if page is not None:
+        return page
+
+    if owner:
+
+        async def fill() -> None:
+            try:
+                async with render_limit():
+                    # Carry the request's context so the render's timings are kept
+                    await asyncio.get_running_loop().run_in_executor(
+                        get_render_executor(),
+                        partial(
+                            copy_context().run,
+                            page_cache.fill,
+                            key,
+                            pending,
+                            render,
+                            **kwargs,
+                        ),
+                    )
+            except BaseException:
+                # Requests waiting on a render that never ran must not hang
+                page_cache.fail(
+                    key, pending, RuntimeError(f"Rendering {view} was interrupted")
+                )
+                raise
+
+        # The render outlives the request when it times out
+        task = asyncio.ensure_future(fill())
+        _renders.add(task)
+        task.add_done_callback(_renders.discard)
+
+    waiter = asyncio.wrap_future(pending)
+    try:
+        return await asyncio.wait_for(asyncio.shield(waiter), VIZ_RENDER_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Nobody awaits the render anymore, its outcome only goes to the cache
+        waiter.add_done_callback(lambda done: done.cancelled() or done.exception())
+        logger.warning(f"Rendering {view} took over {VIZ_RENDER_TIMEOUT}s")
+        return None
+
+
+def unavailable() -> HttpResponse:
+    response = HttpResponse("Charts are still rendering, try again", status=503)
+    response["Retry-After"] = "5"
+    return response
+
+
+def users_charts(**kwargs) -> List["ChartSpec"]:
+    from viz.chart.chart_builder import ChartSpec
+    from viz.chart.charts import (
+        show_user_latency,
+        show_user_latency_by_user,
+        show_user_latency_percentiles,
     )
+
+    return [
+        ChartSpec(show_user_latency, kwargs),
+        ChartSpec(show_user_latency_percentiles, kwargs),
+        ChartSpec(show_user_latency_by_user, kwargs),
+    ]
+
+
+def correlation_charts(**kwargs) -> List["ChartSpec"]:
+    from viz.chart.chart_builder import ChartSpec
+    from viz.chart.charts import show_votes_correlation
+
+    return [
+        ChartSpec(show_votes_correlation, {**kwargs, "group_by": group_by})
+        for group_by in ("user_id", "miner_hotkey", "miner")
+    ]
+
+
+def render_correlation(**kwargs) -> str:
+    from viz.chart.chart_builder import render_html_chart
+
+    return render_html_chart(*correlation_charts(**kwargs))
+
+
+def render_users(**kwargs) -> str:
+    from viz.chart.chart_builder import render_html_chart
+
+    return render_html_chart(*users_charts(**kwargs))
+
+
+def render_users_item(**kwargs) -> str:
+    from viz.chart.chart_builder import render_json_item
+
+    return render_json_item(*users_charts(**kwargs))
+
+
+def render_users_data(**kwargs) -> str:
+    from viz.chart.chart_builder import render_json_data
+
+    return render_json_data(*users_charts(**kwargs))
+
+
+def render_users_columns():
+    from viz.chart.chart_builder import render_columns
+
+    return render_columns(*users_charts())
+
+
+def users_live() -> "LiveUpdates":
+    global _users_live
+
+    if _users_live is None:
+        from viz.live import LiveUpdates
+
+        with _users_live_lock:
+            if _users_live is None:
+                _users_live = LiveUpdates(render_users_columns)
+
+    return _users_live
+
+
+async def users_update() -> "Update":
+    """
+    Returns the latest update of the users page, rendering its diff on the
+    render pool when no other page asked for it yet.
+    """
+    live = users_live()
+
+    async with render_limit():
+        return await asyncio.get_running_loop().run_in_executor(
+            get_render_executor(), partial(copy_context().run, live.update)
+        )
+
+
+def users_etag(request, *args, **kwargs) -> str:
+    from viz.store.events import data_version
+
+    return f"users-{data_version()}"
+
+
+async def show_viz(param):
+    # Renders the charts on the server for clients without JavaScript, once,
+    # since a page that reloads itself costs a full render per viewer
+    if param.GET.get("static"):
+        page = await render_page("users", render_users)
+        if page is None:
+            return unavailable()
+
+        return HttpResponse(page)
+
+    # The shell never changes, it loads the charts and then follows the
+    # changes of their data pushed by the events stream, or polls them
+    from viz.chart.chart_builder import render_html_shell
+
+    response = HttpResponse(
+        render_html_shell(
+            reverse("users-item"), reverse("users-data"), reverse("users-events")
+        )
+    )
+    patch_cache_control(response, public=True, max_age=86400)
+    return response
+
+
+async def show_viz_correlation(request):
+    page = await render_page("correlation", render_correlation)
+    if page is None:
+        return unavailable()
+
+    return HttpResponse(page)
+
+
+@with_store
+@etag(users_etag)
+async def show_viz_item(request):
+    page = await render_page("users-item", render_users_item)
+    if page is None:
+        return unavailable()
+
+    return HttpResponse(page, content_type="application/json")
+
+
+@with_store
+@etag(users_etag)
+async def show_viz_data(request):
+    page = await render_page("users-data", render_users_data)
+    if page is None:
+        return unavailable()
+
+    return HttpResponse(page, content_type="application/json")
+
+
+@with_store
+async def show_viz_events(request):
+    from viz.live import event_stream
+
+    # WSGI collects a streamed async iterator before sending it, which would
+    # hold the worker for good. A 204 stops the EventSource from
+    # reconnecting, the shell keeps polling the data instead
+    if not isinstance(request, ASGIRequest):
+        response = HttpResponse(status=204)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    # A reconnecting EventSource reports the last version it applied
+    version = request.headers.get("Last-Event-ID") or request.GET.get("version")
+
+    response = StreamingHttpResponse(
+        event_stream(
+            users_update,
+            int(version) if version and version.isdigit() else None,
+            VIZ_LIVE_HEARTBEAT,
+            VIZ_LIVE_DURATION,
+        ),
+        content_type="text/event-stream",
+    )
+    patch_cache_control(response, no_cache=True)
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def show_metrics(request):
+    from viz.timing import metrics
+
+    response = JsonResponse(metrics.snapshot())
+    patch_cache_control(response, no_store=True)
+    return response